@@ -127,4 +127,33 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-OPENAI_API_KEY= os.getenv("OPENAI_API_KEY")
\ No newline at end of file
+OPENAI_API_KEY= os.getenv("OPENAI_API_KEY")
+# Point at another OpenAI-compatible endpoint, e.g. the fake_llm_server command for offline load tests
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+
+# NCBI E-utilities allow 3 requests/second per client, or 10 with an API key
+NCBI_API_KEY = os.getenv("NCBI_API_KEY")
+
+# Optional on-disk cache of E-utilities responses; leave PUBMED_CACHE_DIR unset to disable
+PUBMED_CACHE_DIR = os.getenv("PUBMED_CACHE_DIR")
+PUBMED_CACHE_TTL = int(os.getenv("PUBMED_CACHE_TTL", 7 * 24 * 60 * 60))
+PUBMED_CACHE_MAX_BYTES = int(os.getenv("PUBMED_CACHE_MAX_BYTES", 1024**3))
+PUBMED_CACHE_REPLAY_ONLY = os.getenv("PUBMED_CACHE_REPLAY_ONLY", "false").lower() in ("1", "true", "yes")
+
+# Optional on-disk cache of LLM completions; leave LLM_CACHE_DIR unset to disable
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 30 * 24 * 60 * 60))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 512 * 1024**2))
+
+# Client-side limits shared by every OpenAI call in the process (see services/llm_gateway.py).
+# Set the per-minute limits to your account's tier; concurrency adapts between 1 and LLM_MAX_CONCURRENCY.
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 3500))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 90000))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", 30))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", 60))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+
+# Batch commands and workers each write their metrics to <command>-<pid>.prom in this directory on exit
+# (e.g. for node_exporter's textfile collector); leave unset to rely on scraping /metrics only
+METRICS_TEXTFILE_DIR = os.getenv("METRICS_TEXTFILE_DIR")
@@ -1,5 +1,16 @@
 from django.contrib import admin
-from .models import Article, Summary, Validation, TrendReport
+from .models import (
+    Article,
+    FetchState,
+    Job,
+    LLMCall,
+    PartialSynthesis,
+    PipelineRun,
+    RunFailure,
+    Summary,
+    Validation,
+    TrendReport,
+)
 
 
 @admin.register(Article)
@@ -9,6 +20,14 @@ class ArticleAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
 
 
+@admin.register(FetchState)
+class FetchStateAdmin(admin.ModelAdmin):
+    list_display = ("start_date", "end_date", "article_count", "last_run_at")
+    search_fields = ("query",)
+    list_filter = ("last_run_at",)
+    exclude = ("pmids",)
+
+
 @admin.register(Summary)
 class SummaryAdmin(admin.ModelAdmin):
     list_display = ("article", "created_at", "text_snippet")
@@ -30,7 +49,47 @@ class ValidationAdmin(admin.ModelAdmin):
 
 @admin.register(TrendReport)
 class TrendReportAdmin(admin.ModelAdmin):
-    list_display = ("pk", "generated_on")
+    list_display = ("pk", "generated_on", "status")
     readonly_fields = ("generated_on", "text")
+    list_filter = ("status",)
     search_fields = ("text",)
     date_hierarchy = "generated_on"
+
+
+@admin.register(PartialSynthesis)
+class PartialSynthesisAdmin(admin.ModelAdmin):
+    list_display = ("period", "updated_at")
+    readonly_fields = ("updated_at", "text")
+    search_fields = ("period", "text")
+    exclude = ("summary_ids",)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("stage", "object_id", "status", "attempts", "worker", "leased_until")
+    search_fields = ("worker", "last_error")
+    list_filter = ("stage", "status")
+
+
+class RunFailureInline(admin.TabularInline):
+    model = RunFailure
+    extra = 0
+    readonly_fields = ("object_id", "error_class", "message", "attempts", "resolved", "updated_at")
+
+
+@admin.register(PipelineRun)
+class PipelineRunAdmin(admin.ModelAdmin):
+    list_display = ("pk", "command", "status", "succeeded", "failed", "total", "started_at", "finished_at")
+    list_filter = ("command", "status")
+    date_hierarchy = "started_at"
+    inlines = [RunFailureInline]
+
+
+@admin.register(LLMCall)
+class LLMCallAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at", "command", "stage", "model", "prompt_tokens", "completion_tokens", "latency", "cached"
+    )
+    list_filter = ("command", "stage", "model", "cached", "failed")
+    search_fields = ("invocation",)
+    date_hierarchy = "created_at"
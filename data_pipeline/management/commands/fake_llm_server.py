@@ -0,0 +1,80 @@
+import argparse
+import logging
+
+from data_pipeline.services.fake_llm import FakeLLMConfig, FakeLLMServer
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Serve a local, deterministic stand-in for the OpenAI chat API, for offline load tests and benchmarks"
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--host",
+            default="127.0.0.1",
+            help="Address to listen on",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=8765,
+            help="Port to listen on (0 picks a free one)",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.5,
+            help="Median seconds before the first token",
+        )
+        parser.add_argument(
+            "--latency-sigma",
+            type=float,
+            default=0.5,
+            help="Spread of the log-normal latency distribution (0 for a fixed latency)",
+        )
+        parser.add_argument(
+            "--tokens-per-second",
+            type=float,
+            default=50.0,
+            help="Generation speed after the first token (0 for instant)",
+        )
+        parser.add_argument(
+            "--rate-limit-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of requests to answer with 429 Too Many Requests",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of requests to answer with 500 Internal Server Error",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=None,
+            help="Seed for latency and error injection, for repeatable runs",
+        )
+
+    def handle(self, *args, **options):
+        config = FakeLLMConfig(
+            latency=options["latency"],
+            latency_sigma=options["latency_sigma"],
+            tokens_per_second=options["tokens_per_second"],
+            rate_limit_rate=options["rate_limit_rate"],
+            error_rate=options["error_rate"],
+            seed=options["seed"],
+        )
+        server = FakeLLMServer((options["host"], options["port"]), config)
+        self.stdout.write(self.style.SUCCESS(f"Fake LLM server listening on {server.url}"))
+        self.stdout.write(f"Run the pipeline against it with OPENAI_BASE_URL={server.url} OPENAI_API_KEY=sk-fake")
+        self.stdout.flush()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Fake LLM server stopped")
+        finally:
+            server.server_close()
@@ -1,19 +1,30 @@
 import argparse
+import asyncio
 import logging
+import queue
+import threading
 from calendar import monthrange
+from collections.abc import Iterator
 from datetime import date
 
-from data_pipeline.models import Article
+from data_pipeline.models import Article, FetchState
+from data_pipeline.services.async_pubmed_client import AsyncPubMedClient
+from data_pipeline.services.disk_cache import DiskCache
 from data_pipeline.services.enums import ArticleData
-from data_pipeline.services.pubmed_client import PubMedClient
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from data_pipeline.services.metrics import ARTICLES_FETCHED, push_metrics
+from data_pipeline.services.pubmed_client import DEFAULT_EFETCH_CHUNK_SIZE, PubMedClient, chunked
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
 from tqdm import tqdm
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_MONTH_RANGE = 2
+DEFAULT_MONTH_RANGE = 1
 DEFAULT_NUMBER_OF_ARTICLES_TO_FETCH = 25
+QUERY = "Covid-19[Title] AND 2020[Date - Publication]"
+UPSERT_BATCH_SIZE = 1000
 
 
 class Command(BaseCommand):
@@ -32,49 +43,317 @@ class Command(BaseCommand):
             default=DEFAULT_MONTH_RANGE,
             help="Number of months to process (starting from January)",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Fetch in EFetch chunks of this many PMIDs, saving each chunk as it arrives",
+        )
+        parser.add_argument(
+            "--use-history",
+            action="store_true",
+            help="Keep search results on the Entrez History server and page EFetch by WebEnv/query_key",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of months to fetch at once (shares the NCBI rate limit)",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only fetch records added or modified since each month's last run (runs months sequentially)",
+        )
+        parser.add_argument(
+            "--datetype",
+            choices=["mdat", "edat"],
+            default="mdat",
+            help="Date used to find new records in incremental mode: modification (mdat) or Entrez (edat)",
+        )
+        parser.add_argument(
+            "--cache-dir",
+            default=None,
+            help="Cache E-utilities responses in this directory (defaults to PUBMED_CACHE_DIR)",
+        )
+        parser.add_argument(
+            "--replay-only",
+            action="store_true",
+            help="Serve every request from the response cache and never contact NCBI",
+        )
 
-    def process_month(self, client: PubMedClient, month: int, per_month: int) -> int:
-        """Process a single month's worth of abstracts."""
-        start = date(2020, month, 1)
+    def build_cache(self, cache_dir: str | None, replay_only: bool) -> DiskCache | None:
+        """Response cache for this run, or None to fall back to the settings default."""
+        cache_dir = cache_dir or settings.PUBMED_CACHE_DIR
+        if not cache_dir:
+            if replay_only:
+                raise CommandError("--replay-only needs --cache-dir or PUBMED_CACHE_DIR")
+            return None
+        return DiskCache(
+            cache_dir,
+            ttl=settings.PUBMED_CACHE_TTL,
+            max_bytes=settings.PUBMED_CACHE_MAX_BYTES,
+            replay_only=replay_only or settings.PUBMED_CACHE_REPLAY_ONLY,
+        )
+
+    def save_articles(self, articles: list[ArticleData]) -> int:
+        """
+        Upsert a batch of fetched articles.
+
+        Each batch is one SELECT (to tell creates from updates) plus one
+        INSERT ... ON CONFLICT (pmid) DO UPDATE, instead of two queries per article.
+        """
+        with transaction.atomic():
+            for batch in chunked(articles, UPSERT_BATCH_SIZE):
+                # ON CONFLICT cannot touch the same row twice in one statement, so keep the last copy of each PMID
+                by_pmid = {article_data.pmid: article_data for article_data in batch}
+                existing = set(Article.objects.filter(pmid__in=by_pmid.keys()).values_list("pmid", flat=True))
+                Article.objects.bulk_create(
+                    [
+                        Article(
+                            pmid=article_data.pmid,
+                            title=article_data.title,
+                            abstract=article_data.abstract,
+                            pub_date=article_data.pub_date,
+                            raw_json=article_data.model_dump_json(),
+                        )
+                        for article_data in by_pmid.values()
+                    ],
+                    update_conflicts=True,
+                    unique_fields=["pmid"],
+                    update_fields=["title", "abstract", "pub_date", "raw_json"],
+                )
+                created = len(by_pmid) - len(existing)
+                self.created += created
+                self.updated += len(existing)
+                ARTICLES_FETCHED.inc(len(by_pmid))
+                logger.info(f"Upserted {len(by_pmid)} articles: {created} created, {len(existing)} updated")
+
+        return len(articles)
+
+    @staticmethod
+    def month_window(month: int) -> tuple[date, date]:
         _, last_day = monthrange(2020, month)
-        end = date(2020, month, last_day)
+        return date(2020, month, 1), date(2020, month, last_day)
+
+    def process_month(
+        self,
+        client: PubMedClient,
+        month: int,
+        per_month: int,
+        batch_size: int | None = None,
+        use_history: bool = False,
+    ) -> int:
+        """Process a single month's worth of abstracts."""
+        start, end = self.month_window(month)
 
         try:
+            if batch_size or use_history:
+                # Each chunk is saved in its own transaction, so a failure only loses that chunk
+                processed = 0
+                for articles in client.iter_fetch(
+                    query=QUERY,
+                    start_date=start,
+                    end_date=end,
+                    limit=per_month,
+                    chunk_size=batch_size or DEFAULT_EFETCH_CHUNK_SIZE,
+                    use_history=use_history,
+                ):
+                    processed += self.save_articles(articles)
+                return processed
+
             articles: list[ArticleData] = client.fetch(
-                query="Covid-19[Title] AND 2020[Date - Publication]",
+                query=QUERY,
                 start_date=start,
                 end_date=end,
                 limit=per_month,
             )
+            return self.save_articles(articles)
+        except Exception as e:  # TODO: Be more specific with exceptions
+            logger.error(f"Error processing month {start:%Y-%m}: {str(e)}")
+            return 0
 
-            with transaction.atomic():
-                for article_data in articles:
-                    article, created = Article.objects.update_or_create(
-                        pmid=article_data.pmid,
-                        defaults={
-                            "title": article_data.title,
-                            "abstract": article_data.abstract,
-                            "pub_date": article_data.pub_date,
-                            "raw_json": article_data.model_dump_json(),
-                        },
-                    )
-                    verb = "Created" if created else "Updated"
-                    logger.info(f"{verb} Article PMID={article.pmid}")
+    def process_month_incremental(
+        self,
+        client: PubMedClient,
+        month: int,
+        per_month: int,
+        batch_size: int | None = None,
+        datetype: str = "mdat",
+    ) -> int:
+        """
+        Fetch only what changed in a month window since its last run.
 
-            return len(articles)
-        except Exception as e:  # TODO: Be more specific with exceptions
+        The first run for a window does a normal fetch. Later runs ask ESearch for
+        records whose `datetype` date is on or after the last run, and a window with
+        no such records costs a single ESearch and no EFetch.
+
+        If anything fails, from an EFetch chunk to a record that will not parse, the
+        articles saved so far are kept but the watermark is left where it was, so the
+        next run asks for the whole interval again. Either way the other months still run.
+        """
+        start, end = self.month_window(month)
+        run_started_at = timezone.now()
+
+        try:
+            state, _ = FetchState.objects.get_or_create(query=QUERY, start_date=start, end_date=end)
+            if state.last_run_at is None:
+                pages = client.iter_pmids(QUERY, start, end, limit=per_month)
+            else:
+                pages = client.iter_updated_pmids(
+                    QUERY,
+                    start,
+                    end,
+                    since=state.last_run_at.date(),
+                    until=run_started_at.date(),
+                    limit=per_month,
+                    datetype=datetype,
+                )
+
+            seen = set(state.pmids)
+            processed = 0
+            for ids in pages:
+                chunks = client.iter_fetch_ids(ids, chunk_size=batch_size or DEFAULT_EFETCH_CHUNK_SIZE, strict=True)
+                for articles in chunks:
+                    processed += self.save_articles(articles)
+                    seen.update(article_data.pmid for article_data in articles)
+
+            if not processed:
+                logger.info(f"No new or modified articles for {start:%Y-%m} since {state.last_run_at}, skipping")
+
+            state.last_run_at = run_started_at
+            state.pmids = sorted(seen)
+            state.article_count = len(seen)
+            state.save(update_fields=["last_run_at", "pmids", "article_count"])
+            return processed
+        # Broad on purpose, like process_month: one month's failure, whatever its cause, must not stop the run
+        except Exception as e:
             logger.error(f"Error processing month {start:%Y-%m}: {str(e)}")
             return 0
 
+    def fetch_months_concurrently(
+        self,
+        months: list[int],
+        per_month: int,
+        batch_size: int | None,
+        use_history: bool,
+        concurrency: int,
+        cache: DiskCache | None = None,
+    ) -> Iterator[tuple[int, list[ArticleData] | Exception | None]]:
+        """
+        Fetch up to `concurrency` month windows at once on an asyncio loop in a background
+        thread, yielding `(month, articles)` chunks back on the calling thread so that all
+        database writes stay there. A month's final item is `None` on success or the
+        exception that stopped it. A failure that is not any one month's (the client or the
+        event loop itself) is raised here once the thread has stopped, rather than ending
+        the iteration early. The hand-off queue is bounded, so fetching pauses whenever
+        saving falls behind.
+        """
+        results: queue.Queue = queue.Queue(maxsize=concurrency)
+        finished = object()
+
+        async def fetch_month(client: AsyncPubMedClient, semaphore: asyncio.Semaphore, month: int) -> None:
+            start, end = self.month_window(month)
+            async with semaphore:
+                try:
+                    async for articles in client.iter_fetch(
+                        query=QUERY,
+                        start_date=start,
+                        end_date=end,
+                        limit=per_month,
+                        chunk_size=batch_size or DEFAULT_EFETCH_CHUNK_SIZE,
+                        use_history=use_history,
+                    ):
+                        await asyncio.to_thread(results.put, (month, articles))
+                    outcome = None
+                # Broad on purpose: a month that fails for any reason (a bad record included) must not
+                # cancel the others through gather; its error is reported with the month instead
+                except Exception as e:
+                    outcome = e
+            await asyncio.to_thread(results.put, (month, outcome))
+
+        async def fetch_all() -> None:
+            semaphore = asyncio.Semaphore(concurrency)
+            async with AsyncPubMedClient(pool_size=concurrency, cache=cache) as client:
+                await asyncio.gather(*(fetch_month(client, semaphore, month) for month in months))
+
+        errors: list[BaseException] = []
+
+        def run() -> None:
+            try:
+                asyncio.run(fetch_all())
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                results.put(finished)
+
+        thread = threading.Thread(target=run, name="fetch_data-async", daemon=True)
+        thread.start()
+        while (item := results.get()) is not finished:
+            yield item
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    def process_months_concurrently(self, months: list[int], options: dict, cache: DiskCache | None = None) -> int:
+        total_processed = 0
+        with tqdm(total=len(months), desc="Processing months") as pbar:
+            for month, result in self.fetch_months_concurrently(
+                months,
+                per_month=options["per_month"],
+                batch_size=options["batch_size"],
+                use_history=options["use_history"],
+                concurrency=options["concurrency"],
+                cache=cache,
+            ):
+                if isinstance(result, list):
+                    try:
+                        total_processed += self.save_articles(result)
+                    except DatabaseError as e:
+                        logger.error(f"Error saving articles for month 2020-{month:02d}: {str(e)}")
+                    continue
+                if result is not None:
+                    logger.error(f"Error processing month 2020-{month:02d}: {str(result)}")
+                pbar.update(1)
+        return total_processed
+
+    @push_metrics
     def handle(self, *args, **options):
-        client = PubMedClient()
         per_month = options["per_month"]
+        batch_size = options["batch_size"]
+        use_history = options["use_history"]
+        months = list(range(1, options["month_range"] + 1))
+        self.created = 0
+        self.updated = 0
+        cache = self.build_cache(options["cache_dir"], options["replay_only"])
+
+        if options["incremental"]:
+            total_processed = 0
+            with PubMedClient(cache=cache) as client:
+                for month in tqdm(months, desc="Processing months"):
+                    total_processed += self.process_month_incremental(
+                        client, month, per_month, batch_size, options["datetype"]
+                    )
+            self.report(total_processed)
+            return
+
+        if options["concurrency"] > 1:
+            total_processed = self.process_months_concurrently(months, options, cache)
+            self.report(total_processed)
+            return
 
         total_processed = 0
-        for month in tqdm(range(1, DEFAULT_MONTH_RANGE), desc="Processing months"):
-            logger.info(f"Processing month {month}/2020")  # TODO: Use month name, don't hardcode year
-            processed: int = self.process_month(client, month, per_month)
-            total_processed += processed
+        with PubMedClient(cache=cache) as client:
+            for month in tqdm(months, desc="Processing months"):
+                logger.info(f"Processing month {month}/2020")  # TODO: Use month name, don't hardcode year
+                processed: int = self.process_month(client, month, per_month, batch_size, use_history)
+                total_processed += processed
+
+        self.report(total_processed)
 
-        logger.info(f"Fetch complete. Processed {total_processed} articles")
-        self.stdout.write(self.style.SUCCESS("Fetch complete"))
+    def report(self, total_processed: int) -> None:
+        logger.info(
+            f"Fetch complete. Processed {total_processed} articles "
+            f"({self.created} created, {self.updated} updated)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Fetch complete: {self.created} created, {self.updated} updated"))
@@ -0,0 +1,242 @@
+import argparse
+import logging
+import queue
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import count
+
+from data_pipeline.management.commands import fetch_data, summarize, validate
+from data_pipeline.models import Article, Validation
+from data_pipeline.services.fact_checker.agent import FactChecker
+from data_pipeline.services.llm_orchestrator.agent import LLMOrchestrator
+from data_pipeline.services.metrics import ITEMS_PROCESSED, push_metrics
+from data_pipeline.services.telemetry import record_llm_calls
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 2
+VALIDATION_BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = "Fetch, summarize and validate in one run, with the three stages overlapping"
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--per-month",
+            type=int,
+            default=fetch_data.DEFAULT_NUMBER_OF_ARTICLES_TO_FETCH,
+            help="Number of abstracts to fetch per month",
+        )
+        parser.add_argument(
+            "--month-range",
+            type=int,
+            default=fetch_data.DEFAULT_MONTH_RANGE,
+            help="Number of months to process (starting from January)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Fetch in EFetch chunks of this many PMIDs; each chunk enters the pipeline as it arrives",
+        )
+        parser.add_argument(
+            "--use-history",
+            action="store_true",
+            help="Keep search results on the Entrez History server and page EFetch by WebEnv/query_key",
+        )
+        parser.add_argument(
+            "--fetch-concurrency",
+            type=int,
+            default=1,
+            help="Number of months to fetch at once (shares the NCBI rate limit)",
+        )
+        parser.add_argument(
+            "--summarize-concurrency",
+            type=int,
+            default=4,
+            help="Number of summarization requests to keep in flight",
+        )
+        parser.add_argument(
+            "--validate-concurrency",
+            type=int,
+            default=4,
+            help="Number of fact-check requests to keep in flight",
+        )
+        parser.add_argument(
+            "--queue-size",
+            type=int,
+            default=DEFAULT_QUEUE_SIZE,
+            help="Fetched chunks allowed in the pipeline at once; fetching pauses while it is full",
+        )
+        parser.add_argument(
+            "--max-score",
+            type=float,
+            default=0.3,
+            help="Threshold to warn about high hallucination scores",
+        )
+        parser.add_argument(
+            "--cache-dir",
+            default=None,
+            help="Cache E-utilities responses in this directory (defaults to PUBMED_CACHE_DIR)",
+        )
+        parser.add_argument(
+            "--replay-only",
+            action="store_true",
+            help="Serve every request from the response cache and never contact NCBI",
+        )
+        parser.add_argument(
+            "--synthesize",
+            action="store_true",
+            help="Run synthesize once every article has been validated",
+        )
+
+    def start_fetching(self, fetcher: fetch_data.Command, options: dict, events: queue.Queue) -> threading.Thread:
+        """
+        Fetch on a background thread, posting `("fetched", month, articles)` events for each
+        chunk and a final `("fetch_done", None, None)`. Each chunk first takes one of the
+        `queue_size` slots, which the main thread frees once the chunk has left the pipeline.
+        """
+        months = list(range(1, options["month_range"] + 1))
+        cache = fetcher.build_cache(options["cache_dir"], options["replay_only"])
+
+        def run() -> None:
+            try:
+                for month, result in fetcher.fetch_months_concurrently(
+                    months,
+                    per_month=options["per_month"],
+                    batch_size=options["batch_size"],
+                    use_history=options["use_history"],
+                    concurrency=options["fetch_concurrency"],
+                    cache=cache,
+                ):
+                    if isinstance(result, list):
+                        self.slots.acquire()
+                        events.put(("fetched", month, result))
+                    elif result is not None:
+                        events.put(("fetch_failed", month, result))
+            # Broad on purpose: the main loop must hear of any failure, or it would wait on this thread forever
+            except Exception as e:
+                events.put(("fetch_failed", None, e))
+            finally:
+                events.put(("fetch_done", None, None))
+
+        thread = threading.Thread(target=run, name="run_pipeline-fetch", daemon=True)
+        thread.start()
+        return thread
+
+    @push_metrics
+    @record_llm_calls
+    def handle(self, *args, **options):
+        fetcher = fetch_data.Command(stdout=self.stdout, stderr=self.stderr)
+        fetcher.created = fetcher.updated = 0
+        summarizer = summarize.Command(stdout=self.stdout, stderr=self.stderr)
+        validator = validate.Command(stdout=self.stdout, stderr=self.stderr)
+        validator.max_score = options["max_score"]
+        orchestrator = LLMOrchestrator()
+        checker = FactChecker()
+
+        # Every stage reports back through this one queue, so all database writes happen on this thread
+        events: queue.Queue = queue.Queue()
+        self.slots = threading.Semaphore(options["queue_size"])
+        chunk_ids = count()
+        chunk_remaining: dict[int, int] = {}  # chunk id -> articles of that chunk still in the pipeline
+        in_flight = 0
+        fetching = True
+        fetch_error: Exception | None = None
+        summarized = validated = failed = 0
+        validations: list[Validation] = []
+
+        def leave_pipeline(chunk_id: int) -> None:
+            nonlocal in_flight
+            in_flight -= 1
+            chunk_remaining[chunk_id] -= 1
+            if not chunk_remaining[chunk_id]:
+                del chunk_remaining[chunk_id]
+                self.slots.release()
+
+        def post(kind: str, chunk_id: int, item) -> Callable[[Future], None]:
+            return lambda future: events.put((kind, (chunk_id, item), future))
+
+        summarize_pool = ThreadPoolExecutor(options["summarize_concurrency"], thread_name_prefix="pipeline-summarize")
+        validate_pool = ThreadPoolExecutor(options["validate_concurrency"], thread_name_prefix="pipeline-validate")
+        fetch_thread = self.start_fetching(fetcher, options, events)
+        try:
+            while fetching or in_flight:
+                kind, key, payload = events.get()
+
+                if kind == "fetch_done":
+                    fetching = False
+                elif kind == "fetch_failed":
+                    logger.error("Error fetching month %s: %s", key, str(payload))
+                    if key is None:
+                        # Not one month's failure: the remaining months were never fetched
+                        fetch_error = payload
+                elif kind == "fetched":
+                    try:
+                        fetcher.save_articles(payload)
+                        pending = list(
+                            Article.objects.filter(
+                                pmid__in=[article_data.pmid for article_data in payload], summary__isnull=True
+                            ).only("id", "pmid", "abstract")
+                        )
+                    except DatabaseError as e:
+                        logger.error("Error saving articles for month 2020-%02d: %s", key, str(e))
+                        pending = []
+                    if not pending:
+                        self.slots.release()
+                        continue
+                    chunk_id = next(chunk_ids)
+                    chunk_remaining[chunk_id] = len(pending)
+                    in_flight += len(pending)
+                    for article in pending:
+                        future = summarize_pool.submit(orchestrator.summarize, article.abstract)
+                        future.add_done_callback(post("summarized", chunk_id, article))
+                elif kind == "summarized":
+                    chunk_id, article = key
+                    future: Future = payload
+                    try:
+                        summary = summarizer.save_summary(article, future.result())
+                        summarized += 1
+                    # Broad on purpose, as in summarize: one article's failure must not stop the run
+                    except Exception as e:
+                        logger.error("Error summarizing PMID=%s: %s", article.pmid, str(e))
+                        ITEMS_PROCESSED.inc(stage="summarize", outcome="failed")
+                        failed += 1
+                        leave_pipeline(chunk_id)
+                        continue
+                    future = validate_pool.submit(checker.score, summary.text, article.abstract)
+                    future.add_done_callback(post("validated", chunk_id, summary))
+                elif kind == "validated":
+                    chunk_id, summary = key
+                    try:
+                        score, issues = payload.result()
+                        validations.append(validator.build_validation(summary, score, issues))
+                        if len(validations) >= VALIDATION_BATCH_SIZE:
+                            validated += validator.flush_validations(validations)
+                    # Broad on purpose, as in validate: model output is untrusted, so any error stays with its item
+                    except Exception as e:
+                        logger.error("Failed to validate PMID=%s: %s", summary.article.pmid, str(e))
+                        ITEMS_PROCESSED.inc(stage="validate", outcome="failed")
+                        failed += 1
+                    leave_pipeline(chunk_id)
+        finally:
+            summarize_pool.shutdown(wait=True, cancel_futures=True)
+            validate_pool.shutdown(wait=True, cancel_futures=True)
+            # Keep the validations finished so far, even if the run is stopping on an error
+            validated += validator.flush_validations(validations)
+        fetch_thread.join()
+        if fetch_error is not None:
+            raise fetch_error
+
+        fetcher.report(fetcher.created + fetcher.updated)
+        self.stdout.write(
+            self.style.SUCCESS(f"Pipeline complete: {summarized} summarized, {validated} validated, {failed} failed")
+        )
+
+        if options["synthesize"]:
+            call_command("synthesize", stdout=self.stdout, stderr=self.stderr)
@@ -1,9 +1,13 @@
 import argparse
 import logging
 
-from data_pipeline.models import Article, Summary
+from data_pipeline.models import Article, PipelineRun, Summary
+from data_pipeline.services.concurrency import bounded_map
 from data_pipeline.services.llm_orchestrator.agent import LLMOrchestrator
-from django.core.management.base import BaseCommand
+from data_pipeline.services.metrics import ITEMS_PROCESSED, push_metrics
+from data_pipeline.services.run_tracker import RunNotResumable, RunTracker
+from data_pipeline.services.telemetry import record_llm_calls
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from tqdm import tqdm
 
@@ -20,43 +24,92 @@ class Command(BaseCommand):
             default=100,
             help="Number of articles to process in each batch",
         )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of LLM summarization requests to keep in flight",
+        )
+        parser.add_argument(
+            "--resume",
+            type=int,
+            default=None,
+            metavar="RUN_ID",
+            help="Continue an earlier run: retry its failed articles and those past its cursor",
+        )
 
-    def process_article(self, orchestrator: LLMOrchestrator, article: str) -> bool:
-        """Process a single article and generate its summary."""
-        try:
-            summary_text = orchestrator.summarize(article.abstract)
-            with transaction.atomic():
-                Summary.objects.create(
-                    article=article,
-                    text=summary_text,
-                )
-            logger.info("Saved summary for PMID=%s", article.pmid)
-            return True
-        except Exception as e:  # TODO: Be more specific with exceptions
-            logger.error("Error summarizing PMID=%s: %s", article.pmid, str(e))
-            return False
+    def save_summary(self, article: Article, summary_text: str) -> Summary:
+        with transaction.atomic():
+            summary = Summary.objects.create(
+                article=article,
+                text=summary_text,
+            )
+        ITEMS_PROCESSED.inc(stage="summarize", outcome="succeeded")
+        logger.info("Saved summary for PMID=%s", article.pmid)
+        return summary
+
+    def process_articles_concurrently(
+        self, orchestrator: LLMOrchestrator, articles, concurrency: int, pbar, tracker: RunTracker, batch_size: int
+    ) -> int:
+        """
+        Summarize with up to `concurrency` LLM calls in flight. Summaries are saved on this
+        thread as each call completes, so database access never leaves the main thread.
+        The run's progress is checkpointed every `batch_size` articles.
+        """
+        successful = 0
+        articles = tracker.track(articles)
+        results = bounded_map(lambda article: orchestrator.summarize(article.abstract), articles, concurrency)
+        for processed, (article, summary_text, error) in enumerate(results, start=1):
+            try:
+                if error is not None:
+                    raise error
+                self.save_summary(article, summary_text)
+                tracker.succeeded([article.pk])
+                successful += 1
+            except Exception as e:  # TODO: Be more specific with exceptions
+                logger.error("Error summarizing PMID=%s: %s", article.pmid, str(e))
+                tracker.failed(article.pk, e)
+            if processed % batch_size == 0:
+                tracker.checkpoint()
+            pbar.update(1)
+        return successful
 
+    @push_metrics
+    @record_llm_calls
     def handle(self, *args, **options):
         orchestrator = LLMOrchestrator()
         batch_size = options["batch_size"]
+        concurrency = options["concurrency"]
 
-        # Select articles that have no summary yet
-        articles = Article.objects.filter(summary__isnull=True).order_by("pub_date")
-        total = articles.count()
+        # Select articles that have no summary yet, in pk order so the run's cursor can track progress
+        pending = Article.objects.filter(summary__isnull=True)
+        parameters = {"batch_size": batch_size, "concurrency": concurrency}
+        try:
+            tracker, articles, total = RunTracker.open("summarize", pending, parameters, options["resume"])
+        except RunNotResumable as e:
+            raise CommandError(str(e))
+        self.llm_calls.pipeline_run = tracker.run
 
         if not total:
             logger.info("No articles found requiring summarization")
+            tracker.finish()
             return
 
         logger.info("Found %s articles to summarize", total)
         successful = 0
 
         # Process articles with progress bar
-        with tqdm(total=total, desc="Generating summaries") as pbar:
-            for article in articles.iterator(chunk_size=batch_size):
-                if self.process_article(orchestrator, article):
-                    successful += 1
-                pbar.update(1)
+        try:
+            with tqdm(total=total, desc="Generating summaries") as pbar:
+                successful = self.process_articles_concurrently(
+                    orchestrator, articles.iterator(chunk_size=batch_size), concurrency, pbar, tracker, batch_size
+                )
+        except BaseException:
+            tracker.finish(PipelineRun.Status.FAILED)
+            raise
+        tracker.finish()
 
         logger.info("Completed summarization. Success: %s/%s", successful, total)
-        self.stdout.write(self.style.SUCCESS(f"Generated {successful} summaries out of {total}"))
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated {successful} summaries out of {total} (run #{tracker.run.pk})")
+        )
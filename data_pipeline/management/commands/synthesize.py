@@ -1,9 +1,13 @@
 import argparse
 import logging
+import time
+from collections.abc import Iterator
 
-from data_pipeline.models import Summary, TrendReport
-from data_pipeline.services.fact_checker.agent import FactChecker
-from data_pipeline.services.llm_orchestrator.agent import LLMOrchestrator
+from data_pipeline.models import PartialSynthesis, Summary, TrendReport
+from data_pipeline.services.fact_checker.agent import DEFAULT_EVIDENCE_K, FactChecker
+from data_pipeline.services.llm_orchestrator.agent import DEFAULT_SYNTHESIS_TOKEN_BUDGET, LLMOrchestrator
+from data_pipeline.services.metrics import push_metrics
+from data_pipeline.services.telemetry import record_llm_calls
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
@@ -11,6 +15,7 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_MIN_SUMMARIES = 3
 DEFAULT_MAX_SCORE = 0.3
+DEFAULT_CHECKPOINT_INTERVAL = 5.0
 
 
 class Command(BaseCommand):
@@ -29,6 +34,51 @@ class Command(BaseCommand):
             default=DEFAULT_MAX_SCORE,
             help="Maximum acceptable hallucination score",
         )
+        parser.add_argument(
+            "--map-reduce",
+            action="store_true",
+            help="Synthesize each month separately, then merge the partial reports",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Map-reduce synthesis that reuses stored monthly partials whose summaries have not changed",
+        )
+        parser.add_argument(
+            "--token-budget",
+            type=int,
+            default=DEFAULT_SYNTHESIS_TOKEN_BUDGET,
+            help="Approximate maximum input tokens per LLM call in map-reduce and incremental modes",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of LLM calls to run at once in map-reduce and incremental modes and grounded fact-checking",
+        )
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="Print the article as it is generated and checkpoint it into a draft TrendReport",
+        )
+        parser.add_argument(
+            "--checkpoint-interval",
+            type=float,
+            default=DEFAULT_CHECKPOINT_INTERVAL,
+            help="Seconds between saves of the partial article while streaming",
+        )
+        parser.add_argument(
+            "--check-mode",
+            choices=["full", "grounded"],
+            default="full",
+            help="Fact-check against all summaries at once, or each passage against its best-matching summaries",
+        )
+        parser.add_argument(
+            "--evidence-k",
+            type=int,
+            default=DEFAULT_EVIDENCE_K,
+            help="Number of summaries retrieved as evidence for each passage in grounded mode",
+        )
 
     def gather_summaries(self):
         """Gather all layperson summaries from the database."""
@@ -36,7 +86,20 @@ class Command(BaseCommand):
         logger.info("Found %s summaries for analysis", len(summaries))
         return summaries
 
-    def generate_trends(self, orchestrator: LLMOrchestrator, summaries: list[str]) -> None:
+    def gather_summary_rows_by_month(self) -> dict[str, list[tuple[int, str]]]:
+        """Gather (pk, text) for every summary, grouped by its article's publication month, in date order."""
+        groups: dict[str, list[tuple[int, str]]] = {}
+        rows = Summary.objects.order_by("article__pub_date", "pk").values_list("pk", "article__pub_date", "text")
+        for pk, pub_date, text in rows:
+            groups.setdefault(f"{pub_date:%B %Y}", []).append((pk, text))
+        logger.info("Found %s summaries across %s months", sum(len(rows) for rows in groups.values()), len(groups))
+        return groups
+
+    def gather_summaries_by_month(self) -> dict[str, list[str]]:
+        """Gather summaries grouped by their article's publication month, in date order."""
+        return {label: [text for _, text in rows] for label, rows in self.gather_summary_rows_by_month().items()}
+
+    def generate_trends(self, orchestrator: LLMOrchestrator, summaries: list[str]) -> str:
         """Generate trends article from summaries."""
         try:
             article_text = orchestrator.synthesize_trends(summaries)
@@ -46,6 +109,117 @@ class Command(BaseCommand):
             logger.error("Failed to generate trends article: %s", str(e))
             raise
 
+    def generate_trends_map_reduce(
+        self, orchestrator: LLMOrchestrator, groups: dict[str, list[str]], token_budget: int, concurrency: int
+    ) -> str:
+        """Generate trends article with per-month partial syntheses merged hierarchically."""
+        try:
+            article_text = orchestrator.synthesize_trends_map_reduce(groups, token_budget, concurrency)
+            logger.info("Successfully generated trends article from %s monthly groups", len(groups))
+            return article_text
+        except Exception as e:
+            logger.error("Failed to generate trends article: %s", str(e))
+            raise
+
+    def update_partials(
+        self,
+        orchestrator: LLMOrchestrator,
+        rows_by_month: dict[str, list[tuple[int, str]]],
+        token_budget: int,
+        concurrency: int,
+    ) -> list[str]:
+        """
+        Bring the stored monthly partial syntheses up to date and return them in month order.
+        Only months whose summaries (or prompts) changed since they were stored are regenerated.
+        """
+        stored = {partial.period: partial for partial in PartialSynthesis.objects.all()}
+        fingerprints = {
+            label: orchestrator.partial_fingerprint(label, [text for _, text in rows], token_budget)
+            for label, rows in rows_by_month.items()
+        }
+        stale = {
+            label: [text for _, text in rows]
+            for label, rows in rows_by_month.items()
+            if label not in stored or stored[label].fingerprint != fingerprints[label]
+        }
+        reused = len(rows_by_month) - len(stale)
+        self.stdout.write(f"Reusing {reused} of {len(rows_by_month)} monthly partial syntheses")
+
+        try:
+            fresh = orchestrator.map_partials(stale, token_budget, concurrency)
+        except Exception as e:
+            logger.error("Failed to generate partial syntheses: %s", str(e))
+            raise
+
+        with transaction.atomic():
+            PartialSynthesis.objects.bulk_create(
+                [
+                    PartialSynthesis(
+                        period=label,
+                        summary_ids=[pk for pk, _ in rows_by_month[label]],
+                        fingerprint=fingerprints[label],
+                        text=text,
+                    )
+                    for label, text in fresh.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["period"],
+                update_fields=["summary_ids", "fingerprint", "text", "updated_at"],
+            )
+            # Months whose summaries have all gone should not linger into the next report
+            PartialSynthesis.objects.exclude(period__in=list(rows_by_month)).delete()
+        logger.info("Regenerated %s monthly partial syntheses", len(fresh))
+
+        return [fresh[label] if label in fresh else stored[label].text for label in rows_by_month]
+
+    def generate_trends_incremental(
+        self,
+        orchestrator: LLMOrchestrator,
+        rows_by_month: dict[str, list[tuple[int, str]]],
+        token_budget: int,
+        concurrency: int,
+    ) -> str:
+        """Generate trends article from stored partial syntheses, refreshing only the months that changed."""
+        reports = self.update_partials(orchestrator, rows_by_month, token_budget, concurrency)
+        try:
+            article_text = orchestrator.write_from_partials(reports, token_budget, concurrency)
+            logger.info("Successfully generated trends article from %s monthly partials", len(reports))
+            return article_text
+        except Exception as e:
+            logger.error("Failed to generate trends article: %s", str(e))
+            raise
+
+    def checkpoint(self, draft: TrendReport, text: str) -> None:
+        """Persist the text generated so far, outside any transaction so it survives a crash."""
+        TrendReport.objects.filter(pk=draft.pk).update(text=text)
+
+    def generate_trends_streaming(self, chunks: Iterator[str], checkpoint_interval: float) -> tuple[TrendReport, str]:
+        """
+        Echo the article to stdout as it is generated, saving it into a draft TrendReport
+        every `checkpoint_interval` seconds. Whatever was generated is kept in the draft
+        if generation fails or is interrupted.
+        """
+        draft = TrendReport.objects.create(text="", issues=[], status=TrendReport.Status.DRAFT)
+        logger.info("Streaming trends article into draft TrendReport #%s", draft.pk)
+        parts: list[str] = []
+        started = last_checkpoint = time.monotonic()
+        try:
+            for chunk in chunks:
+                if not parts:
+                    logger.info("First token after %.2fs", time.monotonic() - started)
+                parts.append(chunk)
+                self.stdout.write(chunk, ending="")
+                self.stdout.flush()
+                if time.monotonic() - last_checkpoint >= checkpoint_interval:
+                    self.checkpoint(draft, "".join(parts))
+                    last_checkpoint = time.monotonic()
+        finally:
+            self.checkpoint(draft, "".join(parts))
+        self.stdout.write("")
+
+        logger.info("Successfully generated trends article in %.2fs", time.monotonic() - started)
+        return draft, "".join(parts).strip()
+
     def check_facts(self, checker: FactChecker, article_text: str, source_text: str) -> tuple[float, list[str]]:
         """Validate the generated article against source summaries."""
         try:
@@ -56,20 +230,41 @@ class Command(BaseCommand):
             logger.error("Failed to complete fact checking: %s", str(e))
             raise
 
-    def save_report(self, article_text: str, issues: list[str]) -> TrendReport:
-        """Save the trends report to the database."""
+    def check_facts_grounded(
+        self, checker: FactChecker, article_text: str, summaries: list[str], evidence_k: int, concurrency: int
+    ) -> tuple[float, list[str]]:
+        """Validate each passage of the article against the summaries retrieved for it."""
+        try:
+            score, issues = checker.score_grounded(article_text, summaries, evidence_k, concurrency)
+            logger.info("Grounded fact check completed - Score: %s", score)
+            return score, issues
+        except Exception as e:
+            logger.error("Failed to complete fact checking: %s", str(e))
+            raise
+
+    def save_report(self, article_text: str, issues: list[str], draft: TrendReport | None = None) -> TrendReport:
+        """Save the trends report to the database, completing the streamed draft if there is one."""
         try:
             with transaction.atomic():
-                report = TrendReport.objects.create(
-                    text=article_text,
-                    issues=issues,
-                )
+                if draft is None:
+                    report = TrendReport.objects.create(
+                        text=article_text,
+                        issues=issues,
+                    )
+                else:
+                    report = draft
+                    report.text = article_text
+                    report.issues = issues
+                    report.status = TrendReport.Status.COMPLETE
+                    report.save(update_fields=["text", "issues", "status"])
             logger.info("Saved TrendReport #%s", report.pk)
             return report
         except Exception as e:
             logger.error("Failed to save trend report: %s", str(e))
             raise
 
+    @push_metrics
+    @record_llm_calls
     def handle(self, *args, **options):
         try:
             # Initialize services
@@ -77,7 +272,14 @@ class Command(BaseCommand):
             checker = FactChecker()
 
             # Gather summaries
-            summaries = self.gather_summaries()
+            if options["incremental"]:
+                rows_by_month = self.gather_summary_rows_by_month()
+                summaries = [text for rows in rows_by_month.values() for _, text in rows]
+            elif options["map_reduce"]:
+                groups = self.gather_summaries_by_month()
+                summaries = [text for texts in groups.values() for text in texts]
+            else:
+                summaries = self.gather_summaries()
             if len(summaries) < options["min_summaries"]:
                 msg = f"Insufficient summaries: {len(summaries)} < {options['min_summaries']}"
                 logger.error(msg)
@@ -86,12 +288,40 @@ class Command(BaseCommand):
 
             # Generate trends article
             self.stdout.write(f"Generating trends article from {len(summaries)} summaries...")
-            article_text = self.generate_trends(orchestrator, summaries)
+            draft = None
+            if options["stream"]:
+                if options["incremental"]:
+                    reports = self.update_partials(
+                        orchestrator, rows_by_month, options["token_budget"], options["concurrency"]
+                    )
+                    chunks = orchestrator.stream_from_partials(reports, options["token_budget"], options["concurrency"])
+                elif options["map_reduce"]:
+                    chunks = orchestrator.stream_trends_map_reduce(
+                        groups, options["token_budget"], options["concurrency"]
+                    )
+                else:
+                    chunks = orchestrator.stream_trends(summaries)
+                draft, article_text = self.generate_trends_streaming(chunks, options["checkpoint_interval"])
+            elif options["incremental"]:
+                article_text = self.generate_trends_incremental(
+                    orchestrator, rows_by_month, options["token_budget"], options["concurrency"]
+                )
+            elif options["map_reduce"]:
+                article_text = self.generate_trends_map_reduce(
+                    orchestrator, groups, options["token_budget"], options["concurrency"]
+                )
+            else:
+                article_text = self.generate_trends(orchestrator, summaries)
 
-            # TODO: this needs a specialised prompt to verify the trends article and flag unsuported claims
             # Fact-check the article
             self.stdout.write("Fact-checking article...")
-            score, issues = self.check_facts(checker, article_text, "\n\n".join(summaries))
+            if options["check_mode"] == "grounded":
+                score, issues = self.check_facts_grounded(
+                    checker, article_text, summaries, options["evidence_k"], options["concurrency"]
+                )
+            else:
+                # TODO: this needs a specialised prompt to verify the trends article and flag unsuported claims
+                score, issues = self.check_facts(checker, article_text, "\n\n".join(summaries))
 
             if score > options["max_score"]:
                 msg = f"Hallucination score too high: {score} > {options['max_score']}"
@@ -99,7 +329,7 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(msg))
 
             # Save the report
-            report = self.save_report(article_text, issues)
+            report = self.save_report(article_text, issues, draft)
 
             self.stdout.write(self.style.SUCCESS(f"TrendReport #{report.pk} saved (hallucination score: {score:.2f})"))
 
@@ -1,11 +1,15 @@
+import asyncio
 from datetime import date
 
 import pytest
 import responses
-from data_pipeline.models import Article
-from data_pipeline.services.enums import PubMedURLs
+from data_pipeline.models import Article, FetchState
+from data_pipeline.services.async_pubmed_client import AsyncPubMedClient
+from data_pipeline.services.enums import ArticleData, PubMedURLs
 from data_pipeline.services.pubmed_client import PubMedClient
 from django.core.management import call_command
+from responses import matchers
+from tenacity import wait_none
 
 
 @pytest.mark.django_db
@@ -61,8 +65,8 @@ def test_fetch_creates_articles() -> None:
     )
 
     # Act
-    # Run the command (MONTH_RANGE=2 → only month=1)
-    call_command("fetch_data", month_range=2)
+    # Run the command (MONTH_RANGE=1 → only month=1)
+    call_command("fetch_data", month_range=1)
 
     # Assert
     articles = Article.objects.all()
@@ -78,7 +82,7 @@ def test_fetch_creates_articles() -> None:
 
 @pytest.mark.django_db
 @responses.activate
-def test_fetch_updates_existing_article() -> None:
+def test_fetch_updates_existing_article(capsys: pytest.CaptureFixture) -> None:
     """Test that fetch_data updates an existing article."""
     # Arrange
     responses.add(
@@ -154,6 +158,10 @@ def test_fetch_updates_existing_article() -> None:
     call_command("fetch_data")
     article.refresh_from_db()
     assert article.title == "Title B"
+    assert Article.objects.count() == 1
+    out = capsys.readouterr().out
+    assert "Fetch complete: 1 created, 0 updated" in out
+    assert "Fetch complete: 0 created, 1 updated" in out
 
 
 @pytest.mark.django_db
@@ -172,3 +180,292 @@ def test_fetch_handles_api_error(caplog):
     assert Article.objects.count() == 0
     # Error should be logged
     assert "Error processing month 2020-01" in caplog.text
+
+
+def build_efetch_xml(ids: list[str]) -> str:
+    """Minimal EFetch XML for the given PMIDs, all published in January 2020."""
+    articles_xml = "".join(
+        f"""
+        <PubmedArticle>
+          <MedlineCitation>
+            <PMID>{id}</PMID>
+            <Article>
+              <Journal>
+                <JournalIssue>
+                  <PubDate><Year>2020</Year><Month>01</Month><Day>{int(id):02d}</Day></PubDate>
+                </JournalIssue>
+              </Journal>
+              <ArticleTitle>Title {id}</ArticleTitle>
+              <Abstract><AbstractText>Abstract text {id}</AbstractText></Abstract>
+            </Article>
+          </MedlineCitation>
+        </PubmedArticle>"""
+        for id in ids
+    )
+    return f"<PubmedArticleSet>{articles_xml}</PubmedArticleSet>"
+
+
+@pytest.mark.django_db
+@responses.activate
+def test_fetch_in_batches_pages_esearch_and_posts_efetch_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    """With --batch-size, ESearch is paged and EFetch is POSTed one chunk at a time."""
+    # Arrange
+    monkeypatch.setattr(PubMedClient.send_efetch.retry, "wait", wait_none())
+    responses.add(
+        responses.GET,
+        PubMedURLs.ESEARCH_URL,
+        json={"esearchresult": {"idlist": ["1", "2", "3"]}},
+        status=200,
+        match=[matchers.query_param_matcher({"retstart": "0"}, strict_match=False)],
+    )
+    for ids in (["1", "2"], ["3"]):
+        responses.add(
+            responses.POST,
+            PubMedURLs.EFETCH_URL,
+            body=build_efetch_xml(ids),
+            status=200,
+            content_type="application/xml",
+            match=[matchers.urlencoded_params_matcher({"db": "pubmed", "id": ",".join(ids), "retmode": "xml"})],
+        )
+
+    # Act
+    call_command("fetch_data", per_month=3, batch_size=2)
+
+    # Assert
+    assert sorted(Article.objects.values_list("pmid", flat=True)) == ["1", "2", "3"]
+    efetch_calls = [call for call in responses.calls if call.request.url == PubMedURLs.EFETCH_URL]
+    assert len(efetch_calls) == 2
+    assert all(call.request.method == "POST" for call in efetch_calls)
+
+
+@pytest.mark.django_db
+@responses.activate
+def test_fetch_in_batches_skips_failed_chunk(monkeypatch: pytest.MonkeyPatch, caplog) -> None:
+    """A chunk that keeps failing is skipped; the other chunks are still saved."""
+    # Arrange
+    monkeypatch.setattr(PubMedClient.send_efetch.retry, "wait", wait_none())
+    responses.add(
+        responses.GET,
+        PubMedURLs.ESEARCH_URL,
+        json={"esearchresult": {"idlist": ["1", "2", "3"]}},
+        status=200,
+    )
+    responses.add(
+        responses.POST,
+        PubMedURLs.EFETCH_URL,
+        status=500,
+        match=[matchers.urlencoded_params_matcher({"db": "pubmed", "id": "1,2", "retmode": "xml"})],
+    )
+    responses.add(
+        responses.POST,
+        PubMedURLs.EFETCH_URL,
+        body=build_efetch_xml(["3"]),
+        status=200,
+        content_type="application/xml",
+        match=[matchers.urlencoded_params_matcher({"db": "pubmed", "id": "3", "retmode": "xml"})],
+    )
+    caplog.set_level("ERROR")
+
+    # Act
+    call_command("fetch_data", per_month=3, batch_size=2)
+
+    # Assert
+    assert list(Article.objects.values_list("pmid", flat=True)) == ["3"]
+    assert "Failed to fetch chunk of 2 PMIDs starting at 1" in caplog.text
+
+
+@pytest.mark.django_db
+@responses.activate
+def test_fetch_with_history_pages_efetch_by_webenv() -> None:
+    """With --use-history, EFetch pages are requested by WebEnv/query_key, never by PMID."""
+    # Arrange
+    responses.add(
+        responses.GET,
+        PubMedURLs.ESEARCH_URL,
+        json={"esearchresult": {"count": "3", "webenv": "WEBENV1", "querykey": "1", "idlist": []}},
+        status=200,
+        match=[matchers.query_param_matcher({"usehistory": "y"}, strict_match=False)],
+    )
+    for retstart, ids in ((0, ["1", "2"]), (2, ["3"])):
+        responses.add(
+            responses.GET,
+            PubMedURLs.EFETCH_URL,
+            body=build_efetch_xml(ids),
+            status=200,
+            content_type="application/xml",
+            match=[
+                matchers.query_param_matcher(
+                    {"WebEnv": "WEBENV1", "query_key": "1", "retstart": str(retstart), "retmax": str(len(ids))},
+                    strict_match=False,
+                )
+            ],
+        )
+
+    # Act
+    call_command("fetch_data", per_month=10, batch_size=2, use_history=True)
+
+    # Assert
+    assert sorted(Article.objects.values_list("pmid", flat=True)) == ["1", "2", "3"]
+    efetch_calls = [call for call in responses.calls if call.request.url.startswith(PubMedURLs.EFETCH_URL)]
+    assert len(efetch_calls) == 2
+    assert all("id=" not in call.request.url for call in efetch_calls)
+
+
+@pytest.mark.django_db
+def test_fetch_with_concurrency_fetches_months_in_parallel(monkeypatch: pytest.MonkeyPatch, caplog) -> None:
+    """With --concurrency, months are fetched by the async client and saved on the command's thread."""
+    # Arrange
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_iter_fetch(self, query, start_date, end_date, limit, chunk_size, use_history):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        if start_date.month == 3:
+            raise RuntimeError("NCBI unavailable")
+        yield [
+            ArticleData(
+                pmid=f"{start_date.month}00",
+                title=f"Title {start_date.month}",
+                abstract="Abstract",
+                pub_date=start_date,
+            )
+        ]
+
+    monkeypatch.setattr(AsyncPubMedClient, "iter_fetch", fake_iter_fetch)
+    caplog.set_level("ERROR")
+
+    # Act
+    call_command("fetch_data", month_range=4, concurrency=4)
+
+    # Assert
+    assert sorted(Article.objects.values_list("pmid", flat=True)) == ["100", "200", "400"]
+    assert max_in_flight > 1
+    assert "Error processing month 2020-03: NCBI unavailable" in caplog.text
+
+
+@pytest.mark.django_db
+def test_fetch_with_concurrency_raises_when_the_fetch_thread_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A failure outside any one month is raised by the command instead of quietly skipping the remaining months."""
+    # Arrange
+
+    async def broken_aenter(self):
+        raise RuntimeError("event loop broke")
+
+    monkeypatch.setattr(AsyncPubMedClient, "__aenter__", broken_aenter)
+
+    # Act and Assert
+    with pytest.raises(RuntimeError, match="event loop broke"):
+        call_command("fetch_data", month_range=2, concurrency=2)
+    assert not Article.objects.exists()
+
+
+@pytest.mark.django_db
+@responses.activate
+def test_fetch_incremental_skips_unchanged_window() -> None:
+    """
+    The first incremental run fetches the window and records a watermark; the next run
+    only asks ESearch for modified records and skips EFetch when there are none.
+    """
+    # Arrange: first run sees two PMIDs by publication date
+    responses.add(
+        responses.GET,
+        PubMedURLs.ESEARCH_URL,
+        json={"esearchresult": {"idlist": ["1", "2"]}},
+        match=[matchers.query_param_matcher({"datetype": "pdat"}, strict_match=False)],
+    )
+    responses.add(
+        responses.POST,
+        PubMedURLs.EFETCH_URL,
+        body=build_efetch_xml(["1", "2"]),
+        content_type="application/xml",
+    )
+
+    # Act
+    call_command("fetch_data", incremental=True)
+
+    # Assert
+    state = FetchState.objects.get()
+    assert state.start_date == date(2020, 1, 1)
+    assert state.end_date == date(2020, 1, 31)
+    assert state.pmids == ["1", "2"]
+    assert state.article_count == 2
+    first_run_at = state.last_run_at
+
+    # Arrange: nothing modified since the watermark
+    responses.calls.reset()
+    responses.add(
+        responses.GET,
+        PubMedURLs.ESEARCH_URL,
+        json={"esearchresult": {"idlist": []}},
+        match=[
+            matchers.query_param_matcher(
+                {"datetype": "mdat", "mindate": first_run_at.date().isoformat()}, strict_match=False
+            )
+        ],
+    )
+
+    # Act
+    call_command("fetch_data", incremental=True)
+
+    # Assert
+    assert len(responses.calls) == 1
+    assert "2020%2F01%2F01%3A2020%2F01%2F31%5Bdp%5D" in responses.calls[0].request.url
+    state.refresh_from_db()
+    assert state.last_run_at > first_run_at
+    assert state.article_count == 2
+
+
+@pytest.mark.django_db
+@responses.activate
+def test_fetch_incremental_keeps_watermark_when_a_chunk_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A failed EFetch chunk leaves the watermark in place, so the next run asks for those PMIDs again."""
+    # Arrange: ESearch finds three PMIDs; the chunk "1,2" keeps failing while "3" succeeds
+    monkeypatch.setattr(PubMedClient.send_efetch.retry, "wait", wait_none())
+    responses.add(responses.GET, PubMedURLs.ESEARCH_URL, json={"esearchresult": {"idlist": ["1", "2", "3"]}})
+
+    def efetch(request):
+        if "id=1%2C2" in request.body:
+            return 500, {}, "unavailable"
+        return 200, {"Content-Type": "application/xml"}, build_efetch_xml(["3"])
+
+    responses.add_callback(responses.POST, PubMedURLs.EFETCH_URL, callback=efetch)
+
+    # Act
+    call_command("fetch_data", incremental=True, batch_size=2)
+
+    # Assert
+    assert list(Article.objects.values_list("pmid", flat=True)) == []
+    state = FetchState.objects.get()
+    assert state.last_run_at is None
+    assert state.pmids == []
+
+
+@pytest.mark.django_db
+@responses.activate
+def test_fetch_incremental_carries_on_after_a_month_fails_to_parse(caplog) -> None:
+    """A record that cannot be parsed stops only its own month; later months are still fetched."""
+    # Arrange: January's only record has a textual month, February's is well formed
+    responses.add(responses.GET, PubMedURLs.ESEARCH_URL, json={"esearchresult": {"idlist": ["1"]}})
+    responses.add(responses.GET, PubMedURLs.ESEARCH_URL, json={"esearchresult": {"idlist": ["2"]}})
+    responses.add(
+        responses.POST,
+        PubMedURLs.EFETCH_URL,
+        body=build_efetch_xml(["1"]).replace("<Month>01</Month>", "<Month>Jan</Month>"),
+        content_type="application/xml",
+    )
+    responses.add(responses.POST, PubMedURLs.EFETCH_URL, body=build_efetch_xml(["2"]), content_type="application/xml")
+    caplog.set_level("ERROR")
+
+    # Act
+    call_command("fetch_data", incremental=True, month_range=2)
+
+    # Assert
+    assert list(Article.objects.values_list("pmid", flat=True)) == ["2"]
+    january, february = FetchState.objects.order_by("start_date")
+    assert january.last_run_at is None
+    assert february.last_run_at is not None
+    assert "Error processing month 2020-01" in caplog.text
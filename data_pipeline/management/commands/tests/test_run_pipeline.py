@@ -0,0 +1,88 @@
+import threading
+from datetime import date
+
+import pytest
+from data_pipeline.management.commands import fetch_data
+from data_pipeline.models import Summary, Validation
+from data_pipeline.services.enums import ArticleData
+from data_pipeline.services.fact_checker.agent import FactChecker
+from data_pipeline.services.llm_orchestrator.agent import LLMOrchestrator
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+def test_run_pipeline_overlaps_fetch_with_summarize_and_validate(monkeypatch: pytest.MonkeyPatch):
+    """
+    Articles from the first fetched chunk are summarized and validated while the second
+    chunk is still being fetched, and every article ends up with a Summary and Validation.
+    """
+    # Arrange: the fetch of chunk two waits until something from chunk one has been summarized
+    first_summary = threading.Event()
+    overlapped = []
+
+    def fake_fetch(self, months, per_month, batch_size, use_history, concurrency, cache=None):
+        yield 1, [ArticleData(pmid="1", title="T1", abstract="A1", pub_date=date(2020, 1, 1))]
+        overlapped.append(first_summary.wait(timeout=5))
+        yield 1, [ArticleData(pmid="2", title="T2", abstract="A2", pub_date=date(2020, 1, 2))]
+        yield 1, None
+
+    def fake_summarize(self, abstract):
+        first_summary.set()
+        return f"Summary of {abstract}"
+
+    monkeypatch.setattr(fetch_data.Command, "fetch_months_concurrently", fake_fetch)
+    monkeypatch.setattr(LLMOrchestrator, "summarize", fake_summarize)
+    monkeypatch.setattr(FactChecker, "score", lambda self, summary, abstract: (0, []))
+
+    # Act
+    call_command("run_pipeline", summarize_concurrency=2, validate_concurrency=2, queue_size=1)
+
+    # Assert
+    assert overlapped == [True]
+    assert dict(Summary.objects.values_list("article__pmid", "text")) == {"1": "Summary of A1", "2": "Summary of A2"}
+    assert Validation.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_run_pipeline_keeps_going_when_one_verdict_is_malformed(monkeypatch: pytest.MonkeyPatch):
+    """An unexpected error from one item's fact check fails only that item; the rest are validated."""
+
+    # Arrange: the verdict for A2 is a JSON list, so reading its score raises AttributeError
+    def fake_fetch(self, months, per_month, batch_size, use_history, concurrency, cache=None):
+        yield 1, [
+            ArticleData(pmid=str(i), title=f"T{i}", abstract=f"A{i}", pub_date=date(2020, 1, i)) for i in range(1, 5)
+        ]
+        yield 1, None
+
+    def fake_score(self, summary, abstract):
+        data = [] if abstract == "A2" else {"score": 0, "issues": []}
+        return data.get("score", 0), data.get("issues", [])
+
+    monkeypatch.setattr(fetch_data.Command, "fetch_months_concurrently", fake_fetch)
+    monkeypatch.setattr(LLMOrchestrator, "summarize", lambda self, abstract: f"Summary of {abstract}")
+    monkeypatch.setattr(FactChecker, "score", fake_score)
+
+    # Act
+    call_command("run_pipeline")
+
+    # Assert
+    assert sorted(Validation.objects.values_list("summary__article__pmid", flat=True)) == ["1", "3", "4"]
+
+
+@pytest.mark.django_db
+def test_run_pipeline_raises_when_fetching_fails_but_keeps_finished_work(monkeypatch: pytest.MonkeyPatch):
+    """A failure of the fetch itself stops the command with that error once in-flight articles are done."""
+
+    # Arrange
+    def fake_fetch(self, months, per_month, batch_size, use_history, concurrency, cache=None):
+        yield 1, [ArticleData(pmid="1", title="T1", abstract="A1", pub_date=date(2020, 1, 1))]
+        raise RuntimeError("event loop broke")
+
+    monkeypatch.setattr(fetch_data.Command, "fetch_months_concurrently", fake_fetch)
+    monkeypatch.setattr(LLMOrchestrator, "summarize", lambda self, abstract: f"Summary of {abstract}")
+    monkeypatch.setattr(FactChecker, "score", lambda self, summary, abstract: (0, []))
+
+    # Act and Assert
+    with pytest.raises(RuntimeError, match="event loop broke"):
+        call_command("run_pipeline")
+    assert Validation.objects.count() == 1
@@ -1,5 +1,8 @@
+import threading
+import time
+
 import pytest
-from data_pipeline.models import Article, Summary
+from data_pipeline.models import Article, PipelineRun, RunFailure, Summary
 from data_pipeline.services.llm_orchestrator.agent import LLMOrchestrator
 from django.core.management import call_command
 
@@ -95,3 +98,83 @@ def test_summarize_continues_on_error(monkeypatch: pytest.MonkeyPatch, caplog: p
     # And the second article should succeed
     summary = Summary.objects.get(article=article2)
     assert summary.text == "OK"
+
+
+@pytest.mark.django_db
+def test_summarize_with_concurrency_keeps_requests_in_flight(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture, capsys: pytest.CaptureFixture
+):
+    """
+    With --concurrency, several LLM calls run at once, every successful result is saved
+    and a failure is still isolated to its own article.
+    """
+    # Arrange: five articles, one of which fails
+    for i in range(1, 6):
+        Article.objects.create(
+            pmid=str(300 + i), title=f"Title{i}", abstract=f"Abstract{i}", pub_date=f"2020-01-0{i}", raw_json={}
+        )
+
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def slow_summarize(self, abstract):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        if abstract == "Abstract3":
+            raise RuntimeError("LLM service down")
+        return f"Summary of '{abstract}'"
+
+    monkeypatch.setattr(LLMOrchestrator, "summarize", slow_summarize)
+    caplog.set_level("ERROR")
+
+    # Act
+    call_command("summarize", concurrency=3)
+
+    # Assert
+    assert 1 < max_in_flight <= 3
+    assert Summary.objects.count() == 4
+    assert Summary.objects.get(article__pmid="305").text == "Summary of 'Abstract5'"
+    assert "Error summarizing PMID=303: LLM service down" in caplog.text
+    assert "Generated 4 summaries out of 5" in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+def test_summarize_resume_retries_only_failed_articles(monkeypatch: pytest.MonkeyPatch):
+    """
+    A run records its failures; --resume retries just those, without calling the LLM
+    for articles the run already finished, and marks the failures resolved.
+    """
+    # Arrange: the first run fails on one of three articles
+    for i in range(1, 4):
+        Article.objects.create(pmid=str(400 + i), title=f"T{i}", abstract=f"A{i}", pub_date="2020-01-01", raw_json={})
+
+    def flaky_summarize(self, abstract):
+        if abstract == "A2":
+            raise TimeoutError("slow")
+        return "ok"
+
+    monkeypatch.setattr(LLMOrchestrator, "summarize", flaky_summarize)
+    call_command("summarize")
+    run = PipelineRun.objects.get()
+    failure = RunFailure.objects.get(run=run)
+    assert (run.status, run.succeeded, run.failed) == (PipelineRun.Status.COMPLETED, 2, 1)
+    assert (failure.error_class, failure.message) == ("TimeoutError", "slow")
+
+    calls = []
+    monkeypatch.setattr(LLMOrchestrator, "summarize", lambda self, abstract: calls.append(abstract) or "retried")
+
+    # Act
+    call_command("summarize", resume=run.pk)
+
+    # Assert
+    run.refresh_from_db()
+    assert calls == ["A2"]
+    assert Summary.objects.get(article__pmid="402").text == "retried"
+    assert (run.succeeded, run.failed, run.resume_count) == (3, 0, 1)
+    assert RunFailure.objects.get(run=run).resolved
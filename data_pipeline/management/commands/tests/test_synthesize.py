@@ -1,5 +1,5 @@
 import pytest
-from data_pipeline.models import Article, Summary, TrendReport
+from data_pipeline.models import Article, PartialSynthesis, Summary, TrendReport
 from data_pipeline.services.fact_checker.agent import FactChecker
 from data_pipeline.services.llm_orchestrator.agent import LLMOrchestrator
 from django.core.management import call_command
@@ -57,3 +57,154 @@ def test_synthesize_with_no_summaries(monkeypatch: pytest.MonkeyPatch, capsys: p
 
     out = capsys.readouterr().out
     assert "Insufficient summaries" in out
+
+
+@pytest.mark.django_db
+def test_synthesize_map_reduce_groups_by_month(monkeypatch: pytest.MonkeyPatch):
+    """--map-reduce synthesizes each publication month separately and writes the article from the partials."""
+    # Arrange: two summaries in January, one in February
+    for idx, (pub_date, text) in enumerate(
+        [("2020-01-05", "jan1"), ("2020-01-20", "jan2"), ("2020-02-03", "feb1")], start=1
+    ):
+        article = Article.objects.create(
+            pmid=str(idx), title=f"Title {idx}", abstract=f"Abstract {idx}", pub_date=pub_date, raw_json={}
+        )
+        Summary.objects.create(article=article, text=text)
+
+    partial_calls = []
+
+    def fake_partial(self, period, summaries):
+        partial_calls.append((period, summaries))
+        return f"notes for {period}"
+
+    monkeypatch.setattr(LLMOrchestrator, "synthesize_partial", fake_partial)
+    monkeypatch.setattr(LLMOrchestrator, "write_trend_article", lambda self, reports: " | ".join(reports))
+    monkeypatch.setattr(FactChecker, "score", lambda self, article_text, joined_summaries: (0, []))
+
+    # Act
+    call_command("synthesize", map_reduce=True, concurrency=2)
+
+    # Assert
+    assert sorted(partial_calls) == [("February 2020", ["feb1"]), ("January 2020", ["jan1", "jan2"])]
+    assert TrendReport.objects.get().text == "notes for January 2020 | notes for February 2020"
+
+
+@pytest.mark.django_db
+def test_synthesize_grounded_check_mode(monkeypatch: pytest.MonkeyPatch):
+    """--check-mode grounded fact-checks passage by passage instead of against the joined summaries."""
+    # Arrange
+    for idx, text in enumerate(["sum1", "sum2", "sum3"], start=1):
+        article = Article.objects.create(
+            pmid=str(idx), title=f"Title {idx}", abstract=f"Abstract {idx}", pub_date=f"2020-01-{idx:02d}", raw_json={}
+        )
+        Summary.objects.create(article=article, text=text)
+
+    grounded_calls = []
+    monkeypatch.setattr(LLMOrchestrator, "synthesize_trends", lambda self, summaries: "Article.")
+    monkeypatch.setattr(FactChecker, "score", lambda self, article_text, joined: pytest.fail("full check used"))
+    monkeypatch.setattr(
+        FactChecker,
+        "score_grounded",
+        lambda self, article_text, summaries, evidence_k, concurrency: grounded_calls.append(
+            (summaries, evidence_k, concurrency)
+        )
+        or (1, ["issue"]),
+    )
+
+    # Act
+    call_command("synthesize", check_mode="grounded", evidence_k=2, concurrency=4)
+
+    # Assert
+    assert grounded_calls == [(["sum1", "sum2", "sum3"], 2, 4)]
+    assert TrendReport.objects.get().issues == ["issue"]
+
+
+@pytest.mark.django_db
+def test_synthesize_incremental_only_recomputes_changed_months(monkeypatch: pytest.MonkeyPatch):
+    """A second --incremental run reuses stored monthly partials and only regenerates months with new summaries."""
+    # Arrange
+    def add_summary(pmid: str, pub_date: str, text: str) -> None:
+        article = Article.objects.create(
+            pmid=pmid, title=f"Title {pmid}", abstract=f"Abstract {pmid}", pub_date=pub_date, raw_json={}
+        )
+        Summary.objects.create(article=article, text=text)
+
+    add_summary("1", "2020-01-05", "jan1")
+    add_summary("2", "2020-02-03", "feb1")
+    add_summary("3", "2020-02-10", "feb2")
+
+    partial_calls = []
+
+    def fake_partial(self, period, summaries):
+        partial_calls.append(period)
+        return f"{period}: {', '.join(summaries)}"
+
+    monkeypatch.setattr(LLMOrchestrator, "synthesize_partial", fake_partial)
+    monkeypatch.setattr(LLMOrchestrator, "write_trend_article", lambda self, reports: " | ".join(reports))
+    monkeypatch.setattr(FactChecker, "score", lambda self, article_text, joined_summaries: (0, []))
+
+    call_command("synthesize", incremental=True)
+    assert sorted(partial_calls) == ["February 2020", "January 2020"]
+
+    # Act: one new summary in February
+    partial_calls.clear()
+    add_summary("4", "2020-02-20", "feb3")
+    call_command("synthesize", incremental=True)
+
+    # Assert
+    assert partial_calls == ["February 2020"]
+    assert TrendReport.objects.latest("pk").text == "January 2020: jan1 | February 2020: feb1, feb2, feb3"
+    february = PartialSynthesis.objects.get(period="February 2020")
+    assert february.summary_ids == list(
+        Summary.objects.filter(article__pub_date__month=2).order_by("pk").values_list("pk", flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_synthesize_stream_prints_tokens_and_completes_draft(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+):
+    """--stream echoes chunks as they arrive and turns the draft report into the final one."""
+    # Arrange
+    for idx, text in enumerate(["sum1", "sum2", "sum3"], start=1):
+        article = Article.objects.create(
+            pmid=str(idx), title=f"Title {idx}", abstract=f"Abstract {idx}", pub_date=f"2020-01-{idx:02d}", raw_json={}
+        )
+        Summary.objects.create(article=article, text=text)
+
+    monkeypatch.setattr(LLMOrchestrator, "stream_trends", lambda self, summaries: iter(["Trends ", "in ", "2020."]))
+    monkeypatch.setattr(FactChecker, "score", lambda self, article_text, joined_summaries: (0, []))
+
+    # Act
+    call_command("synthesize", stream=True, checkpoint_interval=0)
+
+    # Assert
+    report = TrendReport.objects.get()
+    assert (report.text, report.status) == ("Trends in 2020.", TrendReport.Status.COMPLETE)
+    assert "Trends in 2020." in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+def test_synthesize_stream_keeps_partial_draft_on_failure(monkeypatch: pytest.MonkeyPatch):
+    """Text generated before a failure is checkpointed into a draft TrendReport."""
+    # Arrange
+    for idx, text in enumerate(["sum1", "sum2", "sum3"], start=1):
+        article = Article.objects.create(
+            pmid=str(idx), title=f"Title {idx}", abstract=f"Abstract {idx}", pub_date=f"2020-01-{idx:02d}", raw_json={}
+        )
+        Summary.objects.create(article=article, text=text)
+
+    def broken_stream(self, summaries):
+        yield "Trends "
+        yield "in "
+        raise ConnectionError("stream dropped")
+
+    monkeypatch.setattr(LLMOrchestrator, "stream_trends", broken_stream)
+
+    # Act
+    with pytest.raises(ConnectionError):
+        call_command("synthesize", stream=True)
+
+    # Assert
+    report = TrendReport.objects.get()
+    assert (report.text, report.status) == ("Trends in ", TrendReport.Status.DRAFT)
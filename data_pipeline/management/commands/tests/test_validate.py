@@ -1,4 +1,5 @@
 import logging
+import time
 
 import pytest
 from data_pipeline.models import Article, Summary, Validation
@@ -122,3 +123,95 @@ def test_validate_continues_on_error(monkeypatch: pytest.MonkeyPatch, capsys: py
     out = capsys.readouterr().out
     assert "Failed on PMID=E1: checker failure" in out
     assert "Validation complete: 1/2 summaries processed" in out
+
+
+@pytest.mark.django_db
+def test_validate_query_count_does_not_grow_with_summaries(
+    monkeypatch: pytest.MonkeyPatch, django_assert_max_num_queries
+):
+    """
+    Summaries are read with their article joined in and validations are written in
+    bulk, so 20 summaries cost a handful of queries rather than a few per summary.
+    """
+    # Arrange
+    for i in range(20):
+        article = Article.objects.create(
+            pmid=f"Q{i}", title=f"T{i}", abstract=f"Abstract {i}", pub_date="2020-01-01", raw_json={}
+        )
+        Summary.objects.create(article=article, text=f"Summary {i}")
+    monkeypatch.setattr(FactChecker, "score", lambda self, summary_text, source: (0, []))
+
+    # Act
+    with django_assert_max_num_queries(12):
+        call_command("validate", batch_size=10)
+
+    # Assert
+    assert Validation.objects.count() == 20
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("ordered", [False, True])
+def test_validate_with_concurrency_isolates_failures(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture, ordered: bool
+):
+    """
+    With --concurrency, fact-checks overlap, a failing summary is reported without
+    affecting the others, and --ordered handles results in input order.
+    """
+    # Arrange: four summaries; the first is slowest, the third fails
+    for i in range(1, 5):
+        article = Article.objects.create(
+            pmid=f"C{i}", title=f"T{i}", abstract=f"Abstract {i}", pub_date="2020-01-01", raw_json={}
+        )
+        Summary.objects.create(article=article, text=f"Summary {i}")
+
+    def slow_score(self, summary_text, source):
+        time.sleep(0.1 if summary_text == "Summary 1" else 0.01)
+        if summary_text == "Summary 3":
+            raise RuntimeError("checker failure")
+        return (0, [])
+
+    monkeypatch.setattr(FactChecker, "score", slow_score)
+
+    # Act
+    call_command("validate", concurrency=4, ordered=ordered, batch_size=1)
+
+    # Assert
+    validated = list(Validation.objects.order_by("pk").values_list("summary__article__pmid", flat=True))
+    assert sorted(validated) == ["C1", "C2", "C4"]
+    assert (validated[0] == "C1") is ordered
+    out = capsys.readouterr().out
+    assert "Failed on PMID=C3: checker failure" in out
+    assert "Validation complete: 3/4 summaries processed" in out
+
+
+@pytest.mark.django_db
+def test_validate_with_packed_prompts(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture):
+    """With --pack-tokens, summaries are scored through FactChecker.score_batch."""
+    # Arrange
+    for i in range(1, 4):
+        article = Article.objects.create(
+            pmid=f"P{i}", title=f"T{i}", abstract=f"Abstract {i}", pub_date="2020-01-01", raw_json={}
+        )
+        Summary.objects.create(article=article, text=f"Summary {i}")
+
+    batches = []
+
+    def fake_score_batch(self, pairs, token_budget):
+        batches.append((pairs, token_budget))
+        return [(0, []), RuntimeError("checker failure"), (2, ["a", "b"])]
+
+    monkeypatch.setattr(FactChecker, "score_batch", fake_score_batch)
+
+    # Act
+    call_command("validate", pack_tokens=2000)
+
+    # Assert
+    assert batches == [
+        ([("Summary 1", "Abstract 1"), ("Summary 2", "Abstract 2"), ("Summary 3", "Abstract 3")], 2000)
+    ]
+    assert Validation.objects.get(summary__article__pmid="P3").issues == ["a", "b"]
+    assert not Validation.objects.filter(summary__article__pmid="P2").exists()
+    out = capsys.readouterr().out
+    assert "Failed on PMID=P2: checker failure" in out
+    assert "Validation complete: 2/3 summaries processed" in out
@@ -0,0 +1,61 @@
+import pytest
+from data_pipeline.models import Article, Job, Summary, Validation
+from data_pipeline.services.fact_checker.agent import FactChecker
+from data_pipeline.services.llm_orchestrator.agent import LLMOrchestrator
+from django.core.management import call_command
+
+
+def create_articles(count: int) -> list[Article]:
+    return [
+        Article.objects.create(
+            pmid=str(i), title=f"Title{i}", abstract=f"Abstract{i}", pub_date=f"2020-01-{i:02d}", raw_json={}
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.mark.django_db
+def test_worker_enqueues_and_summarizes_outstanding_articles(monkeypatch: pytest.MonkeyPatch):
+    """With --enqueue, a worker creates jobs for unsummarized articles and works through them in batches."""
+    # Arrange: one article is already summarized
+    articles = create_articles(5)
+    Summary.objects.create(article=articles[0], text="existing")
+    monkeypatch.setattr(LLMOrchestrator, "summarize", lambda self, abstract: f"Summary of {abstract}")
+
+    # Act
+    call_command("worker", stage="summarize", enqueue=True, exit_when_empty=True, batch_size=2, concurrency=2)
+
+    # Assert
+    assert dict(Summary.objects.values_list("article__pmid", "text")) == {
+        "1": "existing",
+        "2": "Summary of Abstract2",
+        "3": "Summary of Abstract3",
+        "4": "Summary of Abstract4",
+        "5": "Summary of Abstract5",
+    }
+    assert list(Job.objects.values_list("status", flat=True).distinct()) == [Job.Status.DONE]
+    assert Job.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_worker_retries_then_fails_jobs(monkeypatch: pytest.MonkeyPatch):
+    """A job that keeps failing is retried up to --max-attempts and then left failed with its error."""
+    # Arrange
+    article = create_articles(1)[0]
+    Summary.objects.create(article=article, text="summary")
+    calls = []
+
+    def broken_score(self, summary, abstract):
+        calls.append(summary)
+        raise ValueError("bad JSON")
+
+    monkeypatch.setattr(FactChecker, "score", broken_score)
+
+    # Act
+    call_command("worker", stage="validate", enqueue=True, exit_when_empty=True, max_attempts=2, retry_delay=0)
+
+    # Assert
+    job = Job.objects.get()
+    assert (job.status, job.attempts, job.last_error) == (Job.Status.FAILED, 2, "bad JSON")
+    assert len(calls) == 2
+    assert not Validation.objects.exists()
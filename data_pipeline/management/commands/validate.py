@@ -1,10 +1,15 @@
 import argparse
 import logging
+from collections.abc import Iterable, Iterator
 
-from data_pipeline.models import Summary, Validation
-from data_pipeline.services.fact_checker.agent import FactChecker
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from data_pipeline.models import PipelineRun, Summary, Validation
+from data_pipeline.services.concurrency import batched, bounded_map
+from data_pipeline.services.fact_checker.agent import MAX_BATCH_ITEMS, FactChecker
+from data_pipeline.services.metrics import ITEMS_PROCESSED, push_metrics
+from data_pipeline.services.run_tracker import RunNotResumable, RunTracker
+from data_pipeline.services.telemetry import record_llm_calls
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
 from tqdm import tqdm
 
 logger = logging.getLogger(__name__)
@@ -20,46 +25,118 @@ class Command(BaseCommand):
             default=0.3,
             help="Threshold to warn about high hallucination scores",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of summaries to read, and validations to write, per database round-trip",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of fact-check requests to keep in flight",
+        )
+        parser.add_argument(
+            "--ordered",
+            action="store_true",
+            help="With --concurrency, handle results in input order instead of as they complete",
+        )
+        parser.add_argument(
+            "--pack-tokens",
+            type=int,
+            default=None,
+            help="Fact-check several summaries per prompt, packing them up to this many tokens",
+        )
+        parser.add_argument(
+            "--resume",
+            type=int,
+            default=None,
+            metavar="RUN_ID",
+            help="Continue an earlier run: retry its failed summaries and those past its cursor",
+        )
 
-    def get_pending_summaries(self):
-        """Retrieve summaries that haven't been validated yet."""
+    def get_pending_summaries(self, options: dict):
+        """
+        Retrieve summaries that haven't been validated yet, with just the article columns we need,
+        along with the run that records their progress (a new one, or the one being resumed).
+        """
         try:
-            pending = Summary.objects.filter(validation__isnull=True)
-            total = pending.count()
+            pending = (
+                Summary.objects.filter(validation__isnull=True)
+                .select_related("article")
+                .only("id", "text", "article__id", "article__pmid", "article__abstract")
+                .order_by("pk")
+            )
+            parameters = {key: options[key] for key in ("batch_size", "concurrency", "ordered", "pack_tokens")}
+            tracker, pending, total = RunTracker.open("validate", pending, parameters, options["resume"])
             logger.info("Found %d summaries pending validation", total)
-            return pending, total
+            return pending, total, tracker
+        except RunNotResumable as e:
+            raise CommandError(str(e))
         except Exception as e:
             logger.error("Failed to fetch pending summaries: %s", str(e))
             raise
 
-    def validate_summary(self, checker: FactChecker, summary: Summary) -> Validation:
-        """Validate a single summary and save results."""
+    def flush_validations(self, buffer: list[Validation]) -> int:
+        """Write buffered validations in one INSERT and return how many were saved."""
+        if not buffer:
+            return 0
         try:
-            score, issues = checker.score(summary.text, summary.article.abstract)
-
             with transaction.atomic():
-                validation = Validation.objects.create(
-                    summary=summary,
-                    hallucination_score=score,
-                    issues=issues,
-                )
+                Validation.objects.bulk_create(buffer)
+            saved = len(buffer)
+        except IntegrityError:
+            # Most likely another run validated some of these first; keep the rest
+            saved = 0
+            for validation in buffer:
+                try:
+                    with transaction.atomic():
+                        validation.save()
+                    saved += 1
+                except IntegrityError as e:
+                    logger.error("Failed to save validation for PMID=%s: %s", validation.summary.article.pmid, str(e))
+        buffer.clear()
+        ITEMS_PROCESSED.inc(saved, stage="validate", outcome="succeeded")
+        return saved
 
-            if score > self.max_score:
-                logger.warning(
-                    "High hallucination score for PMID=%s: %s > %s",
-                    summary.article.pmid,
-                    score,
-                    self.max_score,
-                )
+    def flush_tracked(self, buffer: list[Validation], tracker: RunTracker) -> int:
+        """`flush_validations`, then move the run past the flushed summaries."""
+        pks = [validation.summary_id for validation in buffer]
+        saved = self.flush_validations(buffer)
+        tracker.succeeded(pks)
+        return saved
 
-            logger.info(
-                "Validated PMID=%s: score=%s, issues=%d",
+    def build_validation(self, summary: Summary, score: float, issues: list[str]) -> Validation:
+        """Turn a fact-check verdict into an unsaved Validation, warning on high scores."""
+        validation = Validation(
+            summary=summary,
+            hallucination_score=score,
+            issues=issues,
+        )
+
+        if score > self.max_score:
+            logger.warning(
+                "High hallucination score for PMID=%s: %s > %s",
                 summary.article.pmid,
                 score,
-                len(issues),
+                self.max_score,
             )
 
-            return validation
+        logger.info(
+            "Validated PMID=%s: score=%s, issues=%d",
+            summary.article.pmid,
+            score,
+            len(issues),
+        )
+
+        return validation
+
+    def validate_summary(self, checker: FactChecker, summary: Summary) -> Validation:
+        """Validate a single summary and return its (unsaved) Validation."""
+        try:
+            score, issues = checker.score(summary.text, summary.article.abstract)
+            return self.build_validation(summary, score, issues)
 
         except Exception as e:
             logger.error(
@@ -69,14 +146,75 @@ class Command(BaseCommand):
             )
             raise
 
+    def iter_validations(
+        self, checker: FactChecker, summaries: Iterable[Summary], concurrency: int = 1, ordered: bool = False
+    ) -> Iterator[tuple[Summary, Validation | None, Exception | None]]:
+        """
+        Yield `(summary, validation, error)` for each summary. With `concurrency` above 1,
+        up to that many fact-checks run at once on worker threads while Validation objects
+        are still built (and later saved) on this thread.
+        """
+        if concurrency <= 1:
+            for summary in summaries:
+                try:
+                    yield summary, self.validate_summary(checker, summary), None
+                except Exception as e:
+                    yield summary, None, e
+            return
+
+        results = bounded_map(
+            lambda summary: checker.score(summary.text, summary.article.abstract),
+            summaries,
+            concurrency,
+            ordered=ordered,
+        )
+        for summary, verdict, error in results:
+            if error is not None:
+                logger.error("Failed to validate PMID=%s: %s", summary.article.pmid, str(error))
+                yield summary, None, error
+                continue
+            score, issues = verdict
+            yield summary, self.build_validation(summary, score, issues), None
+
+    def iter_packed_validations(
+        self,
+        checker: FactChecker,
+        summaries: Iterable[Summary],
+        token_budget: int,
+        concurrency: int = 1,
+        ordered: bool = False,
+    ) -> Iterator[tuple[Summary, Validation | None, Exception | None]]:
+        """Like `iter_validations`, but scores summaries in packed multi-item prompts."""
+        results = bounded_map(
+            lambda group: checker.score_batch(
+                [(summary.text, summary.article.abstract) for summary in group], token_budget
+            ),
+            batched(summaries, MAX_BATCH_ITEMS),
+            concurrency,
+            ordered=ordered,
+        )
+        for group, verdicts, error in results:
+            for summary, verdict in zip(group, verdicts if error is None else [error] * len(group)):
+                if isinstance(verdict, Exception):
+                    logger.error("Failed to validate PMID=%s: %s", summary.article.pmid, str(verdict))
+                    yield summary, None, verdict
+                    continue
+                score, issues = verdict
+                yield summary, self.build_validation(summary, score, issues), None
+
+    @push_metrics
+    @record_llm_calls
     def handle(self, *args, **options):
         try:
             self.max_score = options["max_score"]
+            batch_size = options["batch_size"]
             checker = FactChecker()
 
             # Get pending summaries
-            pending, total = self.get_pending_summaries()
+            pending, total, tracker = self.get_pending_summaries(options)
+            self.llm_calls.pipeline_run = tracker.run
             if not total:
+                tracker.finish()
                 msg = "No summaries found for validation"
                 logger.info(msg)
                 self.stdout.write(self.style.SUCCESS(msg))
@@ -85,17 +223,46 @@ class Command(BaseCommand):
             # Process summaries with progress bar
             self.stdout.write(f"Validating {total} summaries...")
             success_count = 0
+            buffer: list[Validation] = []
 
-            for summary in tqdm(pending, total=total):
-                try:
-                    self.validate_summary(checker, summary)
-                    success_count += 1
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Failed on PMID={summary.article.pmid}: {str(e)}"))
-                    continue
+            summaries = tracker.track(pending.iterator(chunk_size=batch_size))
+            if options["pack_tokens"]:
+                results = self.iter_packed_validations(
+                    checker,
+                    summaries,
+                    options["pack_tokens"],
+                    concurrency=options["concurrency"],
+                    ordered=options["ordered"],
+                )
+            else:
+                results = self.iter_validations(
+                    checker,
+                    summaries,
+                    concurrency=options["concurrency"],
+                    ordered=options["ordered"],
+                )
+            try:
+                for summary, validation, error in tqdm(results, total=total):
+                    if error is not None:
+                        tracker.failed(summary.pk, error)
+                        self.stdout.write(self.style.ERROR(f"Failed on PMID={summary.article.pmid}: {str(error)}"))
+                        continue
+                    buffer.append(validation)
+                    if len(buffer) >= batch_size:
+                        success_count += self.flush_tracked(buffer, tracker)
+                        tracker.checkpoint()
+                success_count += self.flush_tracked(buffer, tracker)
+            except BaseException:
+                tracker.finish(PipelineRun.Status.FAILED)
+                raise
+            tracker.finish()
 
             # Final status
-            self.stdout.write(self.style.SUCCESS(f"Validation complete: {success_count}/{total} summaries processed"))
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Validation complete: {success_count}/{total} summaries processed (run #{tracker.run.pk})"
+                )
+            )
 
         except Exception as e:  # TODO: Be more specific with exceptions
             logger.error("Command failed: %s", str(e))
@@ -0,0 +1,179 @@
+import argparse
+import logging
+import os
+import socket
+import time
+
+from data_pipeline.models import Article, Job, Summary, Validation
+from data_pipeline.services import metrics, work_queue
+from data_pipeline.services.concurrency import bounded_map
+from data_pipeline.services.fact_checker.agent import FactChecker
+from data_pipeline.services.llm_orchestrator.agent import LLMOrchestrator
+from data_pipeline.services.telemetry import record_llm_calls
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Claim and process summarize/validate jobs; run several copies, on any machines, to share the work"
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--stage",
+            choices=Job.Stage.values,
+            required=True,
+            help="Pipeline stage to work on",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=20,
+            help="Number of jobs to claim at a time",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of LLM requests to keep in flight",
+        )
+        parser.add_argument(
+            "--lease-seconds",
+            type=float,
+            default=work_queue.DEFAULT_LEASE_SECONDS,
+            help="How long a claimed batch is reserved before other workers may take it over",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=work_queue.DEFAULT_MAX_ATTEMPTS,
+            help="Attempts per job before it is marked failed",
+        )
+        parser.add_argument(
+            "--retry-delay",
+            type=float,
+            default=work_queue.DEFAULT_RETRY_DELAY,
+            help="Seconds before a failed job's first retry (doubles with each attempt)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait before polling again when there is no work",
+        )
+        parser.add_argument(
+            "--enqueue",
+            action="store_true",
+            help="Create jobs for any outstanding work whenever the queue runs dry",
+        )
+        parser.add_argument(
+            "--exit-when-empty",
+            action="store_true",
+            help="Exit once there is nothing left to claim instead of polling",
+        )
+        parser.add_argument(
+            "--worker-id",
+            default=f"{socket.gethostname()}:{os.getpid()}",
+            help="Name recorded on claimed jobs",
+        )
+
+    def load_objects(self, stage: str, jobs: list[Job]) -> dict[int, Article | Summary]:
+        """The rows the jobs refer to that still need work; jobs missing here are already done."""
+        ids = [job.object_id for job in jobs]
+        if stage == Job.Stage.SUMMARIZE:
+            return work_queue.pending_objects(stage).only("id", "pmid", "abstract").in_bulk(ids)
+        return (
+            work_queue.pending_objects(stage)
+            .select_related("article")
+            .only("id", "text", "article__id", "article__pmid", "article__abstract")
+            .in_bulk(ids)
+        )
+
+    def save_result(self, stage: str, obj: Article | Summary, result) -> None:
+        """Store one job's output. A row written meanwhile by another worker counts as success."""
+        try:
+            with transaction.atomic():
+                if stage == Job.Stage.SUMMARIZE:
+                    Summary.objects.create(article=obj, text=result)
+                else:
+                    score, issues = result
+                    Validation.objects.create(summary=obj, hallucination_score=score, issues=issues)
+        except IntegrityError:
+            logger.info("%s #%s was already processed by another worker", stage, obj.pk)
+            return
+        metrics.ITEMS_PROCESSED.inc(stage=stage, outcome="succeeded")
+
+    def process_batch(self, stage: str, jobs: list[Job], work, options: dict) -> tuple[int, int]:
+        """
+        Run `work` on each job's row with up to `concurrency` calls in flight. Results, and
+        job state changes, are written on this thread as each call finishes, and the lease
+        on the jobs still outstanding is renewed each time.
+        """
+        objects = self.load_objects(stage, jobs)
+        finished = [job for job in jobs if job.object_id not in objects]
+        unfinished = {job.pk: job for job in jobs if job.object_id in objects}
+        succeeded = failed = 0
+        try:
+            todo = list(unfinished.values())
+            results = bounded_map(lambda job: work(objects[job.object_id]), todo, options["concurrency"])
+            for job, result, error in results:
+                del unfinished[job.pk]
+                # A slow batch must not outlive its lease, or another worker would redo the remaining jobs
+                work_queue.renew(list(unfinished.values()), options["lease_seconds"])
+                try:
+                    if error is not None:
+                        raise error
+                    self.save_result(stage, objects[job.object_id], result)
+                    finished.append(job)
+                    succeeded += 1
+                # Broad on purpose: every failure is recorded on its job, to be retried or given up on
+                except Exception as e:
+                    work_queue.fail(job, e, options["max_attempts"], options["retry_delay"])
+                    metrics.ITEMS_PROCESSED.inc(stage=stage, outcome="failed")
+                    failed += 1
+        finally:
+            work_queue.complete(finished)
+            # Interrupted mid-batch: let another worker pick these up straight away
+            work_queue.release(list(unfinished.values()))
+        return succeeded, failed
+
+    @metrics.push_metrics
+    @record_llm_calls
+    def handle(self, *args, **options):
+        stage = options["stage"]
+        worker = options["worker_id"]
+        if stage == Job.Stage.SUMMARIZE:
+            orchestrator = LLMOrchestrator()
+
+            def work(article: Article) -> str:
+                return orchestrator.summarize(article.abstract)
+
+        else:
+            checker = FactChecker()
+
+            def work(summary: Summary) -> tuple[float, list[str]]:
+                return checker.score(summary.text, summary.article.abstract)
+
+        logger.info("Worker %s started on stage %s", worker, stage)
+        succeeded = failed = 0
+        while True:
+            jobs = work_queue.claim(
+                stage, worker, options["batch_size"], options["lease_seconds"], options["max_attempts"]
+            )
+            if not jobs and options["enqueue"] and work_queue.enqueue_pending(stage):
+                continue
+            if not jobs:
+                if options["exit_when_empty"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+
+            batch_succeeded, batch_failed = self.process_batch(stage, jobs, work, options)
+            succeeded += batch_succeeded
+            failed += batch_failed
+            self.llm_calls.flush()
+            metrics.push(metrics.command_name(self))
+
+        logger.info("Worker %s finished: %s succeeded, %s failed", worker, succeeded, failed)
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} finished {stage}: {succeeded} succeeded, {failed} failed"))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_pipeline', '0003_alter_validation_hallucination_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.TextField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('article_count', models.PositiveIntegerField(default=0)),
+                ('pmids', models.JSONField(default=list)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('query', 'start_date', 'end_date'), name='unique_fetch_window')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_pipeline', '0004_fetchstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartialSynthesis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=32, unique=True)),
+                ('summary_ids', models.JSONField(default=list)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('text', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Partial syntheses',
+            },
+        ),
+    ]
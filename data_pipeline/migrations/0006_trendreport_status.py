@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_pipeline', '0005_partialsynthesis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trendreport',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('complete', 'Complete')], default='complete', max_length=16),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_pipeline', '0008_pipelinerun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('command', models.CharField(max_length=32)),
+                ('invocation', models.UUIDField(db_index=True)),
+                ('stage', models.CharField(max_length=32)),
+                ('model', models.CharField(max_length=64)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('tokens_estimated', models.BooleanField(default=False)),
+                ('latency', models.FloatField(default=0)),
+                ('duration', models.FloatField(default=0)),
+                ('retries', models.PositiveSmallIntegerField(default=0)),
+                ('cached', models.BooleanField(default=False)),
+                ('failed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('pipeline_run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_calls', to='data_pipeline.pipelinerun')),
+            ],
+        ),
+    ]
@@ -9,6 +9,22 @@ class Article(models.Model):
     raw_json = models.JSONField()
 
 
+class FetchState(models.Model):
+    """Watermark for one query/publication-date window, used by incremental fetches."""
+
+    query = models.TextField()
+    start_date = models.DateField()
+    end_date = models.DateField()
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    article_count = models.PositiveIntegerField(default=0)
+    pmids = models.JSONField(default=list)  # PMIDs seen in this window so far
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["query", "start_date", "end_date"], name="unique_fetch_window"),
+        ]
+
+
 class Summary(models.Model):
     article = models.OneToOneField(Article, on_delete=models.CASCADE)
     text = models.TextField()
@@ -25,6 +41,120 @@ class Validation(models.Model):
 
 
 class TrendReport(models.Model):
+    class Status(models.TextChoices):
+        DRAFT = "draft", "Draft"  # still being generated, or generation was interrupted
+        COMPLETE = "complete", "Complete"
+
     generated_on = models.DateTimeField(auto_now_add=True)
     text = models.TextField()
     issues = models.JSONField()  # flagged statements
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.COMPLETE)
+
+
+class PartialSynthesis(models.Model):
+    """Map-reduce notes for one period of summaries, reused by incremental trend reports."""
+
+    period = models.CharField(max_length=32, unique=True)  # e.g. "March 2020"
+    summary_ids = models.JSONField(default=list)  # Summary pks the notes cover
+    fingerprint = models.CharField(max_length=64)  # hash of the inputs and prompts the notes were built from
+    text = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Partial syntheses"
+
+
+class Job(models.Model):
+    """
+    One unit of pipeline work (summarizing an Article or validating a Summary), claimed by
+    `worker` processes under a time-limited lease so several workers never do the same item.
+    """
+
+    class Stage(models.TextChoices):
+        SUMMARIZE = "summarize", "Summarize"
+        VALIDATE = "validate", "Validate"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    stage = models.CharField(max_length=16, choices=Stage.choices)
+    object_id = models.PositiveBigIntegerField()  # Article pk to summarize, or Summary pk to validate
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # While running: when the lease expires and the job may be reclaimed. While pending: retry backoff.
+    leased_until = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["stage", "object_id"], name="unique_job"),
+        ]
+        indexes = [
+            models.Index(fields=["stage", "status", "leased_until"], name="job_claim_idx"),
+        ]
+
+
+class PipelineRun(models.Model):
+    """One `summarize` or `validate` run: its parameters, progress and outcome, so it can be resumed."""
+
+    class Status(models.TextChoices):
+        RUNNING = "running", "Running"  # also left behind by a run that was killed
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    command = models.CharField(max_length=32)
+    parameters = models.JSONField(default=dict)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.RUNNING)
+    cursor = models.PositiveBigIntegerField(default=0)  # every item with pk <= cursor is saved or recorded as failed
+    last_pk = models.PositiveBigIntegerField(default=0)  # highest pk in the run's scope when it started
+    total = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    resume_count = models.PositiveSmallIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+
+class RunFailure(models.Model):
+    """An item a PipelineRun could not process; retried by `--resume`."""
+
+    run = models.ForeignKey(PipelineRun, on_delete=models.CASCADE, related_name="failures")
+    object_id = models.PositiveBigIntegerField()  # Article pk for summarize, Summary pk for validate
+    error_class = models.CharField(max_length=255)
+    message = models.TextField()
+    attempts = models.PositiveSmallIntegerField(default=1)
+    resolved = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["run", "object_id"], name="unique_run_failure"),
+        ]
+
+
+class LLMCall(models.Model):
+    """One call to a model made by a management command, for cost and latency reporting."""
+
+    command = models.CharField(max_length=32)
+    invocation = models.UUIDField(db_index=True)  # groups the calls made by one run of the command
+    pipeline_run = models.ForeignKey(
+        PipelineRun, null=True, blank=True, on_delete=models.SET_NULL, related_name="llm_calls"
+    )
+    stage = models.CharField(max_length=32)
+    model = models.CharField(max_length=64)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    tokens_estimated = models.BooleanField(default=False)  # the provider reported no usage, so tokens are estimates
+    latency = models.FloatField(default=0)  # seconds waiting on the provider for the final attempt
+    duration = models.FloatField(default=0)  # seconds in total, including rate-limit waits and retries
+    retries = models.PositiveSmallIntegerField(default=0)
+    cached = models.BooleanField(default=False)
+    failed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,261 @@
+import json
+import logging
+import time
+import xml.etree.ElementTree as ET
+from collections.abc import AsyncIterator
+from datetime import date
+
+import httpx
+from data_pipeline.services import metrics
+from data_pipeline.services.disk_cache import CacheMiss, DiskCache
+from data_pipeline.services.enums import ArticleData, PubMedURLs, SearchHistory
+from data_pipeline.services.pubmed_client import (
+    DEFAULT_EFETCH_CHUNK_SIZE,
+    DEFAULT_ESEARCH_PAGE_SIZE,
+    DEFAULT_POOL_SIZE,
+    PubMedClient,
+    build_efetch_history_params,
+    build_esearch_params,
+    chunked,
+    get_default_cache,
+    get_rate_limiter,
+    parse_search_history,
+    response_cache_key,
+)
+from data_pipeline.services.rate_limiter import TokenBucket
+from django.conf import settings
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_not_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 60.0
+
+
+class AsyncPubMedClient:
+    """
+    asyncio version of `PubMedClient`, built on httpx.
+
+    It shares the synchronous client's request parameters, XML parsing, response cache
+    and process-wide rate limiter, so sync and async callers together still stay under
+    NCBI's limit.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        rate_limiter: TokenBucket | None = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        transport: httpx.AsyncBaseTransport | None = None,
+        cache: DiskCache | None = None,
+    ):
+        self.api_key = api_key or settings.NCBI_API_KEY
+        self.rate_limiter = rate_limiter or get_rate_limiter(self.api_key)
+        self.cache = cache or get_default_cache()
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=DEFAULT_TIMEOUT,
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "AsyncPubMedClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def send(self, method: str, url: str, params: dict, stream: bool = False) -> httpx.Response:
+        """Sends a rate-limited E-utilities request over the pooled client."""
+        if self.api_key:
+            params = {**params, "api_key": self.api_key}
+        await self.rate_limiter.aacquire()
+        if method == "POST":
+            request = self.client.build_request(method, url, data=params)
+        else:
+            request = self.client.build_request(method, url, params=params)
+        started = time.monotonic()
+        try:
+            resp = await self.client.send(request, stream=stream)
+        except httpx.HTTPError:
+            metrics.observe_pubmed_request(url, "error", time.monotonic() - started)
+            raise
+        metrics.observe_pubmed_request(url, resp.status_code, time.monotonic() - started)
+        return resp
+
+    async def get_json(self, url: str, params: dict) -> dict:
+        """GETs a JSON E-utilities endpoint, answering from the response cache when possible."""
+        key = response_cache_key("GET", url, params)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return json.loads(cached)
+            if self.cache.replay_only:
+                raise CacheMiss(f"No cached response for GET {url} {params}")
+
+        resp = await self.send("GET", url, params)
+        logger.debug(f"Response: {resp.status_code} {url}")
+        resp.raise_for_status()
+        if self.cache is not None:
+            self.cache.set(key, resp.content)
+        return resp.json()
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=2, min=1, max=64),
+        retry=retry_if_not_exception_type(CacheMiss),
+        reraise=True,
+        before_sleep=before_sleep_log(logger, logging.INFO),
+    )
+    async def esearch_page(self, query: str, start_date: date, end_date: date, retstart: int, retmax: int) -> list[str]:
+        """Fetches one page of PMIDs from ESearch, starting at offset `retstart`."""
+        esearch_params = build_esearch_params(query, start_date, end_date, retstart=retstart, retmax=retmax)
+        esearch_json = await self.get_json(PubMedURLs.ESEARCH_URL, esearch_params)
+
+        return esearch_json.get("esearchresult", {}).get("idlist", [])
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=2, min=1, max=64),
+        retry=retry_if_not_exception_type(CacheMiss),
+        reraise=True,
+        before_sleep=before_sleep_log(logger, logging.INFO),
+    )
+    async def esearch_history(self, query: str, start_date: date, end_date: date) -> SearchHistory:
+        """Runs ESearch with usehistory=y so the results can be fetched by WebEnv/query_key."""
+        esearch_params = build_esearch_params(query, start_date, end_date, usehistory="y", retmax=0)
+        return parse_search_history(await self.get_json(PubMedURLs.ESEARCH_URL, esearch_params))
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=2, min=1, max=64),
+        retry=retry_if_not_exception_type(CacheMiss),
+        reraise=True,
+        before_sleep=before_sleep_log(logger, logging.INFO),
+    )
+    async def open_efetch(self, method: str, efetch_params: dict) -> httpx.Response:
+        """Opens a streaming EFetch response, retrying until the status line is good."""
+        resp = await self.send(method, PubMedURLs.EFETCH_URL, efetch_params, stream=True)
+        logger.debug(f"EFetch response: {resp.status_code}")
+        if resp.is_error:
+            await resp.aclose()
+            resp.raise_for_status()
+        return resp
+
+    async def stream_efetch(self, method: str, efetch_params: dict) -> AsyncIterator[ArticleData]:
+        """
+        Parses an EFetch response as its bytes arrive, yielding one article at a time.
+        Responses are read from, or copied into, the response cache when one is configured.
+        """
+        parser = PubMedClient.pull_parser()
+        key = response_cache_key(method, PubMedURLs.EFETCH_URL, efetch_params)
+
+        if self.cache is not None:
+            cached = self.cache.open(key)
+            if cached is not None:
+                with cached:
+                    while data := cached.read(64 * 1024):
+                        for article in parser.feed(data):
+                            yield article
+                for article in parser.close():
+                    yield article
+                return
+            if self.cache.replay_only:
+                raise CacheMiss(f"No cached response for {method} {PubMedURLs.EFETCH_URL} {efetch_params}")
+
+        resp = await self.open_efetch(method, efetch_params)
+        try:
+            if self.cache is None:
+                async for data in resp.aiter_bytes():
+                    for article in parser.feed(data):
+                        yield article
+            else:
+                with self.cache.writer(key) as sink:
+                    async for data in resp.aiter_bytes():
+                        sink.write(data)
+                        for article in parser.feed(data):
+                            yield article
+            for article in parser.close():
+                yield article
+        finally:
+            await resp.aclose()
+
+    def efetch_chunk(self, ids: list[str]) -> AsyncIterator[ArticleData]:
+        """Streams full records for a chunk of PMIDs."""
+        return self.stream_efetch("POST", {"db": "pubmed", "id": ",".join(ids), "retmode": "xml"})
+
+    def efetch_history(self, history: SearchHistory, retstart: int, retmax: int) -> AsyncIterator[ArticleData]:
+        """Streams one page of records from the History server."""
+        return self.stream_efetch("GET", build_efetch_history_params(history, retstart, retmax))
+
+    async def iter_pmids(
+        self,
+        query: str,
+        start_date: date,
+        end_date: date,
+        limit: int,
+        page_size: int = DEFAULT_ESEARCH_PAGE_SIZE,
+    ) -> AsyncIterator[list[str]]:
+        """Pages through ESearch with retstart/retmax, yielding at most `limit` PMIDs in total."""
+        retstart = 0
+        while retstart < limit:
+            retmax = min(page_size, limit - retstart)
+            ids = await self.esearch_page(query, start_date, end_date, retstart=retstart, retmax=retmax)
+            if not ids:
+                return
+            yield ids
+            if len(ids) < retmax:
+                return
+            retstart += len(ids)
+
+    async def iter_fetch(
+        self,
+        query: str,
+        start_date: date,
+        end_date: date,
+        limit: int,
+        page_size: int = DEFAULT_ESEARCH_PAGE_SIZE,
+        chunk_size: int = DEFAULT_EFETCH_CHUNK_SIZE,
+        use_history: bool = False,
+    ) -> AsyncIterator[list[ArticleData]]:
+        """Async equivalent of `PubMedClient.iter_fetch`: yields articles one EFetch chunk at a time."""
+        logger.info(f"Fetching up to {limit} articles for query: {query} from {start_date} to {end_date}")
+
+        fetched = 0
+        if use_history:
+            history = await self.esearch_history(query, start_date, end_date)
+            total = min(limit, history.count)
+            for retstart in range(0, total, chunk_size):
+                page = self.efetch_history(history, retstart=retstart, retmax=min(chunk_size, total - retstart))
+                articles = await self._collect(page, f"history page at retstart={retstart}")
+                if articles:
+                    fetched += len(articles)
+                    yield articles
+        else:
+            async for page in self.iter_pmids(query, start_date, end_date, limit, page_size=page_size):
+                for ids in chunked(page, chunk_size):
+                    chunk = self.efetch_chunk(ids)
+                    articles = await self._collect(chunk, f"chunk of {len(ids)} PMIDs starting at {ids[0]}")
+                    if articles:
+                        fetched += len(articles)
+                        yield articles
+
+        logger.info(f"Fetched {fetched} articles for query: {query}")
+
+    @staticmethod
+    async def _collect(articles: AsyncIterator[ArticleData], description: str) -> list[ArticleData]:
+        """Drain a streamed EFetch response, keeping whatever was parsed before any failure."""
+        results: list[ArticleData] = []
+        try:
+            async for article in articles:
+                results.append(article)
+        except (httpx.HTTPError, ET.ParseError) as e:
+            logger.error(f"Failed to fetch {description}: {str(e)}")
+        return results
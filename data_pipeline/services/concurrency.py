@@ -0,0 +1,70 @@
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Lazily group any iterable into lists of at most `size` items."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def bounded_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    concurrency: int,
+    ordered: bool = False,
+) -> Iterator[tuple[T, R | None, Exception | None]]:
+    """
+    Call `fn` on each item from a thread pool, keeping at most `concurrency` calls in flight.
+
+    Yields `(item, result, error)` on the calling thread as calls finish, or in input order
+    when `ordered` is set. Exactly one of `result`/`error` is meaningful, so one failing
+    item never stops the rest. Items are pulled from `items` lazily, only when a slot
+    frees up, so the input can be a database cursor or any other long iterator.
+    With a concurrency of 1 the calls simply run inline on the calling thread.
+    """
+    if concurrency <= 1:
+        for item in items:
+            try:
+                yield item, fn(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    iterator = iter(items)
+    in_flight: deque[tuple[Future, T]] = deque()
+
+    def outcome(future: Future, item: T) -> tuple[T, R | None, Exception | None]:
+        error = future.exception()
+        return item, (None if error else future.result()), error
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+        def fill() -> None:
+            while len(in_flight) < concurrency:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                in_flight.append((executor.submit(fn, item), item))
+
+        fill()
+        while in_flight:
+            if ordered:
+                future, item = in_flight.popleft()
+                yield outcome(future, item)
+            else:
+                done, _ = wait([future for future, _ in in_flight], return_when=FIRST_COMPLETED)
+                finished = [entry for entry in in_flight if entry[0] in done]
+                for entry in finished:
+                    in_flight.remove(entry)
+                for future, item in finished:
+                    yield outcome(future, item)
+            fill()
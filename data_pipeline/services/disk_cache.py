@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO
+
+logger = logging.getLogger(__name__)
+
+
+class CacheMiss(LookupError):
+    """Raised in replay-only mode when a request has no cached response."""
+
+
+class DiskCache:
+    """
+    Content-addressed, size-bounded cache of byte blobs on local disk.
+
+    Entries live at `<directory>/<key[:2]>/<key>`. An entry's mtime is its write time and
+    decides TTL expiry; its atime is bumped on every hit and decides LRU eviction once
+    the cache grows past `max_bytes`. With `replay_only`, callers are expected to treat
+    a miss as an error (`CacheMiss`) rather than going to the network.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        ttl: float | None = None,
+        max_bytes: int | None = None,
+        replay_only: bool = False,
+    ):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay_only = replay_only
+        self._size: int | None = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Stable hash of any JSON-serialisable parts (dict ordering does not matter)."""
+        payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def open(self, key: str) -> BinaryIO | None:
+        """Open a fresh entry for reading, or return None if it is missing or expired."""
+        path = self._path(key)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        if self.ttl is not None and time.time() - stat.st_mtime > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        # Record the access explicitly; many filesystems are mounted noatime
+        os.utime(path, (time.time(), stat.st_mtime))
+        return path.open("rb")
+
+    def get(self, key: str) -> bytes | None:
+        cached = self.open(key)
+        if cached is None:
+            return None
+        with cached:
+            return cached.read()
+
+    @contextmanager
+    def writer(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Write an entry incrementally. The entry only becomes visible, atomically,
+        if the block exits without an exception.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as sink:
+                yield sink
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self._account(path.stat().st_size)
+
+    def set(self, key: str, data: bytes) -> None:
+        with self.writer(key) as sink:
+            sink.write(data)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+        with self._lock:
+            self._size = 0
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        return [(path, path.stat()) for path in self.directory.glob("??/*") if not path.name.startswith(".tmp-")]
+
+    def _account(self, written: int) -> None:
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = sum(stat.st_size for _, stat in self._entries())
+            else:
+                self._size += written
+            if self._size > self.max_bytes:
+                self._size = self._evict()
+
+    def _evict(self) -> int:
+        """Delete least-recently-used entries until the cache fits in `max_bytes`; returns the new size."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_atime)
+        size = sum(stat.st_size for _, stat in entries)
+        evicted = 0
+        for path, stat in entries:
+            if size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+            evicted += 1
+        logger.debug(f"Evicted {evicted} cache entries from {self.directory}")
+        return size
+
+
+class TeeReader:
+    """File-like wrapper that copies everything read from `source` into `sink`."""
+
+    def __init__(self, source: BinaryIO, sink: BinaryIO):
+        self.source = source
+        self.sink = sink
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.source.read(size)
+        if data:
+            self.sink.write(data)
+        return data
+
+    def drain(self, chunk_size: int = 64 * 1024) -> None:
+        """Copy whatever the consumer did not read, so the cached copy is complete."""
+        while self.read(chunk_size):
+            pass
@@ -11,6 +11,14 @@ class ArticleData(BaseModel):
     raw_json: dict = Field(default_factory=dict)
 
 
+class SearchHistory(BaseModel):
+    """Result of an ESearch stored on the Entrez History server."""
+
+    count: int
+    webenv: str
+    query_key: str
+
+
 class PubMedURLs:
     ESEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
     EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
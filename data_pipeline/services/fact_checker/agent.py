@@ -1,9 +1,73 @@
 import json
-from django.conf import settings
-from langchain.prompts import PromptTemplate
+import logging
+from functools import cached_property, partial
+from data_pipeline.services.concurrency import bounded_map
+from data_pipeline.services.lexical_index import BM25Index
+from data_pipeline.services.llm_cache import LLMCache, get_default_llm_cache, invoke_cached
+from data_pipeline.services.llm_registry import get_chain, get_llm
+from data_pipeline.services.text import estimate_tokens, split_claims
 from typing import List, Tuple
-from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+
+MODEL = "gpt-3.5-turbo"
+# Set temperature to 0 for deterministic outputs
+TEMPERATURE = 0
+
+FACT_CHECK_TEMPLATE = (
+    "You are a fact-checking assistant. "
+    "Given the following article abstract and a layperson summary, identify any statements in the summary that are NOT supported by the abstract. "
+    "Respond with a JSON object containing two fields:\n"
+    "  score: the number of unsupported statements,\n"
+    "  issues: a list of the unsupported statements.\n\n"
+    "Abstract:\n{abstract}\n\nSummary:\n{summary}"
+)
+
+BATCH_FACT_CHECK_TEMPLATE = (
+    "You are a fact-checking assistant. "
+    "Each numbered item below contains an article abstract and a layperson summary of it. "
+    "For every item, identify any statements in the summary that are NOT supported by that item's abstract. "
+    "Respond with a JSON array containing one object per item, each with three fields:\n"
+    "  id: the item number,\n"
+    "  score: the number of unsupported statements,\n"
+    "  issues: a list of the unsupported statements.\n\n"
+    "{items}"
+)
+ITEM_TEMPLATE = "Item {id}\nAbstract:\n{abstract}\n\nSummary:\n{summary}\n\n"
+
+DEFAULT_BATCH_TOKEN_BUDGET = 3000
+MAX_BATCH_ITEMS = 20
+
+CLAIM_CHECK_TEMPLATE = (
+    "You are a fact-checking assistant. "
+    "Given the following passage from an article on trends in Covid-19 research and the research summaries "
+    "retrieved as evidence for it, identify any statements in the passage that are NOT supported by the evidence. "
+    "Respond with a JSON object containing two fields:\n"
+    "  score: the number of unsupported statements,\n"
+    "  issues: a list of the unsupported statements.\n\n"
+    "Evidence:\n{evidence}\n\nPassage:\n{claim}"
+)
+
+DEFAULT_EVIDENCE_K = 5
+
+
+def strip_code_fence(response: str) -> str:
+    """The response without a surrounding Markdown code fence, which models often add around JSON."""
+    text = response.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    return text
+
+
+def parse_verdict(response: str) -> Tuple[int, List[str]]:
+    """
+    Parse a single fact-check response into (score, issues). Raises ValueError (including
+    json.JSONDecodeError) for anything but a JSON object, so a malformed answer is never cached.
+    """
+    data = json.loads(strip_code_fence(response))
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+    return data.get("score", 0), data.get("issues", [])
 
 
 class FactChecker:
@@ -12,31 +76,174 @@ class FactChecker:
     identifying unsupported statements and computing a hallucination score.
     """
 
-    # Set temperature to 0 for deterministic outputs
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model="gpt-3.5-turbo",
-            temperature=0,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-            api_key=settings.OPENAI_API_KEY,
+    def __init__(self, cache: LLMCache | None = None):
+        # Temperature 0 makes responses deterministic, so cached verdicts are as good as fresh ones
+        self.cache = cache or get_default_llm_cache()
+
+    # The model client and chains come from the process-wide registry, built on first use
+    @cached_property
+    def llm(self):
+        return get_llm(MODEL, TEMPERATURE)
+
+    @cached_property
+    def chain(self):
+        return get_chain(MODEL, TEMPERATURE, FACT_CHECK_TEMPLATE)
+
+    @cached_property
+    def batch_chain(self):
+        return get_chain(MODEL, TEMPERATURE, BATCH_FACT_CHECK_TEMPLATE)
+
+    @cached_property
+    def claim_chain(self):
+        return get_chain(MODEL, TEMPERATURE, CLAIM_CHECK_TEMPLATE)
+
+    def score(self, summary: str, abstract: str) -> Tuple[int, List[str]]:
+        return invoke_cached(
+            self.cache,
+            self.chain,
+            {"abstract": abstract, "summary": summary},
+            model=MODEL,
+            temperature=TEMPERATURE,
+            template=FACT_CHECK_TEMPLATE,
+            stage="fact_check",
+            parse=parse_verdict,
         )
 
-        self.prompt = PromptTemplate(
-            input_variables=["abstract", "summary"],
-            template=(
-                "You are a fact-checking assistant. "
-                "Given the following article abstract and a layperson summary, identify any statements in the summary that are NOT supported by the abstract. "
-                "Respond with a JSON object containing two fields:\n"
-                "  score: the number of unsupported statements,\n"
-                "  issues: a list of the unsupported statements.\n\n"
-                "Abstract:\n{abstract}\n\nSummary:\n{summary}"
-            ),
+    @staticmethod
+    def pack(pairs: list[Tuple[str, str]], token_budget: int) -> List[List[int]]:
+        """
+        Group pair indices so each group's prompt stays within `token_budget` tokens
+        (and `MAX_BATCH_ITEMS` items). A pair too big to share a prompt gets its own group.
+        """
+        available = token_budget - estimate_tokens(BATCH_FACT_CHECK_TEMPLATE)
+        groups: List[List[int]] = []
+        current: List[int] = []
+        used = 0
+        for index, (summary, abstract) in enumerate(pairs):
+            cost = estimate_tokens(ITEM_TEMPLATE) + estimate_tokens(summary) + estimate_tokens(abstract)
+            if current and (used + cost > available or len(current) >= MAX_BATCH_ITEMS):
+                groups.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += cost
+        if current:
+            groups.append(current)
+        return groups
+
+    @staticmethod
+    def parse_batch(response: str, count: int) -> dict[int, Tuple[int, List[str]]]:
+        """
+        Parse a batch response into {item index: (score, issues)}. Items that are
+        missing or malformed are left out, so the caller can re-check them singly.
+        """
+        try:
+            data = json.loads(strip_code_fence(response))
+        except json.JSONDecodeError:
+            return {}
+        if not isinstance(data, list):
+            return {}
+
+        verdicts: dict[int, Tuple[int, List[str]]] = {}
+        for entry in data:
+            if not isinstance(entry, dict):
+                continue
+            item_id, score, issues = entry.get("id"), entry.get("score", 0), entry.get("issues", [])
+            if not isinstance(item_id, int) or not 1 <= item_id <= count:
+                continue
+            if not isinstance(score, (int, float)) or not isinstance(issues, list):
+                continue
+            verdicts[item_id - 1] = (score, issues)
+        return verdicts
+
+    @classmethod
+    def parse_usable_batch(cls, response: str, count: int) -> dict[int, Tuple[int, List[str]]]:
+        """`parse_batch`, raising ValueError when no item could be read so the response is not cached."""
+        verdicts = cls.parse_batch(response, count)
+        if not verdicts:
+            raise ValueError("No usable verdicts in the batch response")
+        return verdicts
+
+    def score_batch(
+        self, pairs: list[Tuple[str, str]], token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET
+    ) -> List[Tuple[int, List[str]] | Exception]:
+        """
+        Score many (summary, abstract) pairs, packing several into each prompt so the
+        instructions are paid for once per group rather than once per pair. Returns one
+        verdict per pair, in order; any pair the batch response does not cover is
+        re-checked with `score`, and an exception from that retry is returned in its place.
+        """
+        results: List[Tuple[int, List[str]] | Exception | None] = [None] * len(pairs)
+        for group in self.pack(pairs, token_budget):
+            verdicts: dict[int, Tuple[int, List[str]]] = {}
+            if len(group) > 1:
+                items = "".join(
+                    ITEM_TEMPLATE.format(id=position, abstract=pairs[index][1], summary=pairs[index][0])
+                    for position, index in enumerate(group, start=1)
+                )
+                try:
+                    verdicts = invoke_cached(
+                        self.cache,
+                        self.batch_chain,
+                        {"items": items},
+                        model=MODEL,
+                        temperature=TEMPERATURE,
+                        template=BATCH_FACT_CHECK_TEMPLATE,
+                        stage="batch_fact_check",
+                        parse=partial(self.parse_usable_batch, count=len(group)),
+                    )
+                # Broad on purpose: whatever sank the batch, each item is re-checked on its own below
+                except Exception as e:
+                    logger.warning("Batch fact-check of %d items failed: %s", len(group), str(e))
+
+            for position, index in enumerate(group):
+                if position in verdicts:
+                    results[index] = verdicts[position]
+                    continue
+                if len(group) > 1:
+                    logger.info("Batch response missed item %d of %d, re-checking it alone", position + 1, len(group))
+                try:
+                    results[index] = self.score(*pairs[index])
+                except Exception as e:
+                    results[index] = e
+        return results
+
+    def check_claim(self, claim: str, evidence: List[str]) -> Tuple[int, List[str]]:
+        """Check one passage of an article against only the summaries retrieved for it."""
+        return invoke_cached(
+            self.cache,
+            self.claim_chain,
+            {"evidence": "\n\n".join(evidence) or "(no matching summaries)", "claim": claim},
+            model=MODEL,
+            temperature=TEMPERATURE,
+            template=CLAIM_CHECK_TEMPLATE,
+            stage="claim_check",
+            parse=parse_verdict,
         )
-        self.chain = self.prompt | self.llm | StrOutputParser()
 
-    def score(self, summary: str, abstract: str) -> Tuple[int, List[str]]:
-        response = self.chain.invoke({"abstract": abstract, "summary": summary})
-        data = json.loads(response)
-        return data.get("score", 0), data.get("issues", [])
+    def score_grounded(
+        self,
+        article_text: str,
+        summaries: List[str],
+        evidence_k: int = DEFAULT_EVIDENCE_K,
+        concurrency: int = 1,
+    ) -> Tuple[int, List[str]]:
+        """
+        Fact-check a long article against a large set of summaries. The article is split
+        into passages, each passage is checked against its `evidence_k` best BM25 matches
+        among the summaries, and up to `concurrency` checks run at once. The scores and
+        issues of all passages are combined, so the cost grows with the article, not the corpus.
+        """
+        index = BM25Index(summaries)
+        claims = split_claims(article_text)
+        logger.info("Fact-checking %d passages against %d summaries", len(claims), len(index))
+
+        def check(claim: str) -> Tuple[int, List[str]]:
+            return self.check_claim(claim, [summaries[position] for position in index.search(claim, evidence_k)])
+
+        total, issues = 0, []
+        for claim, verdict, error in bounded_map(check, claims, concurrency, ordered=True):
+            if error is not None:
+                raise error
+            total += verdict[0]
+            issues.extend(verdict[1])
+        return total, issues
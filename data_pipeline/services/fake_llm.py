@@ -0,0 +1,211 @@
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from data_pipeline.services.text import SENTENCE_BOUNDARY, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+ITEM_HEADER = re.compile(r"^Item (\d+)\n", re.MULTILINE)
+# Where the checked text starts in each fact-check template, and where the part under scrutiny begins
+SOURCE_MARKERS = ("Abstract:\n", "Evidence:\n")
+CHECKED_MARKERS = ("Summary:\n", "Passage:\n")
+MAX_FAKE_ISSUES = 2
+PROSE_WORDS = (40, 160)
+STREAM_CHUNK_WORDS = 4
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode()).digest()
+
+
+def fake_verdict(segment: str) -> dict:
+    """
+    A fact-check verdict that depends only on `segment` (the source and the text checked
+    against it), so a pair gets the same verdict whether it is checked alone or in a batch.
+    """
+    digest = _digest(segment.strip())
+    checked = segment
+    for marker in CHECKED_MARKERS:
+        if marker in segment:
+            checked = segment.rsplit(marker, 1)[1]
+    sentences = [sentence for sentence in SENTENCE_BOUNDARY.split(" ".join(checked.split())) if sentence]
+    score = digest[0] % (MAX_FAKE_ISSUES + 1)
+    issues = [
+        sentences[digest[i + 1] % len(sentences)] if sentences else f"Unsupported statement {i + 1}"
+        for i in range(score)
+    ]
+    return {"score": score, "issues": issues}
+
+
+def fake_completion(prompt: str) -> str:
+    """
+    A deterministic answer to `prompt`: a JSON array of verdicts for batched fact checks,
+    a JSON verdict for single fact checks, and otherwise prose made from the prompt's own words.
+    """
+    if "JSON array" in prompt:
+        headers = list(ITEM_HEADER.finditer(prompt))
+        verdicts = []
+        for header, following in zip(headers, headers[1:] + [None]):
+            segment = prompt[header.end() : following.start() if following else len(prompt)]
+            verdicts.append({"id": int(header.group(1)), **fake_verdict(segment)})
+        return json.dumps(verdicts)
+    if "JSON object" in prompt:
+        starts = [prompt.find(marker) for marker in SOURCE_MARKERS if marker in prompt]
+        return json.dumps(fake_verdict(prompt[min(starts) :] if starts else prompt))
+
+    rng = random.Random(_digest(prompt))
+    words = re.findall(r"[A-Za-z][A-Za-z-]+", prompt) or ["lorem", "ipsum"]
+    length = rng.randint(*PROSE_WORDS)
+    sentences, sentence = [], []
+    for _ in range(length):
+        sentence.append(rng.choice(words).lower())
+        if len(sentence) >= rng.randint(8, 16):
+            sentences.append(" ".join(sentence).capitalize() + ".")
+            sentence = []
+    if sentence:
+        sentences.append(" ".join(sentence).capitalize() + ".")
+    return " ".join(sentences)
+
+
+@dataclass
+class FakeLLMConfig:
+    latency: float = 0.5  # median seconds before the first token
+    latency_sigma: float = 0.5  # spread of the log-normal latency distribution; 0 for a fixed latency
+    tokens_per_second: float = 50.0  # generation speed after the first token; 0 for instant
+    rate_limit_rate: float = 0.0  # fraction of requests answered with 429
+    error_rate: float = 0.0  # fraction of requests answered with 500
+    seed: int | None = None  # seeds latency and error injection; responses are always deterministic
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeLLMServer"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(format, *args)
+
+    def send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_event(self, body: dict | str) -> None:
+        data = body if isinstance(body, str) else json.dumps(body)
+        self.wfile.write(f"data: {data}\n\n".encode())
+        self.wfile.flush()
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        outcome = self.server.roll()
+        if outcome == 429:
+            error = {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}
+            self.send_json(429, {"error": error})
+            return
+        if outcome == 500:
+            self.send_json(500, {"error": {"message": "The server had an error (fake)", "type": "server_error"}})
+            return
+
+        prompt = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+        text = fake_completion(prompt)
+        usage = {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = "chatcmpl-fake-" + _digest(prompt).hex()[:24]
+        model = request.get("model", "fake")
+        time.sleep(self.server.sample_latency())
+
+        if not request.get("stream"):
+            time.sleep(self.server.generation_time(usage["completion_tokens"]))
+            self.send_json(
+                200,
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": text},
+                            "finish_reason": "stop",
+                            "logprobs": None,
+                        }
+                    ],
+                    "usage": usage,
+                },
+            )
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        words = text.split(" ")
+        for start in range(0, len(words), STREAM_CHUNK_WORDS):
+            piece = " ".join(words[start : start + STREAM_CHUNK_WORDS])
+            piece = piece if start == 0 else " " + piece
+            time.sleep(self.server.generation_time(estimate_tokens(piece)))
+            self.send_event({**chunk, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+        self.send_event({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self.send_event({**chunk, "choices": [], "usage": usage})
+        self.send_event("[DONE]")
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """
+    A local stand-in for the OpenAI chat completions API, for load tests and benchmarks
+    without network access or an API key. Answers are deterministic functions of the
+    prompt (see `fake_completion`); latency, generation speed and injected 429/500
+    errors follow `config`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], config: FakeLLMConfig | None = None):
+        super().__init__(address, FakeOpenAIHandler)
+        self.config = config or FakeLLMConfig()
+        self.rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as OPENAI_BASE_URL."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def roll(self) -> int:
+        """The status this request is answered with: 429, 500 or 200."""
+        with self._lock:
+            draw = self.rng.random()
+        if draw < self.config.rate_limit_rate:
+            return 429
+        if draw < self.config.rate_limit_rate + self.config.error_rate:
+            return 500
+        return 200
+
+    def sample_latency(self) -> float:
+        if self.config.latency <= 0:
+            return 0.0
+        if self.config.latency_sigma <= 0:
+            return self.config.latency
+        with self._lock:
+            return self.rng.lognormvariate(0, self.config.latency_sigma) * self.config.latency
+
+    def generation_time(self, tokens: int) -> float:
+        return tokens / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0.0
@@ -0,0 +1,63 @@
+import math
+import re
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+# Function words that would otherwise dominate short layperson summaries
+STOPWORDS = frozenset(
+    "a an and are as at be been but by can for from had has have in into is it its of on or that the their "
+    "there these they this to was were which while who will with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word tokens with stopwords removed; hyphenated terms (e.g. covid-19) are kept whole."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index over a list of documents.
+
+    Built once per run from the summaries being checked, so retrieval needs no external
+    search service. `search` returns document positions, best match first.
+    """
+
+    def __init__(self, documents: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(document)) for document in documents]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        document_frequency: Counter[str] = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.term_counts)
+
+    def score(self, query_terms: list[str], position: int) -> float:
+        counts = self.term_counts[position]
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / (self.average_length or 1))
+        total = 0.0
+        for term in query_terms:
+            frequency = counts.get(term)
+            if frequency:
+                total += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+        return total
+
+    def search(self, query: str, k: int) -> list[int]:
+        """Positions of the `k` best-matching documents; documents sharing no terms with the query are skipped."""
+        query_terms = [term for term in set(tokenize(query)) if term in self.idf]
+        if not query_terms:
+            return []
+        scored = [(self.score(query_terms, position), position) for position in range(len(self))]
+        ranked = sorted((item for item in scored if item[0] > 0), key=lambda item: (-item[0], item[1]))
+        return [position for _, position in ranked[:k]]
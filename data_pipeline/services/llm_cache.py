@@ -0,0 +1,121 @@
+import hashlib
+import logging
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from data_pipeline.services import telemetry
+from data_pipeline.services.disk_cache import DiskCache
+from data_pipeline.services.llm_gateway import get_gateway
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Persistent cache of LLM completions, shared by every service that calls a model.
+
+    Keys hash the model, temperature, prompt template and prompt inputs. Editing a
+    template changes its hash, so old completions are never served again and simply
+    age out of the underlying DiskCache through its TTL and LRU eviction.
+    """
+
+    def __init__(self, store: DiskCache):
+        self.store = store
+
+    @staticmethod
+    def template_version(template: str) -> str:
+        return hashlib.sha256(template.encode()).hexdigest()[:16]
+
+    def key(self, model: str, temperature: float, template: str, inputs: dict) -> str:
+        return DiskCache.make_key(model, temperature, self.template_version(template), inputs)
+
+    def get(self, key: str) -> str | None:
+        cached = self.store.get(key)
+        return cached.decode() if cached is not None else None
+
+    def set(self, key: str, response: str) -> None:
+        self.store.set(key, response.encode())
+
+    def clear(self) -> None:
+        self.store.clear()
+
+
+def get_default_llm_cache() -> LLMCache | None:
+    """The LLM response cache configured in settings, if any."""
+    if not settings.LLM_CACHE_DIR:
+        return None
+    return LLMCache(
+        DiskCache(settings.LLM_CACHE_DIR, ttl=settings.LLM_CACHE_TTL, max_bytes=settings.LLM_CACHE_MAX_BYTES)
+    )
+
+
+def invoke_cached(
+    cache: LLMCache | None,
+    chain,
+    inputs: dict,
+    *,
+    model: str,
+    temperature: float,
+    template: str,
+    stage: str = "llm",
+    parse: Callable[[str], Any] | None = None,
+) -> Any:
+    """
+    Invoke `chain` through the model's gateway, serving and storing its output through
+    `cache` when one is configured. Cache hits never count against the rate limits, and
+    are recorded under `stage` as cached calls.
+
+    With `parse`, the parsed output is returned instead, and a completion is only cached
+    once it parses: `parse` raises ValueError for malformed output, which is then asked
+    for again next time rather than replayed. A cached entry that no longer parses is
+    treated as a miss.
+    """
+    parse = parse or (lambda response: response)
+    gateway = get_gateway(model)
+    if cache is None:
+        return parse(gateway.invoke(chain, inputs, template, stage))
+
+    key = cache.key(model, temperature, template, inputs)
+    cached = cache.get(key)
+    if cached is not None:
+        try:
+            parsed = parse(cached)
+        except ValueError as e:
+            logger.warning("Ignoring unparseable cached response for %s: %s", model, str(e))
+        else:
+            logger.debug("LLM cache hit for %s (template %s)", model, cache.template_version(template))
+            telemetry.record(telemetry.CallStats(model=model, stage=stage, tokens_estimated=False, cached=True))
+            return parsed
+
+    response = gateway.invoke(chain, inputs, template, stage)
+    parsed = parse(response)
+    cache.set(key, response)
+    return parsed
+
+
+def stream_cached(
+    cache: LLMCache | None, chain, inputs: dict, *, model: str, temperature: float, template: str, stage: str = "llm"
+) -> Iterator[str]:
+    """
+    Streaming counterpart of `invoke_cached`: yields output chunks as the model produces them.
+    A cache hit is yielded as a single chunk; a fresh completion is only cached once it finishes.
+    """
+    gateway = get_gateway(model)
+    if cache is None:
+        yield from gateway.stream(chain, inputs, template, stage)
+        return
+
+    key = cache.key(model, temperature, template, inputs)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.debug("LLM cache hit for %s (template %s)", model, cache.template_version(template))
+        telemetry.record(telemetry.CallStats(model=model, stage=stage, tokens_estimated=False, cached=True))
+        yield cached
+        return
+
+    chunks = []
+    for chunk in gateway.stream(chain, inputs, template, stage):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(key, "".join(chunks))
@@ -0,0 +1,176 @@
+import functools
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import openai
+from data_pipeline.services import telemetry
+from data_pipeline.services.rate_limiter import TokenBucket
+from data_pipeline.services.text import estimate_tokens
+from django.conf import settings
+from tenacity import Retrying, before_sleep_log, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean "back off and try again", as opposed to a bad request
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+# Errors that mean the provider is at capacity, so fewer requests should be in flight
+OVERLOAD_ERRORS = (openai.RateLimitError, openai.APITimeoutError)
+
+EXPECTED_COMPLETION_TOKENS = 500
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on in-flight requests, starting at `maximum`. Each successful call raises
+    the limit by about one per limit's worth of calls; a rate-limit error or timeout halves
+    it, and a call slower than `latency_target` trims it by 10%. Decreases are spaced out
+    by `cooldown` seconds so one burst of errors from requests already in flight only
+    counts once.
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        initial: int | None = None,
+        latency_target: float | None = None,
+        cooldown: float = 1.0,
+    ):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(initial if initial is not None else maximum)
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, overloaded: bool = False, failed: bool = False) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if overloaded or (self.latency_target is not None and latency > self.latency_target):
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * (0.5 if overloaded else 0.9))
+                    self._last_decrease = now
+                    logger.info("LLM concurrency limit lowered to %.1f", self.limit)
+            elif not failed:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one in-flight slot for the duration of a call, adjusting the limit by how it went."""
+        self.acquire()
+        outcome = {"overloaded": False, "failed": False}
+        started = time.monotonic()
+        try:
+            yield
+        except OVERLOAD_ERRORS:
+            outcome["overloaded"] = True
+            raise
+        except Exception:
+            outcome["failed"] = True
+            raise
+        finally:
+            self.release(time.monotonic() - started, **outcome)
+
+
+class LLMGateway:
+    """
+    Process-wide front door for calls to one model: keeps requests and tokens per minute
+    under the account's limits, adapts how many calls are in flight to the provider's
+    responses, and retries throttled or timed-out calls with jittered backoff. The clients
+    themselves are built with a request timeout and no retries of their own, so retries
+    are never multiplied.
+
+    Token use is metered on estimates: prompt tokens plus an expected completion are
+    reserved up front, and the difference is settled once the response is known. Every
+    call is recorded with `telemetry` under the stage it was made for.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int,
+        latency_target: float | None = None,
+        max_retries: int = 3,
+        model: str = "",
+    ):
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute / 60)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, latency_target=latency_target)
+        self.retrying = Retrying(
+            stop=stop_after_attempt(max_retries + 1),
+            wait=wait_random_exponential(multiplier=1, max=60),
+            retry=retry_if_exception_type(RETRYABLE_ERRORS),
+            reraise=True,
+            before_sleep=before_sleep_log(logger, logging.INFO),
+        )
+
+    @staticmethod
+    def estimate_prompt_tokens(template: str, inputs: dict) -> int:
+        return estimate_tokens(template) + sum(estimate_tokens(str(value)) for value in inputs.values())
+
+    def _meter(self, prompt_tokens: int) -> None:
+        # Wait for the rate limits before taking a concurrency slot, so the wait is not counted as latency
+        self.requests.acquire(1)
+        self.tokens.acquire(prompt_tokens + EXPECTED_COMPLETION_TOKENS)
+
+    def _settle(self, call: telemetry.CallStats, response: str) -> None:
+        if call.tokens_estimated:
+            call.completion_tokens = estimate_tokens(response)
+        difference = call.completion_tokens - EXPECTED_COMPLETION_TOKENS
+        if difference > 0:
+            self.tokens.reserve(difference)
+        else:
+            self.tokens.refund(-difference)
+
+    def _call(self, chain, inputs: dict, prompt_tokens: int, call: telemetry.CallStats) -> str:
+        self._meter(prompt_tokens)
+        with self.concurrency.slot(), telemetry.request(call):
+            response = chain.invoke(inputs)
+        self._settle(call, response)
+        return response
+
+    def invoke(self, chain, inputs: dict, template: str, stage: str = "llm") -> str:
+        """`chain.invoke(inputs)`, metered, concurrency-limited and retried."""
+        prompt_tokens = self.estimate_prompt_tokens(template, inputs)
+        with telemetry.measure(self.model, stage, prompt_tokens) as call:
+            return self.retrying(self._call, chain, inputs, prompt_tokens, call)
+
+    def stream(self, chain, inputs: dict, template: str, stage: str = "llm") -> Iterator[str]:
+        """`chain.stream(inputs)`, metered and holding a concurrency slot until the stream ends. Not retried."""
+        chunks = []
+        prompt_tokens = self.estimate_prompt_tokens(template, inputs)
+        with telemetry.measure(self.model, stage, prompt_tokens) as call:
+            self._meter(prompt_tokens)
+            with self.concurrency.slot(), telemetry.request(call):
+                for chunk in chain.stream(inputs):
+                    chunks.append(chunk)
+                    yield chunk
+            self._settle(call, "".join(chunks))
+
+
+@functools.lru_cache(maxsize=None)
+def get_gateway(model: str) -> LLMGateway:
+    """One gateway per model per process, so every service calling the model shares its limits."""
+    return LLMGateway(
+        requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        latency_target=settings.LLM_LATENCY_TARGET,
+        max_retries=settings.LLM_MAX_RETRIES,
+        model=model,
+    )
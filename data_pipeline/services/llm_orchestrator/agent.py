@@ -1,7 +1,57 @@
-from django.conf import settings
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
+from collections.abc import Iterator
+from functools import cached_property
+
+from data_pipeline.services.concurrency import bounded_map
+from data_pipeline.services.disk_cache import DiskCache
+from data_pipeline.services.llm_cache import LLMCache, get_default_llm_cache, invoke_cached, stream_cached
+from data_pipeline.services.llm_registry import get_chain, get_llm
+from data_pipeline.services.text import estimate_tokens, split_by_token_budget
+
+MODEL = "gpt-3.5-turbo"
+# Set temperature to 0.7 for more creative outputs
+TEMPERATURE = 0.7
+
+SUMMARY_TEMPLATE = (
+    "You are a helpful assistant tasked with summarizing PubMed abstracts in plain English. "
+    "Write a single paragraph summary for a general audience. "
+    "Cover epidemiology, risk factors, diagnostics, progression, and prevention. "
+    "Define any technical terms.\n\n"
+    "Abstract:\n{abstract}\n"
+)
+
+TREND_TEMPLATE = (
+    "You are a research analyst. Given the following layperson summaries of Covid-19 research abstracts from 2020, "
+    "write a 'Trends in Covid Research in 2020' article suitable for a general audience. "
+    "Highlight key similarities, differences, and patterns over time. "
+    "Ground every claim in these summaries.\n\n"
+    "Summaries:\n{summaries}\n"
+)
+
+# Map-reduce synthesis: notes per group of summaries, merged until they fit one final prompt
+PARTIAL_TREND_TEMPLATE = (
+    "You are a research analyst. Given the following layperson summaries of Covid-19 research abstracts from {period}, "
+    "write concise notes on the key findings, similarities, differences, and emerging patterns. "
+    "Ground every point in these summaries.\n\n"
+    "Summaries:\n{summaries}\n"
+)
+
+REDUCE_TREND_TEMPLATE = (
+    "You are a research analyst. Given the following notes on Covid-19 research from 2020, each covering a different "
+    "set of research summaries, merge them into a single set of concise notes. "
+    "Keep points that recur across the notes, record differences and changes over time, "
+    "and do not add anything the notes do not support.\n\n"
+    "Notes:\n{reports}\n"
+)
+
+FINAL_TREND_TEMPLATE = (
+    "You are a research analyst. Given the following notes on Covid-19 research abstracts from 2020, "
+    "write a 'Trends in Covid Research in 2020' article suitable for a general audience. "
+    "Highlight key similarities, differences, and patterns over time. "
+    "Ground every claim in these notes.\n\n"
+    "Notes:\n{reports}\n"
+)
+
+DEFAULT_SYNTHESIS_TOKEN_BUDGET = 6000
 
 
 class LLMOrchestrator:
@@ -9,44 +59,209 @@ class LLMOrchestrator:
     Service for orchestrating LLM-powered summaries and trend synthesis.
     """
 
-    # Set temperature to 0.7 for more creative outputs
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model="gpt-3.5-turbo",
-            temperature= 0.7,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-            api_key=settings.OPENAI_API_KEY,
-        )
+    def __init__(self, cache: LLMCache | None = None):
+        self.cache = cache or get_default_llm_cache()
 
-        self.summary_prompt = PromptTemplate(
-            input_variables=["abstract"],
-            template=(
-                "You are a helpful assistant tasked with summarizing PubMed abstracts in plain English. "
-                "Write a single paragraph summary for a general audience. "
-                "Cover epidemiology, risk factors, diagnostics, progression, and prevention. "
-                "Define any technical terms.\n\n"
-                "Abstract:\n{abstract}\n"
-            ),
+    # The model client and chains come from the process-wide registry, built on first use
+    @cached_property
+    def llm(self):
+        return get_llm(MODEL, TEMPERATURE)
+
+    @cached_property
+    def summary_chain(self):
+        return get_chain(MODEL, TEMPERATURE, SUMMARY_TEMPLATE)
+
+    @cached_property
+    def trend_chain(self):
+        return get_chain(MODEL, TEMPERATURE, TREND_TEMPLATE)
+
+    @cached_property
+    def partial_trend_chain(self):
+        return get_chain(MODEL, TEMPERATURE, PARTIAL_TREND_TEMPLATE)
+
+    @cached_property
+    def reduce_trend_chain(self):
+        return get_chain(MODEL, TEMPERATURE, REDUCE_TREND_TEMPLATE)
+
+    @cached_property
+    def final_trend_chain(self):
+        return get_chain(MODEL, TEMPERATURE, FINAL_TREND_TEMPLATE)
+
+    def _invoke(self, stage: str, chain, template: str, inputs: dict) -> str:
+        return invoke_cached(
+            self.cache, chain, inputs, model=MODEL, temperature=TEMPERATURE, template=template, stage=stage
         )
-        self.summary_chain = self.summary_prompt | self.llm | StrOutputParser()
-
-        self.trend_prompt = PromptTemplate(
-            input_variables=["summaries"],
-            template=(
-                "You are a research analyst. Given the following layperson summaries of Covid-19 research abstracts from 2020, "
-                "write a 'Trends in Covid Research in 2020' article suitable for a general audience. "
-                "Highlight key similarities, differences, and patterns over time. "
-                "Ground every claim in these summaries.\n\n"
-                "Summaries:\n{summaries}\n"
-            ),
+
+    def _stream(self, stage: str, chain, template: str, inputs: dict) -> Iterator[str]:
+        return stream_cached(
+            self.cache, chain, inputs, model=MODEL, temperature=TEMPERATURE, template=template, stage=stage
         )
-        self.trend_chain = self.trend_prompt | self.llm | StrOutputParser()
 
     def summarize(self, abstract: str) -> str:
-        return self.summary_chain.invoke({"abstract": abstract}).strip()
+        return self._invoke("summarize", self.summary_chain, SUMMARY_TEMPLATE, {"abstract": abstract}).strip()
 
     def synthesize_trends(self, summaries: list[str]) -> str:
         combined = "\n\n".join(summaries)
-        return self.trend_chain.invoke({"summaries": combined}).strip()
+        return self._invoke("trends", self.trend_chain, TREND_TEMPLATE, {"summaries": combined}).strip()
+
+    def stream_trends(self, summaries: list[str]) -> Iterator[str]:
+        """Streaming version of `synthesize_trends`: yields the article in chunks as it is generated."""
+        combined = "\n\n".join(summaries)
+        yield from self._stream("trends", self.trend_chain, TREND_TEMPLATE, {"summaries": combined})
+
+    def synthesize_partial(self, period: str, summaries: list[str]) -> str:
+        """Notes on one group of summaries (the "map" step)."""
+        inputs = {"period": period, "summaries": "\n\n".join(summaries)}
+        return self._invoke("partial_trends", self.partial_trend_chain, PARTIAL_TREND_TEMPLATE, inputs).strip()
+
+    def reduce_reports(self, reports: list[str]) -> str:
+        """Merge several sets of notes into one (the "reduce" step)."""
+        inputs = {"reports": "\n\n".join(reports)}
+        return self._invoke("reduce_trends", self.reduce_trend_chain, REDUCE_TREND_TEMPLATE, inputs).strip()
+
+    def write_trend_article(self, reports: list[str]) -> str:
+        """Write the final article from notes that fit in a single prompt."""
+        inputs = {"reports": "\n\n".join(reports)}
+        return self._invoke("final_trends", self.final_trend_chain, FINAL_TREND_TEMPLATE, inputs).strip()
+
+    def stream_trend_article(self, reports: list[str]) -> Iterator[str]:
+        """Streaming version of `write_trend_article`."""
+        inputs = {"reports": "\n\n".join(reports)}
+        yield from self._stream("final_trends", self.final_trend_chain, FINAL_TREND_TEMPLATE, inputs)
+
+    def map_partials(
+        self,
+        groups: dict[str, list[str]],
+        token_budget: int = DEFAULT_SYNTHESIS_TOKEN_BUDGET,
+        concurrency: int = 1,
+    ) -> dict[str, str]:
+        """
+        Run the map step for each labelled group of summaries, `concurrency` calls at a time.
+        Groups bigger than `token_budget` are split and their notes merged, so every call
+        stays within the budget. Returns notes per label, in the groups' order.
+        """
+        tasks = [
+            (label, chunk)
+            for label, summaries in groups.items()
+            for chunk in split_by_token_budget(summaries, token_budget)
+        ]
+        notes: dict[str, list[str]] = {label: [] for label in groups}
+        for (label, chunk), partial, error in bounded_map(
+            lambda task: self.synthesize_partial(*task), tasks, concurrency, ordered=True
+        ):
+            if error is not None:
+                raise error
+            notes[label].append(partial)
+
+        # Split groups are merged back to one set of notes per label, all labels at once
+        merged = self.reduce_each_until_fits(
+            {label: partials for label, partials in notes.items() if len(partials) > 1}, token_budget, concurrency
+        )
+        final = {}
+        for label, merged_notes, error in bounded_map(
+            lambda label: self.reduce_reports(merged[label]), list(merged), concurrency, ordered=True
+        ):
+            if error is not None:
+                raise error
+            final[label] = merged_notes
+        return {
+            label: partials[0] if len(partials) == 1 else final[label]
+            for label, partials in notes.items()
+            if partials
+        }
+
+    @staticmethod
+    def _merge_groups(reports: list[str], token_budget: int) -> list[list[str]] | None:
+        """How to merge `reports` in one round, or None once they fit within `token_budget` together."""
+        if len(reports) <= 1 or sum(estimate_tokens(report) for report in reports) <= token_budget:
+            return None
+        groups = split_by_token_budget(reports, token_budget)
+        if len(groups) == len(reports):
+            # Every report fills the budget alone; merge pairs so each round still halves the count
+            groups = [reports[i : i + 2] for i in range(0, len(reports), 2)]
+        return groups
+
+    def reduce_each_until_fits(
+        self, reports_by_label: dict[str, list[str]], token_budget: int, concurrency: int = 1
+    ) -> dict[str, list[str]]:
+        """
+        `reduce_until_fits` for several labelled sets of reports at once. Each round's merges,
+        across every label, share one pool of `concurrency` calls.
+        """
+        reports_by_label = dict(reports_by_label)
+        while True:
+            tasks = [
+                (label, group)
+                for label, reports in reports_by_label.items()
+                for group in self._merge_groups(reports, token_budget) or []
+            ]
+            if not tasks:
+                return reports_by_label
+            reduced: dict[str, list[str]] = {label: [] for label, _ in tasks}
+            for (label, _), merged, error in bounded_map(
+                lambda task: task[1][0] if len(task[1]) == 1 else self.reduce_reports(task[1]),
+                tasks,
+                concurrency,
+                ordered=True,
+            ):
+                if error is not None:
+                    raise error
+                reduced[label].append(merged)
+            reports_by_label.update(reduced)
+
+    def reduce_until_fits(self, reports: list[str], token_budget: int, concurrency: int = 1) -> list[str]:
+        """Merge reports in parallel rounds until together they fit within `token_budget`."""
+        return self.reduce_each_until_fits({"": reports}, token_budget, concurrency)[""]
+
+    def synthesize_trends_map_reduce(
+        self,
+        groups: dict[str, list[str]],
+        token_budget: int = DEFAULT_SYNTHESIS_TOKEN_BUDGET,
+        concurrency: int = 1,
+    ) -> str:
+        """
+        Hierarchical version of `synthesize_trends` for corpora too big for one prompt.
+        Each labelled group (e.g. a month) is turned into notes in parallel, the notes are
+        merged until they fit within `token_budget`, and the article is written from them.
+        """
+        reports = list(self.map_partials(groups, token_budget, concurrency).values())
+        return self.write_from_partials(reports, token_budget, concurrency)
+
+    def write_from_partials(
+        self, reports: list[str], token_budget: int = DEFAULT_SYNTHESIS_TOKEN_BUDGET, concurrency: int = 1
+    ) -> str:
+        """The reduce half of map-reduce synthesis, for notes that were built (or stored) earlier."""
+        return self.write_trend_article(self.reduce_until_fits(reports, token_budget, concurrency))
+
+    def stream_from_partials(
+        self, reports: list[str], token_budget: int = DEFAULT_SYNTHESIS_TOKEN_BUDGET, concurrency: int = 1
+    ) -> Iterator[str]:
+        """Streaming version of `write_from_partials`; the merge rounds finish before the first chunk."""
+        yield from self.stream_trend_article(self.reduce_until_fits(reports, token_budget, concurrency))
+
+    def stream_trends_map_reduce(
+        self,
+        groups: dict[str, list[str]],
+        token_budget: int = DEFAULT_SYNTHESIS_TOKEN_BUDGET,
+        concurrency: int = 1,
+    ) -> Iterator[str]:
+        """Streaming version of `synthesize_trends_map_reduce`."""
+        reports = list(self.map_partials(groups, token_budget, concurrency).values())
+        yield from self.stream_from_partials(reports, token_budget, concurrency)
+
+    @staticmethod
+    def partial_fingerprint(period: str, summaries: list[str], token_budget: int) -> str:
+        """
+        Identifies everything a period's notes depend on: the summaries, the prompts and
+        model that turn them into notes, and the budget used to split them. Stored notes
+        whose fingerprint still matches can be reused instead of being regenerated.
+        """
+        return DiskCache.make_key(
+            MODEL,
+            TEMPERATURE,
+            LLMCache.template_version(PARTIAL_TREND_TEMPLATE),
+            LLMCache.template_version(REDUCE_TREND_TEMPLATE),
+            token_budget,
+            period,
+            summaries,
+        )
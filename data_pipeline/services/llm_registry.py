@@ -0,0 +1,67 @@
+import functools
+import logging
+
+import httpx
+from data_pipeline.services import telemetry
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def get_http_client() -> httpx.Client:
+    """
+    The HTTP connection pool shared by every model client in the process, so concurrent
+    stages reuse warm keep-alive connections to the provider.
+    """
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=settings.LLM_MAX_CONCURRENCY,
+            max_keepalive_connections=settings.LLM_MAX_CONCURRENCY,
+        ),
+        timeout=settings.LLM_REQUEST_TIMEOUT,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_usage_callback():
+    """LangChain callback passing the token usage the provider reports for each call to `telemetry`."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class UsageCallback(BaseCallbackHandler):
+        def on_llm_end(self, response, **kwargs) -> None:
+            telemetry.record_usage(response)
+
+    return UsageCallback()
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm(model: str, temperature: float):
+    """The chat model client for (model, temperature), built on first use."""
+    # Imported here so commands that never call a model do not pay for loading LangChain
+    from langchain_openai import ChatOpenAI
+
+    logger.debug("Building %s client (temperature=%s)", model, temperature)
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        max_tokens=None,
+        # Retries and backoff are left to the shared LLM gateway so they are not multiplied
+        timeout=settings.LLM_REQUEST_TIMEOUT,
+        max_retries=0,
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL,
+        http_client=get_http_client(),
+        callbacks=[get_usage_callback()],
+        # Report token usage for streamed responses too
+        stream_usage=True,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_chain(model: str, temperature: float, template: str):
+    """`prompt | model | str parser` for a prompt template, built once per process and shared by all callers."""
+    from langchain.prompts import PromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+
+    return PromptTemplate.from_template(template) | get_llm(model, temperature) | StrOutputParser()
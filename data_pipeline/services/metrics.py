@@ -0,0 +1,290 @@
+import functools
+import logging
+import math
+import os
+import tempfile
+import threading
+from collections.abc import Callable, Iterable
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """A named family of samples, one per label set, rendered in the Prometheus text format."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def samples(self) -> Iterable[tuple[str, Labels, float]]:
+        raise NotImplementedError
+
+    def render(self, extra_labels: Labels = ()) -> str:
+        """The metric's samples, each with `extra_labels` in front of its own."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [
+            f"{name}{format_labels(extra_labels + labels)} {format_value(value)}"
+            for name, labels, value in self.samples()
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[tuple[str, Labels, float]]:
+        with self._lock:
+            return [(self.name, labels, value) for labels, value in sorted(self.values.items())]
+
+
+class Gauge(Metric):
+    """
+    A value that can go up and down. With `collect`, the values are instead read at
+    render time from `collect()`, a mapping of label values (in `labelnames` order) to value.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        collect: Callable[[], dict[tuple, float]] | None = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self.values: dict[Labels, float] = {}
+        self.collect = collect
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = value
+
+    def samples(self) -> Iterable[tuple[str, Labels, float]]:
+        if self.collect is not None:
+            collected = {
+                self._key(dict(zip(self.labelnames, label_values))): value
+                for label_values, value in self.collect().items()
+            }
+            return [(self.name, labels, value) for labels, value in sorted(collected.items())]
+        with self._lock:
+            return [(self.name, labels, value) for labels, value in sorted(self.values.items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(set(buckets) | {math.inf}))
+        self.counts: dict[Labels, list[int]] = {}
+        self.sums: dict[Labels, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self.counts.setdefault(key, [0] * len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self.sums[key] = self.sums.get(key, 0) + value
+
+    def samples(self) -> Iterable[tuple[str, Labels, float]]:
+        samples = []
+        with self._lock:
+            for labels, counts in sorted(self.counts.items()):
+                for bound, count in zip(self.buckets, counts):
+                    samples.append((f"{self.name}_bucket", labels + (("le", format_value(bound)),), count))
+                samples.append((f"{self.name}_sum", labels, self.sums[labels]))
+                samples.append((f"{self.name}_count", labels, counts[-1]))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self, extra_labels: Labels = ()) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self.metrics.values())
+        rendered = []
+        for metric in metrics:
+            try:
+                rendered.append(metric.render(extra_labels))
+            # Broad on purpose: one broken collector must not fail the whole scrape
+            except Exception as e:
+                logger.error("Failed to collect metric %s: %s", metric.name, str(e))
+        return "\n".join(rendered) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def collect_backlog() -> dict[tuple, float]:
+    # Imported here so services can record metrics without importing the models
+    from data_pipeline.models import Job
+    from data_pipeline.services.work_queue import pending_objects
+
+    return {(stage,): pending_objects(stage).count() for stage in Job.Stage.values}
+
+
+def collect_jobs() -> dict[tuple, float]:
+    from data_pipeline.models import Job
+    from django.db.models import Count
+
+    rows = Job.objects.values_list("stage", "status").annotate(count=Count("pk")).order_by()
+    return {(stage, status): count for stage, status, count in rows}
+
+
+# E-utilities
+PUBMED_REQUESTS = REGISTRY.register(
+    Counter("pubmed_requests_total", "E-utilities requests sent, by endpoint and HTTP status", ["endpoint", "status"])
+)
+PUBMED_REQUEST_SECONDS = REGISTRY.register(
+    Histogram("pubmed_request_seconds", "E-utilities response time, excluding rate-limit waits", ["endpoint"])
+)
+
+# Pipeline stages
+ARTICLES_FETCHED = REGISTRY.register(Counter("pipeline_articles_fetched_total", "Articles fetched and upserted"))
+ITEMS_PROCESSED = REGISTRY.register(
+    Counter("pipeline_items_processed_total", "Articles summarized or summaries validated", ["stage", "outcome"])
+)
+BACKLOG = REGISTRY.register(
+    Gauge("pipeline_backlog", "Rows still waiting for a stage", ["stage"], collect=collect_backlog)
+)
+JOBS = REGISTRY.register(
+    Gauge("pipeline_jobs", "Work queue jobs by stage and status", ["stage", "status"], collect=collect_jobs)
+)
+
+# Model calls
+LLM_CALLS = REGISTRY.register(
+    Counter("llm_calls_total", "Model calls by stage and outcome (ok, cached or error)", ["stage", "outcome"])
+)
+LLM_RETRIES = REGISTRY.register(Counter("llm_retries_total", "Model call attempts that were retried", ["stage"]))
+LLM_TOKENS = REGISTRY.register(Counter("llm_tokens_total", "Tokens used, by stage and type", ["stage", "type"]))
+LLM_CALL_SECONDS = REGISTRY.register(
+    Histogram("llm_call_seconds", "Model response time for the final attempt of each call", ["stage"])
+)
+
+
+def observe_pubmed_request(url: str, status: int | str, seconds: float) -> None:
+    endpoint = url.rsplit("/", 1)[-1].split(".", 1)[0]  # e.g. "efetch" for .../efetch.fcgi
+    PUBMED_REQUESTS.inc(endpoint=endpoint, status=status)
+    PUBMED_REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+
+
+def observe_llm_call(call) -> None:
+    """Count a finished `telemetry.CallStats`."""
+    outcome = "cached" if call.cached else "error" if call.failed else "ok"
+    LLM_CALLS.inc(stage=call.stage, outcome=outcome)
+    if call.cached:
+        return
+    if call.retries:
+        LLM_RETRIES.inc(call.retries, stage=call.stage)
+    LLM_TOKENS.inc(call.prompt_tokens, stage=call.stage, type="prompt")
+    LLM_TOKENS.inc(call.completion_tokens, stage=call.stage, type="completion")
+    if not call.failed:
+        LLM_CALL_SECONDS.observe(call.latency, stage=call.stage)
+
+
+def command_name(command) -> str:
+    """The name a management command is run by, e.g. "fetch_data"."""
+    return command.__module__.rsplit(".", 1)[-1]
+
+
+def textfile_path(command: str) -> str:
+    return os.path.join(settings.METRICS_TEXTFILE_DIR, f"{command}-{os.getpid()}.prom")
+
+
+def write_textfile(path: str, extra_labels: Labels = ()) -> None:
+    """Write the registry to `path` atomically, for node_exporter's textfile collector or similar."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(REGISTRY.render(extra_labels))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def push(command: str) -> None:
+    """
+    Write this process's metrics to its own file in METRICS_TEXTFILE_DIR, if one is configured.
+    Each process has its own counters, so sharing a file would make them overwrite each other;
+    the `command` and `pid` labels keep the series of different files apart once collected.
+    """
+    if not settings.METRICS_TEXTFILE_DIR:
+        return
+    path = textfile_path(command)
+    try:
+        write_textfile(path, (("command", command), ("pid", str(os.getpid()))))
+    # Broad on purpose: metrics are best-effort and must never crash the command that produced them
+    except Exception as e:
+        logger.error("Failed to write metrics to %s: %s", path, str(e))
+
+
+def push_metrics(handle):
+    """Decorator for a command's `handle`: pushes the metrics to its textfile when it returns."""
+
+    @functools.wraps(handle)
+    def wrapper(command, *args, **options):
+        try:
+            return handle(command, *args, **options)
+        finally:
+            push(command_name(command))
+
+    return wrapper
@@ -1,20 +1,175 @@
+import json
 import logging
-from datetime import date
+import time
 import xml.etree.ElementTree as ET
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import date
+from functools import lru_cache
+from typing import BinaryIO
 
 import requests
-from data_pipeline.services.enums import ArticleData, PubMedURLs
-from tenacity import before_sleep_log, retry, stop_after_attempt, wait_exponential
+from data_pipeline.services import metrics
+from data_pipeline.services.disk_cache import CacheMiss, DiskCache, TeeReader
+from data_pipeline.services.enums import ArticleData, PubMedURLs, SearchHistory
+from data_pipeline.services.rate_limiter import TokenBucket
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_not_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_ESEARCH_PAGE_SIZE = 1000
+DEFAULT_EFETCH_CHUNK_SIZE = 200
+DEFAULT_POOL_SIZE = 10
+NCBI_REQUESTS_PER_SECOND = 3
+NCBI_REQUESTS_PER_SECOND_WITH_KEY = 10
+
+
+def chunked(items: list, size: int) -> Iterator[list]:
+    """Yield successive lists of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def build_esearch_params(query: str, start_date: date, end_date: date, datetype: str = "pdat", **extra) -> dict:
+    """
+    ESearch parameters for a date window; `extra` adds paging/history options.
+    `datetype` picks the date the window applies to: publication (pdat),
+    Entrez (edat) or last-modified (mdat).
+    """
+    return {
+        "db": "pubmed",
+        "term": query,
+        "datetype": datetype,
+        "mindate": start_date.isoformat(),
+        "maxdate": end_date.isoformat(),
+        "retmode": "json",
+        **extra,
+    }
+
+
+def build_efetch_history_params(history: SearchHistory, retstart: int, retmax: int) -> dict:
+    """EFetch parameters for one page of a search stored on the History server."""
+    return {
+        "db": "pubmed",
+        "WebEnv": history.webenv,
+        "query_key": history.query_key,
+        "retstart": retstart,
+        "retmax": retmax,
+        "retmode": "xml",
+    }
+
+
+def parse_search_history(esearch_json: dict) -> SearchHistory:
+    result = esearch_json.get("esearchresult", {})
+    return SearchHistory(
+        count=int(result.get("count", 0)),
+        webenv=result.get("webenv", ""),
+        query_key=result.get("querykey", ""),
+    )
+
+
+def get_default_cache() -> DiskCache | None:
+    """The on-disk E-utilities response cache configured in settings, if any."""
+    if not settings.PUBMED_CACHE_DIR:
+        return None
+    return DiskCache(
+        settings.PUBMED_CACHE_DIR,
+        ttl=settings.PUBMED_CACHE_TTL,
+        max_bytes=settings.PUBMED_CACHE_MAX_BYTES,
+        replay_only=settings.PUBMED_CACHE_REPLAY_ONLY,
+    )
+
+
+def response_cache_key(method: str, url: str, params: dict) -> str:
+    # The API key only affects rate limits, not content, so it is never part of the key
+    return DiskCache.make_key(method, url, params)
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter(api_key: str | None) -> TokenBucket:
+    """NCBI meters per API key (or per IP without one), so every client using a key shares one bucket."""
+    rate = NCBI_REQUESTS_PER_SECOND_WITH_KEY if api_key else NCBI_REQUESTS_PER_SECOND
+    # NCBI counts requests per second, so allow no burst: a full bucket plus a second of
+    # refill would otherwise let `capacity + rate` requests through in one second
+    return TokenBucket(rate, capacity=1)
+
 
 class PubMedClient:
     """
     Fetches PubMed abstracts via NCBI E-utilities.
+
+    Requests share a pooled keep-alive session and are paced by a token bucket at
+    NCBI's published limit (higher when an API key is configured). When a response
+    cache is configured, identical requests are answered from local disk.
     """
 
+    def __init__(
+        self,
+        api_key: str | None = None,
+        rate_limiter: TokenBucket | None = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        cache: DiskCache | None = None,
+    ):
+        self.api_key = api_key or settings.NCBI_API_KEY
+        self.rate_limiter = rate_limiter or get_rate_limiter(self.api_key)
+        self.cache = cache or get_default_cache()
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def __enter__(self) -> "PubMedClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def request(self, method: str, url: str, params: dict, **kwargs) -> requests.Response:
+        """Sends a rate-limited E-utilities request over the pooled session."""
+        if self.api_key:
+            params = {**params, "api_key": self.api_key}
+        self.rate_limiter.acquire()
+        started = time.monotonic()
+        try:
+            if method == "POST":
+                resp = self.session.post(url, data=params, **kwargs)
+            else:
+                resp = self.session.get(url, params=params, **kwargs)
+        except requests.RequestException:
+            metrics.observe_pubmed_request(url, "error", time.monotonic() - started)
+            raise
+        metrics.observe_pubmed_request(url, resp.status_code, time.monotonic() - started)
+        return resp
+
+    def get_json(self, url: str, params: dict) -> dict:
+        """GETs a JSON E-utilities endpoint, answering from the response cache when possible."""
+        if self.cache is None:
+            resp = self.request("GET", url, params)
+            resp.raise_for_status()
+            return resp.json()
+
+        key = response_cache_key("GET", url, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+        if self.cache.replay_only:
+            raise CacheMiss(f"No cached response for GET {url} {params}")
+
+        resp = self.request("GET", url, params)
+        logger.debug(f"Response: {resp.status_code} {url}")
+        resp.raise_for_status()
+        self.cache.set(key, resp.content)
+        return resp.json()
+
     @staticmethod
     def parse_publication_date(pubmed_article_element) -> date | None:
         """
@@ -70,6 +225,45 @@ class PubMedClient:
         # If no date was found, return None
         return None
 
+    @classmethod
+    def parse_article(cls, pubmed_article_element) -> ArticleData:
+        """Build an ArticleData from a single <PubmedArticle> element."""
+        med = pubmed_article_element.find("MedlineCitation")
+        pmid = med.findtext("PMID") or ""
+        article = med.find("Article")
+        title = article.findtext("ArticleTitle") or ""
+        abs_node = article.find("Abstract")
+        abstract = " ".join([t.text or "" for t in abs_node.findall("AbstractText")]) if abs_node is not None else ""
+        # Publication date
+        pub_date = cls.parse_publication_date(article)
+
+        return ArticleData(
+            pmid=pmid,
+            title=title,
+            abstract=abstract,
+            pub_date=pub_date,
+            raw_json={},
+        )
+
+    @classmethod
+    def iter_parse_articles(cls, stream: BinaryIO) -> Iterator[ArticleData]:
+        """
+        Incrementally parse an EFetch XML byte stream, yielding one article per <PubmedArticle>.
+
+        Finished elements are cleared from the tree as soon as they are parsed, so memory
+        use does not grow with the number of articles in the response.
+        """
+        context = ET.iterparse(stream, events=("start", "end"))
+        _, root = next(context)
+        for event, element in context:
+            if event == "end" and element.tag == "PubmedArticle":
+                yield cls.parse_article(element)
+                root.clear()
+
+    @classmethod
+    def pull_parser(cls) -> "EFetchPullParser":
+        return EFetchPullParser(cls.parse_article)
+
     @retry(
         stop=stop_after_attempt(1),  # TODO: Increase this for production
         wait=wait_exponential(multiplier=2, min=1, max=64),
@@ -79,27 +273,18 @@ class PubMedClient:
     def fetch(self, query: str, start_date: date, end_date: date, limit: int = 30) -> list[ArticleData]:
         """Fetches articles from PubMed based on a query and date range."""
 
-        # TODO: batch requests if limit is high
+        # Large limits should go through iter_fetch, which pages ESearch and chunks EFetch
         # Two stage process: first query ESearch to get PMIDs
-        esearch_params = {
-            "db": "pubmed",
-            "term": query,
-            "datetype": "pdat",
-            "mindate": start_date.isoformat(),
-            "maxdate": end_date.isoformat(),
-            "retmax": limit,
-            "retmode": "json",
-        }
+        esearch_params = build_esearch_params(query, start_date, end_date, retmax=limit)
 
         logger.info(f"Fetching articles for query: {query} from {start_date} to {end_date}")
 
-        resp = requests.get(PubMedURLs.ESEARCH_URL, params=esearch_params)
-        logger.debug(f"ESearch response: {resp.status_code} {resp.text}")
-        resp.raise_for_status()
+        esearch_json = self.get_json(PubMedURLs.ESEARCH_URL, esearch_params)
+        logger.debug(f"ESearch response: {esearch_json}")
 
-        ids = resp.json().get("esearchresult", {}).get("idlist", [])
+        ids = esearch_json.get("esearchresult", {}).get("idlist", [])
         if not ids:
-            logger.info(f"No PubMed IDs found in response: {resp.text}")
+            logger.info(f"No PubMed IDs found in response: {esearch_json}")
             return []
 
         # Then query EFetch to retrieve full records (XML)
@@ -108,34 +293,262 @@ class PubMedClient:
             "id": ",".join(ids),
             "retmode": "xml",
         }
-        resp = requests.get(PubMedURLs.EFETCH_URL, params=efetch_params)
-        logger.debug(f"EFetch response: {resp.status_code} {resp.text}")
-        resp.raise_for_status()
-
-        # Parse XML
-        root = ET.fromstring(resp.text)
-        results: list[ArticleData] = []
-        for article in root.findall(".//PubmedArticle"):
-            med = article.find("MedlineCitation")
-            pmid = med.findtext("PMID") or ""
-            article = med.find("Article")
-            title = article.findtext("ArticleTitle") or ""
-            abs_node = article.find("Abstract")
-            abstract = (
-                " ".join([t.text or "" for t in abs_node.findall("AbstractText")]) if abs_node is not None else ""
-            )
-            # Publication date
-            pub_date = self.parse_publication_date(article)
-
-            results.append(
-                ArticleData(
-                    pmid=pmid,
-                    title=title,
-                    abstract=abstract,
-                    pub_date=pub_date,
-                    raw_json={},
-                )
-            )
+        # Parse XML straight off the socket rather than buffering the whole body
+        with self.open_efetch("GET", efetch_params) as stream:
+            results = list(self.iter_parse_articles(stream))
         logger.info(f"Fetched {len(results)} articles for query: {query}")
 
         return results
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=2, min=1, max=64),
+        retry=retry_if_not_exception_type(CacheMiss),
+        reraise=True,
+        before_sleep=before_sleep_log(logger, logging.INFO),
+    )
+    def esearch_page(
+        self,
+        query: str,
+        start_date: date,
+        end_date: date,
+        retstart: int,
+        retmax: int,
+        datetype: str = "pdat",
+    ) -> list[str]:
+        """Fetches one page of PMIDs from ESearch, starting at offset `retstart`."""
+        esearch_params = build_esearch_params(
+            query, start_date, end_date, datetype=datetype, retstart=retstart, retmax=retmax
+        )
+        esearch_json = self.get_json(PubMedURLs.ESEARCH_URL, esearch_params)
+
+        return esearch_json.get("esearchresult", {}).get("idlist", [])
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=2, min=1, max=64),
+        retry=retry_if_not_exception_type(CacheMiss),
+        reraise=True,
+        before_sleep=before_sleep_log(logger, logging.INFO),
+    )
+    def send_efetch(self, method: str, efetch_params: dict) -> requests.Response:
+        """
+        Opens a streaming EFetch response, retrying until the status line is good.
+        POST requests send the parameters in the body, keeping long ID lists out of the URL.
+        """
+        resp = self.request(method, PubMedURLs.EFETCH_URL, efetch_params, stream=True)
+        logger.debug(f"EFetch response: {resp.status_code}")
+        try:
+            resp.raise_for_status()
+        except requests.HTTPError:
+            resp.close()
+            raise
+
+        resp.raw.decode_content = True
+        return resp
+
+    @contextmanager
+    def open_efetch(self, method: str, efetch_params: dict) -> Iterator[BinaryIO]:
+        """
+        Yields the EFetch XML as a byte stream: from the response cache on a hit, otherwise
+        straight off the socket. Cache misses are copied to disk as they are read, so
+        caching does not buffer the body in memory either.
+        """
+        if self.cache is None:
+            with self.send_efetch(method, efetch_params) as resp:
+                yield resp.raw
+            return
+
+        key = response_cache_key(method, PubMedURLs.EFETCH_URL, efetch_params)
+        cached = self.cache.open(key)
+        if cached is not None:
+            with cached:
+                yield cached
+            return
+        if self.cache.replay_only:
+            raise CacheMiss(f"No cached response for {method} {PubMedURLs.EFETCH_URL} {efetch_params}")
+
+        with self.send_efetch(method, efetch_params) as resp, self.cache.writer(key) as sink:
+            reader = TeeReader(resp.raw, sink)
+            yield reader
+            reader.drain()
+
+    def efetch_chunk(self, ids: list[str]) -> Iterator[ArticleData]:
+        """Streams full records for a chunk of PMIDs."""
+        efetch_params = {
+            "db": "pubmed",
+            "id": ",".join(ids),
+            "retmode": "xml",
+        }
+        with self.open_efetch("POST", efetch_params) as stream:
+            yield from self.iter_parse_articles(stream)
+
+    def iter_pmids(
+        self,
+        query: str,
+        start_date: date,
+        end_date: date,
+        limit: int,
+        page_size: int = DEFAULT_ESEARCH_PAGE_SIZE,
+        datetype: str = "pdat",
+    ) -> Iterator[list[str]]:
+        """Pages through ESearch with retstart/retmax, yielding at most `limit` PMIDs in total."""
+        retstart = 0
+        while retstart < limit:
+            retmax = min(page_size, limit - retstart)
+            ids = self.esearch_page(query, start_date, end_date, retstart=retstart, retmax=retmax, datetype=datetype)
+            if not ids:
+                return
+            yield ids
+            if len(ids) < retmax:
+                return
+            retstart += len(ids)
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=2, min=1, max=64),
+        retry=retry_if_not_exception_type(CacheMiss),
+        reraise=True,
+        before_sleep=before_sleep_log(logger, logging.INFO),
+    )
+    def esearch_history(self, query: str, start_date: date, end_date: date) -> SearchHistory:
+        """Runs ESearch with usehistory=y so the results can be fetched by WebEnv/query_key."""
+        esearch_params = build_esearch_params(query, start_date, end_date, usehistory="y", retmax=0)
+        return parse_search_history(self.get_json(PubMedURLs.ESEARCH_URL, esearch_params))
+
+    def efetch_history(self, history: SearchHistory, retstart: int, retmax: int) -> Iterator[ArticleData]:
+        """Streams one page of records from the History server, without resending any PMIDs."""
+        efetch_params = build_efetch_history_params(history, retstart, retmax)
+        with self.open_efetch("GET", efetch_params) as stream:
+            yield from self.iter_parse_articles(stream)
+
+    def iter_fetch(
+        self,
+        query: str,
+        start_date: date,
+        end_date: date,
+        limit: int,
+        page_size: int = DEFAULT_ESEARCH_PAGE_SIZE,
+        chunk_size: int = DEFAULT_EFETCH_CHUNK_SIZE,
+        use_history: bool = False,
+    ) -> Iterator[list[ArticleData]]:
+        """
+        Paginated variant of `fetch`: yields articles one EFetch chunk at a time.
+
+        With `use_history`, the search is kept on the Entrez History server and pages are
+        fetched by WebEnv/query_key, so the PMID list never goes back over the wire.
+        A chunk that still fails after retrying is logged and skipped, so an error
+        only loses that chunk rather than the whole date range.
+        """
+        logger.info(f"Fetching up to {limit} articles for query: {query} from {start_date} to {end_date}")
+
+        if use_history:
+            chunks = self._iter_history_chunks(query, start_date, end_date, limit, chunk_size)
+        else:
+            chunks = self._iter_id_chunks(query, start_date, end_date, limit, page_size, chunk_size)
+
+        fetched = 0
+        for articles in chunks:
+            fetched += len(articles)
+            yield articles
+
+        logger.info(f"Fetched {fetched} articles for query: {query}")
+
+    def iter_updated_pmids(
+        self,
+        query: str,
+        start_date: date,
+        end_date: date,
+        since: date,
+        until: date,
+        limit: int,
+        datetype: str = "mdat",
+        page_size: int = DEFAULT_ESEARCH_PAGE_SIZE,
+    ) -> Iterator[list[str]]:
+        """
+        PMIDs published between `start_date` and `end_date` that were added (edat) or
+        modified (mdat) between `since` and `until`. The publication window moves into
+        the search term because ESearch only filters on one date type at a time.
+        """
+        term = f"({query}) AND {start_date:%Y/%m/%d}:{end_date:%Y/%m/%d}[dp]"
+        return self.iter_pmids(term, since, until, limit, page_size=page_size, datetype=datetype)
+
+    def iter_fetch_ids(
+        self, ids: list[str], chunk_size: int = DEFAULT_EFETCH_CHUNK_SIZE, strict: bool = False
+    ) -> Iterator[list[ArticleData]]:
+        """
+        Fetches the given PMIDs in POSTed EFetch chunks, yielding each chunk's articles.
+        A chunk that fails is logged and skipped, or with `strict` its error is raised.
+        """
+        for chunk in chunked(ids, chunk_size):
+            description = f"chunk of {len(chunk)} PMIDs starting at {chunk[0]}"
+            articles = self._collect(self.efetch_chunk(chunk), description, strict)
+            if articles:
+                yield articles
+
+    def _iter_id_chunks(
+        self, query: str, start_date: date, end_date: date, limit: int, page_size: int, chunk_size: int
+    ) -> Iterator[list[ArticleData]]:
+        for page in self.iter_pmids(query, start_date, end_date, limit, page_size=page_size):
+            yield from self.iter_fetch_ids(page, chunk_size)
+
+    def _iter_history_chunks(
+        self, query: str, start_date: date, end_date: date, limit: int, chunk_size: int
+    ) -> Iterator[list[ArticleData]]:
+        history = self.esearch_history(query, start_date, end_date)
+        total = min(limit, history.count)
+        logger.info(f"ESearch found {history.count} records, fetching {total} via the History server")
+
+        for retstart in range(0, total, chunk_size):
+            page = self.efetch_history(history, retstart=retstart, retmax=min(chunk_size, total - retstart))
+            articles = self._collect(page, f"history page at retstart={retstart}")
+            if articles:
+                yield articles
+
+    @staticmethod
+    def _collect(articles: Iterator[ArticleData], description: str, strict: bool = False) -> list[ArticleData]:
+        """
+        Drain a streamed EFetch response into a list. If the request or the stream fails,
+        the error is logged and whatever was parsed before the failure is kept, unless
+        `strict`, in which case the error is raised.
+        """
+        results: list[ArticleData] = []
+        try:
+            for article in articles:
+                results.append(article)
+        except (requests.RequestException, ET.ParseError) as e:
+            logger.error(f"Failed to fetch {description}: {str(e)}")
+            if strict:
+                raise
+        return results
+
+
+class EFetchPullParser:
+    """
+    Push-style counterpart of `PubMedClient.iter_parse_articles` for callers that receive
+    the EFetch body in chunks (e.g. an async byte stream). Feed it bytes; it returns the
+    articles completed so far and clears them from the tree.
+    """
+
+    def __init__(self, parse_article):
+        self._parse_article = parse_article
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root = None
+
+    def feed(self, data: bytes) -> list[ArticleData]:
+        self._parser.feed(data)
+        return self._read_articles()
+
+    def close(self) -> list[ArticleData]:
+        self._parser.close()
+        return self._read_articles()
+
+    def _read_articles(self) -> list[ArticleData]:
+        articles: list[ArticleData] = []
+        for event, element in self._parser.read_events():
+            if self._root is None:
+                self._root = element
+            elif event == "end" and element.tag == "PubmedArticle":
+                articles.append(self._parse_article(element))
+                self._root.clear()
+        return articles
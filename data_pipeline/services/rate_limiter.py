@@ -0,0 +1,51 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter that can be shared between threads and asyncio tasks.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. Callers reserve
+    tokens up front, which may take the balance negative; the deficit is the time they
+    must wait. Reservations are made under a lock, so concurrent callers queue up in
+    arrival order and the long-run rate never exceeds `rate`.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Take `tokens` from the bucket and return how many seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def refund(self, tokens: float) -> None:
+        """Give back tokens that were reserved but not used, without exceeding `capacity`."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Block the calling thread until `tokens` are available."""
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def aacquire(self, tokens: float = 1) -> None:
+        """Wait, without blocking the event loop, until `tokens` are available."""
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
@@ -0,0 +1,139 @@
+import logging
+from collections.abc import Iterable, Iterator
+
+from data_pipeline.models import PipelineRun, RunFailure
+from data_pipeline.services import metrics
+from django.db.models import Count, F, Max, Q, QuerySet
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class RunNotResumable(ValueError):
+    """Raised when `--resume` names a run that does not exist or belongs to another command."""
+
+
+class RunTracker:
+    """
+    Records a run's progress in its PipelineRun row, on the thread that writes results.
+
+    Items must be handed out in ascending pk order through `track`. They may finish in any
+    order; the cursor only moves past an item once it and everything before it has been
+    saved or recorded as failed, so a resumed run can skip straight past the cursor.
+    """
+
+    def __init__(self, run: PipelineRun, retrying: set[int] | None = None):
+        self.run = run
+        self.outstanding: set[int] = set()
+        self.dispatched_up_to = run.cursor
+        self.retrying = retrying or set()  # pks of earlier failures that this run retries
+
+    @classmethod
+    def start(cls, command: str, parameters: dict, pending: QuerySet) -> "RunTracker":
+        """Open a run over `pending`; items added after this point are left to the next run."""
+        scope = pending.aggregate(total=Count("pk"), last_pk=Max("pk"))
+        run = PipelineRun.objects.create(
+            command=command,
+            parameters=parameters,
+            total=scope["total"],
+            last_pk=scope["last_pk"] or 0,
+        )
+        logger.info("Started %s run #%s over %s items", command, run.pk, run.total)
+        return cls(run)
+
+    @classmethod
+    def resume(cls, command: str, run_id: int) -> "RunTracker":
+        try:
+            run = PipelineRun.objects.get(pk=run_id, command=command)
+        except PipelineRun.DoesNotExist:
+            raise RunNotResumable(f"No {command} run #{run_id}")
+        run.status = PipelineRun.Status.RUNNING
+        run.finished_at = None
+        run.resume_count += 1
+        run.save(update_fields=["status", "finished_at", "resume_count", "updated_at"])
+        logger.info("Resuming %s run #%s from cursor %s", command, run.pk, run.cursor)
+        return cls(run, set(run.failures.filter(resolved=False).values_list("object_id", flat=True)))
+
+    @classmethod
+    def open(
+        cls, command: str, pending: QuerySet, parameters: dict, resume: int | None = None
+    ) -> tuple["RunTracker", QuerySet, int]:
+        """Start a run over `pending`, or resume run `resume`; returns the tracker, its items and their count."""
+        if resume:
+            tracker = cls.resume(command, resume)
+            items = tracker.scope(pending)
+            return tracker, items, items.count()
+        tracker = cls.start(command, parameters, pending)
+        return tracker, tracker.scope(pending), tracker.run.total
+
+    def scope(self, pending: QuerySet) -> QuerySet:
+        """The part of `pending` this run still has to do: past the cursor, or failed before."""
+        if self.retrying:
+            # Failed items that something else has processed since need no retry
+            still_pending = set(pending.filter(pk__in=self.retrying).values_list("pk", flat=True))
+            self.succeeded(self.retrying - still_pending, count=False)
+        return pending.filter(
+            Q(pk__gt=self.run.cursor, pk__lte=self.run.last_pk) | Q(pk__in=self.retrying)
+        ).order_by("pk")
+
+    def track(self, items: Iterable) -> Iterator:
+        """Pass `items` through, noting each one as in flight."""
+        for item in items:
+            self.outstanding.add(item.pk)
+            self.dispatched_up_to = max(self.dispatched_up_to, item.pk)
+            yield item
+
+    def _done(self, pk: int) -> None:
+        self.outstanding.discard(pk)
+        cursor = min(self.outstanding) - 1 if self.outstanding else self.dispatched_up_to
+        self.run.cursor = max(self.run.cursor, cursor)
+
+    def succeeded(self, pks: Iterable[int], count: bool = True) -> None:
+        """Record items whose results have been saved."""
+        resolved = []
+        for pk in pks:
+            self._done(pk)
+            self.run.succeeded += count
+            if pk in self.retrying:
+                resolved.append(pk)
+        if resolved:
+            self.retrying.difference_update(resolved)
+            self.run.failed -= self.run.failures.filter(object_id__in=resolved).update(resolved=True)
+
+    def failed(self, pk: int, error: Exception) -> None:
+        """Record an item that could not be processed, keeping its error for later retries."""
+        self._done(pk)
+        metrics.ITEMS_PROCESSED.inc(stage=self.run.command, outcome="failed")
+        failure, created = RunFailure.objects.get_or_create(
+            run=self.run,
+            object_id=pk,
+            defaults={"error_class": type(error).__name__, "message": str(error)},
+        )
+        if created:
+            self.run.failed += 1
+        else:
+            RunFailure.objects.filter(pk=failure.pk).update(
+                error_class=type(error).__name__,
+                message=str(error),
+                attempts=F("attempts") + 1,
+                updated_at=timezone.now(),
+            )
+
+    def checkpoint(self) -> None:
+        """Persist the cursor and counts."""
+        self.run.save(update_fields=["cursor", "succeeded", "failed", "updated_at"])
+
+    def finish(self, status: str = PipelineRun.Status.COMPLETED) -> None:
+        self.run.status = status
+        self.run.finished_at = timezone.now()
+        self.run.save(update_fields=["cursor", "succeeded", "failed", "status", "finished_at", "updated_at"])
+        logger.info(
+            "%s run #%s %s: %s succeeded, %s failed of %s in %.1fs",
+            self.run.command,
+            self.run.pk,
+            status,
+            self.run.succeeded,
+            self.run.failed,
+            self.run.total,
+            (self.run.finished_at - self.run.started_at).total_seconds(),
+        )
@@ -0,0 +1,252 @@
+import functools
+import logging
+import math
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from data_pipeline.models import LLMCall
+from data_pipeline.services import metrics
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Logs collecting calls, innermost command last; only the innermost one records
+_logs: list["CallLog"] = []
+_logs_lock = threading.Lock()
+# The call whose request is in progress on this thread, for the usage callback to attribute tokens to
+_current = threading.local()
+
+
+@dataclass
+class CallStats:
+    """One logical call to a model, however many attempts it took."""
+
+    model: str
+    stage: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tokens_estimated: bool = True
+    latency: float = 0.0  # seconds waiting on the provider for the final attempt
+    duration: float = 0.0  # seconds in total, including rate-limit waits and retries
+    attempts: int = 0
+    cached: bool = False
+    failed: bool = False
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass
+class StageSummary:
+    stage: str
+    calls: int
+    cached: int
+    retries: int
+    failed: int
+    tokens: int
+    p50: float
+    p95: float
+    tokens_per_second: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.stage}: {self.calls} calls ({self.cached} cached, {self.retries} retries, {self.failed} failed), "
+            f"latency p50 {self.p50:.2f}s p95 {self.p95:.2f}s, {self.tokens:,} tokens, "
+            f"{self.tokens_per_second:.1f} tokens/s"
+        )
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile; 0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize_stage(stage: str, calls: list[CallStats], elapsed: float) -> StageSummary:
+    """Aggregate `calls`; throughput is measured against `elapsed` wall-clock seconds."""
+    requested = [call for call in calls if not call.cached and not call.failed]
+    latencies = [call.latency for call in requested]
+    tokens = sum(call.tokens for call in calls)
+    return StageSummary(
+        stage=stage,
+        calls=len(calls),
+        cached=sum(call.cached for call in calls),
+        retries=sum(call.retries for call in calls),
+        failed=sum(call.failed for call in calls),
+        tokens=tokens,
+        p50=percentile(latencies, 0.5),
+        p95=percentile(latencies, 0.95),
+        tokens_per_second=tokens / elapsed if elapsed > 0 else 0.0,
+    )
+
+
+class CallLog:
+    """
+    The model calls made while one command runs, for its end-of-run report and the LLMCall
+    table. Calls are added from whichever thread made them; `flush` writes them out and
+    belongs on the thread that owns the database connection.
+    """
+
+    def __init__(self, command: str):
+        self.command = command
+        self.invocation = uuid.uuid4()
+        self.pipeline_run = None
+        self.started = time.monotonic()
+        self.calls: list[CallStats] = []
+        self._unsaved: list[CallStats] = []
+        self._lock = threading.Lock()
+
+    def add(self, call: CallStats) -> None:
+        with self._lock:
+            self.calls.append(call)
+            self._unsaved.append(call)
+
+    def flush(self) -> int:
+        """Save the calls recorded since the last flush."""
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, []
+        if unsaved:
+            LLMCall.objects.bulk_create(
+                [
+                    LLMCall(
+                        command=self.command,
+                        invocation=self.invocation,
+                        pipeline_run=self.pipeline_run,
+                        stage=call.stage,
+                        model=call.model,
+                        prompt_tokens=call.prompt_tokens,
+                        completion_tokens=call.completion_tokens,
+                        tokens_estimated=call.tokens_estimated,
+                        latency=call.latency,
+                        duration=call.duration,
+                        retries=call.retries,
+                        cached=call.cached,
+                        failed=call.failed,
+                    )
+                    for call in unsaved
+                ]
+            )
+        return len(unsaved)
+
+    def summaries(self) -> list[StageSummary]:
+        """Per-stage figures, followed by a total when there is more than one stage."""
+        elapsed = time.monotonic() - self.started
+        with self._lock:
+            calls = list(self.calls)
+        by_stage: dict[str, list[CallStats]] = {}
+        for call in calls:
+            by_stage.setdefault(call.stage, []).append(call)
+        summaries = [summarize_stage(stage, stage_calls, elapsed) for stage, stage_calls in sorted(by_stage.items())]
+        if len(summaries) > 1:
+            summaries.append(summarize_stage("total", calls, elapsed))
+        return summaries
+
+    def report(self, stdout) -> None:
+        for summary in self.summaries():
+            stdout.write(f"LLM {summary}")
+
+
+def record(call: CallStats) -> None:
+    """Count a finished call in the metrics and add it to the innermost active log, if any."""
+    metrics.observe_llm_call(call)
+    with _logs_lock:
+        log = _logs[-1] if _logs else None
+    if log is not None:
+        log.add(call)
+
+
+@contextmanager
+def recording(log: CallLog) -> Iterator[CallLog]:
+    """Collect every call made in this process, on any thread, into `log` until the block exits."""
+    with _logs_lock:
+        _logs.append(log)
+    try:
+        yield log
+    finally:
+        with _logs_lock:
+            _logs.remove(log)
+
+
+@contextmanager
+def measure(model: str, stage: str, prompt_tokens: int) -> Iterator[CallStats]:
+    """Time one logical call, noting whether it failed, and record it when the block exits."""
+    call = CallStats(model=model, stage=stage, prompt_tokens=prompt_tokens)
+    started = time.monotonic()
+    try:
+        yield call
+    except BaseException:
+        call.failed = True
+        raise
+    finally:
+        call.duration = time.monotonic() - started
+        record(call)
+
+
+@contextmanager
+def request(call: CallStats) -> Iterator[None]:
+    """Time one attempt at `call`; token usage the provider reports on this thread meanwhile is attributed to it."""
+    call.attempts += 1
+    _current.call = call
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        call.latency = time.monotonic() - started
+        _current.call = None
+
+
+def usage_from_result(result) -> tuple[int, int] | None:
+    """(prompt, completion) tokens reported in a LangChain LLMResult, if the provider reported them."""
+    usage = (result.llm_output or {}).get("token_usage")
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    # Streamed responses carry their usage on the message instead
+    for generations in result.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                return metadata.get("input_tokens", 0), metadata.get("output_tokens", 0)
+    return None
+
+
+def record_usage(result) -> None:
+    """Attribute the token usage in `result` to the call in progress on this thread."""
+    call = getattr(_current, "call", None)
+    usage = usage_from_result(result) if call is not None else None
+    if usage:
+        call.prompt_tokens, call.completion_tokens = usage
+        call.tokens_estimated = False
+
+
+def record_llm_calls(handle):
+    """
+    Decorator for a command's `handle`: records the model calls it makes as `self.llm_calls`,
+    saves them when it returns and prints per-stage latency and throughput.
+    """
+
+    @functools.wraps(handle)
+    def wrapper(command, *args, **options):
+        log = CallLog(command.__module__.rsplit(".", 1)[-1])
+        command.llm_calls = log
+        with recording(log):
+            try:
+                return handle(command, *args, **options)
+            finally:
+                try:
+                    log.flush()
+                except DatabaseError as e:
+                    logger.error("Failed to save LLM call records: %s", str(e))
+                log.report(command.stdout)
+
+    return wrapper
@@ -0,0 +1,81 @@
+import os
+import time
+from datetime import date
+from pathlib import Path
+
+import pytest
+import responses
+from data_pipeline.services.disk_cache import CacheMiss, DiskCache
+from data_pipeline.services.enums import PubMedURLs
+from data_pipeline.services.pubmed_client import PubMedClient
+from data_pipeline.services.rate_limiter import TokenBucket
+
+
+def test_disk_cache_expires_entries_after_ttl(tmp_path: Path) -> None:
+    """Entries older than the TTL are treated as misses and removed."""
+    # Arrange
+    cache = DiskCache(tmp_path, ttl=60)
+    key = DiskCache.make_key("GET", "https://example.org", {"b": 2, "a": 1})
+    cache.set(key, b"payload")
+
+    # Act / Assert
+    assert key == DiskCache.make_key("GET", "https://example.org", {"a": 1, "b": 2})
+    assert cache.get(key) == b"payload"
+
+    entry = tmp_path / key[:2] / key
+    stale = time.time() - 120
+    os.utime(entry, (stale, stale))
+    assert cache.get(key) is None
+    assert not entry.exists()
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    """When the size bound is exceeded, the entries read least recently are evicted first."""
+    # Arrange
+    cache = DiskCache(tmp_path, max_bytes=25)
+    old, recent, new = (DiskCache.make_key(name) for name in ("old", "recent", "new"))
+    cache.set(old, b"x" * 10)
+    cache.set(recent, b"y" * 10)
+    for offset, key in ((300, old), (200, recent)):
+        stamp = time.time() - offset
+        os.utime(tmp_path / key[:2] / key, (stamp, stamp))
+    assert cache.get(recent) is not None  # refreshes its access time
+
+    # Act
+    cache.set(new, b"z" * 10)
+
+    # Assert
+    assert cache.get(old) is None
+    assert cache.get(recent) == b"y" * 10
+    assert cache.get(new) == b"z" * 10
+
+
+@responses.activate
+def test_client_replays_cached_responses_offline(tmp_path: Path) -> None:
+    """A second client in replay-only mode answers from disk without any HTTP traffic."""
+    # Arrange
+    responses.add(responses.GET, PubMedURLs.ESEARCH_URL, json={"esearchresult": {"idlist": ["7"]}})
+    responses.add(
+        responses.POST,
+        PubMedURLs.EFETCH_URL,
+        body=(
+            "<PubmedArticleSet><PubmedArticle><MedlineCitation><PMID>7</PMID><Article>"
+            "<Journal><JournalIssue><PubDate><Year>2020</Year></PubDate></JournalIssue></Journal>"
+            "<ArticleTitle>Cached</ArticleTitle></Article></MedlineCitation></PubmedArticle></PubmedArticleSet>"
+        ),
+    )
+    window = ("covid", date(2020, 1, 1), date(2020, 1, 31), 10)
+    live = PubMedClient(rate_limiter=TokenBucket(rate=100), cache=DiskCache(tmp_path))
+    first = [article for chunk in live.iter_fetch(*window) for article in chunk]
+
+    # Act
+    responses.calls.reset()
+    replay = PubMedClient(rate_limiter=TokenBucket(rate=100), cache=DiskCache(tmp_path, replay_only=True))
+    second = [article for chunk in replay.iter_fetch(*window) for article in chunk]
+
+    # Assert
+    assert [article.title for article in second] == ["Cached"]
+    assert second == first
+    assert len(responses.calls) == 0
+    with pytest.raises(CacheMiss):
+        replay.esearch_page("other query", date(2020, 1, 1), date(2020, 1, 31), retstart=0, retmax=10)
@@ -0,0 +1,77 @@
+from data_pipeline.services.fact_checker.agent import FactChecker
+
+
+class FakeChain:
+    def __init__(self, response: str):
+        self.response = response
+        self.inputs: list[dict] = []
+
+    def invoke(self, inputs: dict) -> str:
+        self.inputs.append(inputs)
+        return self.response
+
+
+def test_score_batch_packs_pairs_and_falls_back_for_missing_items(monkeypatch) -> None:
+    """
+    Pairs share one prompt; items the model skipped or mangled are re-checked singly,
+    and the results come back in input order.
+    """
+    # Arrange
+    checker = FactChecker()
+    checker.batch_chain = FakeChain(
+        '```json\n[{"id": 3, "score": 1, "issues": ["x"]}, {"id": 1, "score": 0, "issues": []},'
+        ' {"id": 2, "score": "bad"}]\n```'
+    )
+    singles = []
+    monkeypatch.setattr(FactChecker, "score", lambda self, summary, abstract: singles.append(summary) or (5, ["y"]))
+    pairs = [("s1", "a1"), ("s2", "a2"), ("s3", "a3")]
+
+    # Act
+    results = checker.score_batch(pairs, token_budget=2000)
+
+    # Assert
+    assert results == [(0, []), (5, ["y"]), (1, ["x"])]
+    assert singles == ["s2"]
+    assert len(checker.batch_chain.inputs) == 1
+    assert "Item 3\nAbstract:\na3" in checker.batch_chain.inputs[0]["items"]
+
+
+def test_pack_respects_token_budget() -> None:
+    """Pairs are split across prompts once the token budget is reached."""
+    # Arrange
+    long_text = "word " * 400  # ~500 tokens
+    pairs = [(long_text, long_text)] * 3 + [("short", "short")]
+
+    # Act
+    groups = FactChecker.pack(pairs, token_budget=1400)
+
+    # Assert
+    assert groups == [[0], [1], [2, 3]]
+
+
+def test_score_grounded_checks_each_passage_against_its_top_evidence() -> None:
+    """Each passage is checked only against the summaries that best match it, and verdicts are summed."""
+    # Arrange
+    checker = FactChecker()
+    checker.claim_chain = FakeChain('{"score": 1, "issues": ["unsupported"]}')
+    summaries = [
+        "Masks reduced household transmission of the virus.",
+        "Remdesivir shortened hospital stays for covid-19 patients.",
+        "School closures were linked to lower transmission among children.",
+    ]
+    article = (
+        "# Trends in Covid Research in 2020\n\n"
+        "Studies found masks cut household transmission.\n\n"
+        "Remdesivir trials reported shorter hospital stays."
+    )
+
+    # Act
+    score, issues = checker.score_grounded(article, summaries, evidence_k=1, concurrency=2)
+
+    # Assert: the heading is skipped and each passage gets its own evidence
+    assert (score, issues) == (2, ["unsupported", "unsupported"])
+    evidence = sorted((call["claim"], call["evidence"]) for call in checker.claim_chain.inputs)
+    assert evidence == [
+        ("Remdesivir trials reported shorter hospital stays.", summaries[1]),
+        ("Studies found masks cut household transmission.", summaries[0]),
+    ]
@@ -0,0 +1,97 @@
+import json
+import threading
+
+import openai
+import pytest
+from data_pipeline.services.fact_checker.agent import (
+    BATCH_FACT_CHECK_TEMPLATE,
+    FACT_CHECK_TEMPLATE,
+    ITEM_TEMPLATE,
+    FactChecker,
+)
+from data_pipeline.services.fake_llm import FakeLLMConfig, FakeLLMServer, fake_completion
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_openai import ChatOpenAI
+
+ABSTRACT = "Vaccination reduced hospital admissions by 40% in adults over 65."
+SUMMARY = "Vaccines cut hospital stays for older adults. They also cured long Covid."
+
+
+@pytest.fixture
+def fake_server():
+    servers = []
+
+    def start(**config) -> FakeLLMServer:
+        server = FakeLLMServer(("127.0.0.1", 0), FakeLLMConfig(latency=0, tokens_per_second=0, **config))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def chain_for(server: FakeLLMServer, template: str):
+    llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0, base_url=server.url, api_key="sk-fake", max_retries=0)
+    return PromptTemplate.from_template(template) | llm | StrOutputParser()
+
+
+def test_fake_verdicts_are_deterministic_and_agree_between_single_and_batched_checks() -> None:
+    """The same pair gets the same verdict alone, again, and packed into a batch prompt."""
+    # Arrange
+    single = FACT_CHECK_TEMPLATE.format(abstract=ABSTRACT, summary=SUMMARY)
+    items = ITEM_TEMPLATE.format(id=1, abstract="Other abstract.", summary="Other summary.") + ITEM_TEMPLATE.format(
+        id=2, abstract=ABSTRACT, summary=SUMMARY
+    )
+    batch = BATCH_FACT_CHECK_TEMPLATE.format(items=items)
+
+    # Act
+    verdict = json.loads(fake_completion(single))
+    batch_verdicts = json.loads(fake_completion(batch))
+
+    # Assert
+    assert json.loads(fake_completion(single)) == verdict
+    assert [entry["id"] for entry in batch_verdicts] == [1, 2]
+    assert {"score": batch_verdicts[1]["score"], "issues": batch_verdicts[1]["issues"]} == verdict
+    assert len(verdict["issues"]) == verdict["score"]
+
+
+def test_fact_checker_runs_against_the_fake_server(fake_server) -> None:
+    """FactChecker gets a parseable verdict, with usage reported, over a real HTTP round trip."""
+    # Arrange
+    server = fake_server()
+    checker = FactChecker()
+    checker.chain = chain_for(server, FACT_CHECK_TEMPLATE)
+    expected = json.loads(fake_completion(FACT_CHECK_TEMPLATE.format(abstract=ABSTRACT, summary=SUMMARY)))
+
+    # Act
+    score, issues = checker.score(SUMMARY, ABSTRACT)
+
+    # Assert
+    assert (score, issues) == (expected["score"], expected["issues"])
+
+
+def test_streamed_completion_matches_the_unstreamed_one(fake_server) -> None:
+    """Streaming yields several chunks that join up to the deterministic completion."""
+    # Arrange
+    chain = chain_for(fake_server(), "Write about {topic}")
+
+    # Act
+    chunks = list(chain.stream({"topic": "vaccine uptake in 2020"}))
+
+    # Assert
+    assert len(chunks) > 1
+    assert "".join(chunks) == fake_completion("Write about vaccine uptake in 2020")
+
+
+def test_injected_rate_limits_surface_as_openai_errors(fake_server) -> None:
+    """A 429 from the fake server reaches the caller as the same error OpenAI would raise."""
+    # Arrange
+    chain = chain_for(fake_server(rate_limit_rate=1.0), "Write about {topic}")
+
+    # Act / Assert
+    with pytest.raises(openai.RateLimitError):
+        chain.invoke({"topic": "masks"})
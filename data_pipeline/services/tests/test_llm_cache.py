@@ -0,0 +1,109 @@
+from pathlib import Path
+
+import pytest
+
+from data_pipeline.services.disk_cache import DiskCache
+from data_pipeline.services.fact_checker.agent import FACT_CHECK_TEMPLATE, FactChecker
+from data_pipeline.services.llm_cache import LLMCache, stream_cached
+
+
+class FakeChain:
+    def __init__(self, response: str):
+        self.response = response
+        self.calls = 0
+
+    def invoke(self, inputs: dict) -> str:
+        self.calls += 1
+        return self.response
+
+    def stream(self, inputs: dict):
+        self.calls += 1
+        yield from self.response.split(" ")
+
+
+def test_fact_checker_reuses_cached_verdicts(tmp_path: Path) -> None:
+    """Re-checking the same pair is served from the cache without calling the model."""
+    # Arrange
+    cache = LLMCache(DiskCache(tmp_path))
+    checker = FactChecker(cache=cache)
+    checker.chain = FakeChain('{"score": 1, "issues": ["made up"]}')
+
+    # Act
+    first = checker.score("summary", "abstract")
+    second = FactChecker(cache=cache)
+    second.chain = FakeChain("not called")
+    repeated = second.score("summary", "abstract")
+
+    # Assert
+    assert first == repeated == (1, ["made up"])
+    assert checker.chain.calls == 1
+    assert second.chain.calls == 0
+
+
+def test_fact_checker_does_not_cache_unparseable_verdicts(tmp_path: Path) -> None:
+    """A malformed verdict raises without being cached, so a retry asks the model again."""
+    # Arrange
+    cache = LLMCache(DiskCache(tmp_path))
+    checker = FactChecker(cache=cache)
+    checker.chain = FakeChain("Sorry, I cannot help with that.")
+    retry = FactChecker(cache=cache)
+    retry.chain = FakeChain('```json\n{"score": 0, "issues": []}\n```')
+
+    # Act
+    with pytest.raises(ValueError):
+        checker.score("summary", "abstract")
+    verdict = retry.score("summary", "abstract")
+
+    # Assert
+    assert verdict == (0, [])
+    assert retry.chain.calls == 1
+
+
+def test_fact_checker_treats_unparseable_cached_verdict_as_a_miss(tmp_path: Path) -> None:
+    """An entry cached before verdicts were validated is replaced by a fresh call rather than replayed."""
+    # Arrange
+    cache = LLMCache(DiskCache(tmp_path))
+    key = cache.key("gpt-3.5-turbo", 0, FACT_CHECK_TEMPLATE, {"abstract": "abstract", "summary": "summary"})
+    cache.set(key, "[]")
+    checker = FactChecker(cache=cache)
+    checker.chain = FakeChain('{"score": 2, "issues": ["a", "b"]}')
+
+    # Act
+    verdict = checker.score("summary", "abstract")
+
+    # Assert
+    assert verdict == (2, ["a", "b"])
+    assert checker.chain.calls == 1
+    assert cache.get(key) == '{"score": 2, "issues": ["a", "b"]}'
+
+
+def test_template_change_invalidates_cache_key(tmp_path: Path) -> None:
+    """Keys depend on the template text, so editing a prompt never serves stale completions."""
+    # Arrange
+    cache = LLMCache(DiskCache(tmp_path))
+    inputs = {"abstract": "a", "summary": "s"}
+
+    # Act
+    original = cache.key("gpt-3.5-turbo", 0, FACT_CHECK_TEMPLATE, inputs)
+    edited = cache.key("gpt-3.5-turbo", 0, FACT_CHECK_TEMPLATE + " Be strict.", inputs)
+    warmer = cache.key("gpt-3.5-turbo", 0.7, FACT_CHECK_TEMPLATE, inputs)
+
+    # Assert
+    assert len({original, edited, warmer}) == 3
+
+
+def test_stream_cached_stores_completed_stream(tmp_path: Path) -> None:
+    """A streamed completion is cached once finished and replayed as a single chunk."""
+    # Arrange
+    cache = LLMCache(DiskCache(tmp_path))
+    chain = FakeChain("a b c")
+    kwargs = {"model": "m", "temperature": 0, "template": "t"}
+
+    # Act
+    first = list(stream_cached(cache, chain, {"x": 1}, **kwargs))
+    second = list(stream_cached(cache, chain, {"x": 1}, **kwargs))
+
+    # Assert
+    assert first == ["a", "b", "c"]
+    assert second == ["abc"]
+    assert chain.calls == 1
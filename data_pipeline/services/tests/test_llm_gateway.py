@@ -0,0 +1,70 @@
+import httpx
+import openai
+import pytest
+from data_pipeline.services.llm_gateway import AdaptiveConcurrency, LLMGateway
+from tenacity import wait_none
+
+
+class FlakyChain:
+    """Raises `failures` rate-limit errors before answering."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    def invoke(self, inputs: dict) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+            raise openai.RateLimitError("Rate limit reached", response=httpx.Response(429, request=request), body=None)
+        return "answer"
+
+
+def test_adaptive_concurrency_backs_off_multiplicatively_and_recovers_additively() -> None:
+    """Overload halves the limit (once per cooldown), slow calls trim it and successes grow it back."""
+    # Arrange
+    limiter = AdaptiveConcurrency(maximum=8, latency_target=1.0, cooldown=60)
+
+    # Act / Assert
+    limiter.acquire()
+    limiter.release(latency=0.1, overloaded=True)
+    assert limiter.limit == 4
+    limiter.acquire()
+    limiter.release(latency=0.1, overloaded=True)
+    assert limiter.limit == 4  # still cooling down
+    limiter.acquire()
+    limiter.release(latency=0.1)
+    assert limiter.limit == 4.25
+    limiter.cooldown = 0
+    limiter.acquire()
+    limiter.release(latency=5.0)
+    assert limiter.limit == pytest.approx(3.825)
+
+
+def test_gateway_retries_rate_limited_calls_and_lowers_concurrency() -> None:
+    """A 429 is retried after backoff, and the in-flight limit drops in response."""
+    # Arrange
+    gateway = LLMGateway(requests_per_minute=6000, tokens_per_minute=10**6, max_concurrency=8, max_retries=2)
+    gateway.retrying.wait = wait_none()
+    chain = FlakyChain(failures=1)
+
+    # Act
+    response = gateway.invoke(chain, {"abstract": "text"}, template="Summarize: {abstract}")
+
+    # Assert
+    assert response == "answer"
+    assert chain.calls == 2
+    assert gateway.concurrency.limit < 8
+
+
+def test_gateway_gives_up_after_max_retries() -> None:
+    """Persistent throttling surfaces as the provider's error instead of retrying forever."""
+    # Arrange
+    gateway = LLMGateway(requests_per_minute=6000, tokens_per_minute=10**6, max_concurrency=4, max_retries=2)
+    gateway.retrying.wait = wait_none()
+    chain = FlakyChain(failures=10)
+
+    # Act / Assert
+    with pytest.raises(openai.RateLimitError):
+        gateway.invoke(chain, {}, template="t")
+    assert chain.calls == 3
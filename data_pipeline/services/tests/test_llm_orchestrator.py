@@ -0,0 +1,45 @@
+import threading
+
+from data_pipeline.services.llm_orchestrator.agent import LLMOrchestrator
+
+
+def test_map_reduce_merges_partials_until_they_fit(monkeypatch) -> None:
+    """Partial reports too big for one prompt are merged in rounds before the final article."""
+    # Arrange: each partial is ~250 tokens, the budget fits two of them
+    monkeypatch.setattr(LLMOrchestrator, "synthesize_partial", lambda self, period, summaries: period * 1000)
+    merges = []
+
+    def fake_reduce(self, reports):
+        merges.append(len(reports))
+        return "m" * 400
+
+    monkeypatch.setattr(LLMOrchestrator, "reduce_reports", fake_reduce)
+    monkeypatch.setattr(LLMOrchestrator, "write_trend_article", lambda self, reports: f"{len(reports)} reports")
+    groups = {label: [f"summary {label}"] for label in "abcdef"}
+
+    # Act
+    article = LLMOrchestrator().synthesize_trends_map_reduce(groups, token_budget=600, concurrency=3)
+
+    # Assert
+    assert merges == [2, 2, 2]
+    assert article == "3 reports"
+
+
+def test_map_partials_merges_split_groups_in_parallel(monkeypatch) -> None:
+    """Groups split over the budget are merged back concurrently, across labels, not one month at a time."""
+    # Arrange: each month's summaries need two map calls, so each month needs a merge
+    monkeypatch.setattr(LLMOrchestrator, "synthesize_partial", lambda self, period, summaries: f"notes {period}")
+    both_merging = threading.Barrier(2, timeout=5)
+
+    def fake_reduce(self, reports):
+        both_merging.wait()  # fails unless the two months' merges are in flight together
+        return " + ".join(reports)
+
+    monkeypatch.setattr(LLMOrchestrator, "reduce_reports", fake_reduce)
+    groups = {month: ["x" * 2000, "y" * 2000] for month in ["2020-01", "2020-02"]}
+
+    # Act
+    notes = LLMOrchestrator().map_partials(groups, token_budget=600, concurrency=2)
+
+    # Assert
+    assert notes == {"2020-01": "notes 2020-01 + notes 2020-01", "2020-02": "notes 2020-02 + notes 2020-02"}
@@ -0,0 +1,46 @@
+import pytest
+from data_pipeline.services.fact_checker.agent import FactChecker
+from data_pipeline.services.llm_orchestrator.agent import LLMOrchestrator
+from data_pipeline.services.llm_registry import get_chain, get_http_client, get_llm
+
+
+@pytest.fixture(autouse=True)
+def registry(settings):
+    """A fake API key, and registry caches that start empty and don't leak into other tests."""
+    settings.OPENAI_API_KEY = "sk-test"
+    for cached in (get_chain, get_llm, get_http_client):
+        cached.cache_clear()
+    yield
+    for cached in (get_chain, get_llm, get_http_client):
+        cached.cache_clear()
+
+
+def test_services_share_one_client_and_chain_per_template() -> None:
+    """Every service instance gets the same model client per temperature, HTTP pool and compiled chains."""
+    # Arrange
+    first, second = FactChecker(), FactChecker()
+    orchestrator = LLMOrchestrator()
+
+    # Act
+    chains = first.chain, second.chain
+
+    # Assert
+    assert chains[0] is chains[1]
+    assert first.claim_chain is not first.chain
+    assert first.llm is get_llm("gpt-3.5-turbo", 0)
+    assert orchestrator.llm is not first.llm  # different temperature
+    assert first.llm.http_client is orchestrator.llm.http_client is get_http_client()
+
+
+def test_chains_are_built_lazily_and_can_be_overridden_per_instance() -> None:
+    """Nothing is built in the constructor, and assigning a chain only affects that instance."""
+    # Arrange
+    checker = FactChecker()
+
+    # Act
+    info_before = get_chain.cache_info()
+    checker.batch_chain = "stub"
+
+    # Assert
+    assert info_before.currsize == 0
+    assert FactChecker().batch_chain is not checker.batch_chain
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+from data_pipeline.models import Article, Job
+from data_pipeline.services import metrics
+
+
+def test_registry_renders_prometheus_text_format() -> None:
+    """Counters, gauges and cumulative histogram buckets render as Prometheus expects."""
+    # Arrange
+    registry = metrics.Registry()
+    requests = registry.register(metrics.Counter("requests_total", "Requests", ["status"]))
+    depth = registry.register(metrics.Gauge("depth", "Depth"))
+    latency = registry.register(metrics.Histogram("latency_seconds", "Latency", buckets=[0.1, 1.0]))
+
+    # Act
+    requests.inc(status=200)
+    requests.inc(2, status='5"x"')
+    depth.set(7)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    rendered = registry.render()
+
+    # Assert
+    assert "# TYPE requests_total counter\n" in rendered
+    assert 'requests_total{status="200"} 1.0\n' in rendered
+    assert 'requests_total{status="5\\"x\\""} 2.0\n' in rendered
+    assert "depth 7.0\n" in rendered
+    assert 'latency_seconds_bucket{le="0.1"} 1.0\n' in rendered
+    assert 'latency_seconds_bucket{le="1.0"} 2.0\n' in rendered
+    assert 'latency_seconds_bucket{le="+Inf"} 2.0\n' in rendered
+    assert "latency_seconds_sum 0.55\n" in rendered
+    assert "latency_seconds_count 2.0\n" in rendered
+
+
+def test_labels_must_match_the_metric() -> None:
+    """A missing or unexpected label is a programming error, not a new series."""
+    # Arrange
+    counter = metrics.Counter("things_total", "Things", ["stage"])
+
+    # Act / Assert
+    with pytest.raises(ValueError):
+        counter.inc(stage="summarize", outcome="ok")
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_reports_backlog_and_jobs(client) -> None:
+    """/metrics serves the registry, with the backlog and job gauges read from the database."""
+    # Arrange
+    Article.objects.create(pmid="1", title="t", abstract="a", pub_date="2020-01-01", raw_json={})
+    Job.objects.create(stage=Job.Stage.SUMMARIZE, object_id=1)
+
+    # Act
+    response = client.get("/metrics")
+
+    # Assert
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = response.content.decode()
+    assert 'pipeline_backlog{stage="summarize"} 1.0' in body
+    assert 'pipeline_backlog{stage="validate"} 0.0' in body
+    assert 'pipeline_jobs{stage="summarize",status="pending"} 1.0' in body
+
+
+@pytest.mark.django_db
+def test_push_writes_one_textfile_per_command_and_process(settings, tmp_path) -> None:
+    """Each command's process gets its own file, labelled so the collector can tell the series apart."""
+    # Arrange
+    settings.METRICS_TEXTFILE_DIR = str(tmp_path)
+    metrics.ARTICLES_FETCHED.inc(3)
+    pid = os.getpid()
+
+    # Act
+    metrics.push("fetch_data")
+    metrics.push("summarize")
+
+    # Assert
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"fetch_data-{pid}.prom", f"summarize-{pid}.prom"]
+    text = (tmp_path / f"fetch_data-{pid}.prom").read_text()
+    assert f'pipeline_articles_fetched_total{{command="fetch_data",pid="{pid}"}} ' in text
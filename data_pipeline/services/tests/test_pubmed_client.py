@@ -0,0 +1,143 @@
+import asyncio
+import io
+from datetime import date
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+import responses
+from data_pipeline.services import rate_limiter
+from data_pipeline.services.async_pubmed_client import AsyncPubMedClient
+from data_pipeline.services.enums import PubMedURLs
+from data_pipeline.services.pubmed_client import PubMedClient, get_rate_limiter
+from data_pipeline.services.rate_limiter import TokenBucket
+
+
+def test_iter_parse_articles_streams_one_article_at_a_time() -> None:
+    """Articles are yielded one at a time from a byte stream, DOCTYPE and all."""
+    # Arrange
+    articles_xml = "".join(
+        f"""
+        <PubmedArticle>
+          <MedlineCitation>
+            <PMID>{i}</PMID>
+            <Article>
+              <Journal><JournalIssue><PubDate><Year>2020</Year><Month>02</Month></PubDate></JournalIssue></Journal>
+              <ArticleTitle>Title {i}</ArticleTitle>
+              <Abstract><AbstractText>Part one.</AbstractText><AbstractText>Part two.</AbstractText></Abstract>
+            </Article>
+          </MedlineCitation>
+        </PubmedArticle>"""
+        for i in range(1, 4)
+    )
+    stream = io.BytesIO(
+        b'<?xml version="1.0" ?>\n'
+        b'<!DOCTYPE PubmedArticleSet PUBLIC "-//NLM//DTD PubMedArticle, 1st January 2019//EN" '
+        b'"https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_190101.dtd">\n'
+        + f"<PubmedArticleSet>{articles_xml}</PubmedArticleSet>".encode()
+    )
+
+    # Act
+    parser = PubMedClient.iter_parse_articles(stream)
+    first = next(parser)
+    rest = list(parser)
+
+    # Assert
+    assert first.pmid == "1"
+    assert first.title == "Title 1"
+    assert first.abstract == "Part one. Part two."
+    assert first.pub_date == date(2020, 2, 1)
+    assert [article.pmid for article in rest] == ["2", "3"]
+
+
+@responses.activate
+def test_requests_share_session_rate_limiter_and_api_key() -> None:
+    """Every request goes through the shared limiter and carries the API key."""
+    # Arrange
+    responses.add(responses.GET, PubMedURLs.ESEARCH_URL, json={"esearchresult": {"idlist": ["1", "2"]}})
+    limiter = TokenBucket(rate=100)
+    client = PubMedClient(api_key="secret", rate_limiter=limiter)
+
+    # Act
+    ids = client.esearch_page("covid", date(2020, 1, 1), date(2020, 1, 31), retstart=0, retmax=2)
+
+    # Assert
+    assert ids == ["1", "2"]
+    assert "api_key=secret" in responses.calls[0].request.url
+    assert limiter.reserve() == 0  # one of the 100 burst tokens was used, plenty remain
+    assert get_rate_limiter("secret").rate == 10
+    assert get_rate_limiter(None).rate == 3
+
+
+@pytest.mark.parametrize("api_key", [None, "secret"])
+def test_ncbi_rate_limiter_never_exceeds_the_limit_in_any_second(monkeypatch: pytest.MonkeyPatch, api_key) -> None:
+    """Starting from an idle bucket, no one-second window holds more requests than NCBI allows."""
+    # Arrange: a simulated clock that sleeping advances
+    clock = [1000.0]
+    fake_time = SimpleNamespace(
+        monotonic=lambda: clock[0], sleep=lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+    )
+    monkeypatch.setattr(rate_limiter, "time", fake_time)
+    bucket = get_rate_limiter.__wrapped__(api_key)
+    clock[0] += 60  # idle for a minute
+
+    # Act
+    sent = []
+    for _ in range(50):
+        bucket.acquire()
+        sent.append(clock[0])
+
+    # Assert
+    busiest = max(sum(1 for t in sent if start <= t < start + 1 - 1e-9) for start in sent)
+    assert busiest == bucket.rate
+
+
+def test_token_bucket_spaces_requests_beyond_burst() -> None:
+    """Once the burst capacity is spent, reservations are spaced 1/rate seconds apart."""
+    # Arrange
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    # Act
+    delays = [bucket.reserve() for _ in range(4)]
+
+    # Assert
+    assert delays[:2] == [0.0, 0.0]
+    assert delays[2] == pytest.approx(0.1, abs=0.01)
+    assert delays[3] == pytest.approx(0.2, abs=0.01)
+
+
+def test_async_client_pages_esearch_and_streams_efetch_chunks() -> None:
+    """The async client pages ESearch and parses each POSTed EFetch chunk as it streams in."""
+    # Arrange
+    requests_seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        if request.url.path.endswith("esearch.fcgi"):
+            return httpx.Response(200, json={"esearchresult": {"idlist": ["1", "2", "3"]}})
+        ids = parse_qs(request.content.decode())["id"][0].split(",")
+        body = "".join(
+            f"<PubmedArticle><MedlineCitation><PMID>{id}</PMID><Article>"
+            f"<Journal><JournalIssue><PubDate><Year>2020</Year></PubDate></JournalIssue></Journal>"
+            f"<ArticleTitle>Title {id}</ArticleTitle></Article></MedlineCitation></PubmedArticle>"
+            for id in ids
+        )
+        return httpx.Response(200, content=f"<PubmedArticleSet>{body}</PubmedArticleSet>".encode())
+
+    async def fetch_all() -> list[list[str]]:
+        client = AsyncPubMedClient(
+            api_key="secret", rate_limiter=TokenBucket(rate=100), transport=httpx.MockTransport(handler)
+        )
+        async with client:
+            return [
+                [article.pmid for article in articles]
+                async for articles in client.iter_fetch("covid", date(2020, 1, 1), date(2020, 1, 31), 3, chunk_size=2)
+            ]
+
+    # Act
+    chunks = asyncio.run(fetch_all())
+
+    # Assert
+    assert chunks == [["1", "2"], ["3"]]
+    assert [request.method for request in requests_seen] == ["GET", "POST", "POST"]
@@ -0,0 +1,25 @@
+import pytest
+from data_pipeline.models import Article
+from data_pipeline.services.run_tracker import RunTracker
+
+
+@pytest.mark.django_db
+def test_cursor_only_passes_items_once_everything_before_them_is_done() -> None:
+    """Out-of-order completions do not move the cursor past an item that is still in flight."""
+    # Arrange
+    articles = [
+        Article.objects.create(pmid=str(i), title="t", abstract="a", pub_date="2020-01-01", raw_json={})
+        for i in range(1, 5)
+    ]
+    tracker, items, total = RunTracker.open("summarize", Article.objects.all(), {})
+    first, second, third, fourth = [article.pk for article in articles]
+    list(tracker.track(items))
+
+    # Act / Assert
+    tracker.succeeded([second, third])
+    assert tracker.run.cursor == first - 1
+    tracker.failed(first, RuntimeError("boom"))
+    assert tracker.run.cursor == third
+    tracker.succeeded([fourth])
+    assert tracker.run.cursor == fourth
+    assert (total, tracker.run.succeeded, tracker.run.failed) == (4, 3, 1)
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+from data_pipeline.models import LLMCall
+from data_pipeline.services import telemetry
+from data_pipeline.services.llm_gateway import LLMGateway
+from data_pipeline.services.tests.test_llm_gateway import FlakyChain
+from tenacity import wait_none
+
+
+class ReportingChain:
+    """Answers like a model whose provider reports token usage through the callback."""
+
+    def invoke(self, inputs: dict) -> str:
+        usage = {"prompt_tokens": 120, "completion_tokens": 30}
+        telemetry.record_usage(SimpleNamespace(llm_output={"token_usage": usage}))
+        return "answer"
+
+
+@pytest.mark.django_db
+def test_gateway_calls_are_recorded_per_stage_and_saved() -> None:
+    """Each call is logged with its stage, retries and tokens, and flushing writes the LLMCall rows."""
+    # Arrange
+    gateway = LLMGateway(requests_per_minute=6000, tokens_per_minute=10**6, max_concurrency=4, model="gpt-test")
+    gateway.retrying.wait = wait_none()
+    log = telemetry.CallLog("summarize")
+
+    # Act
+    with telemetry.recording(log):
+        gateway.invoke(FlakyChain(failures=1), {"abstract": "x"}, template="Summarize: {abstract}", stage="summarize")
+        gateway.invoke(ReportingChain(), {"items": "x"}, template="t", stage="fact_check")
+    gateway.invoke(ReportingChain(), {}, template="t", stage="unrecorded")
+    saved = log.flush()
+
+    # Assert
+    assert saved == 2
+    flaky = LLMCall.objects.get(stage="summarize")
+    assert (flaky.command, flaky.model, flaky.retries, flaky.tokens_estimated) == ("summarize", "gpt-test", 1, True)
+    reported = LLMCall.objects.get(stage="fact_check")
+    assert (reported.prompt_tokens, reported.completion_tokens, reported.tokens_estimated) == (120, 30, False)
+    assert log.flush() == 0
+
+
+def test_summaries_report_latency_percentiles_and_throughput() -> None:
+    """Cached calls count towards calls but not latency; a total follows when there are several stages."""
+    # Arrange
+    log = telemetry.CallLog("validate")
+    for latency in [1.0, 2.0, 3.0, 4.0]:
+        log.add(telemetry.CallStats(model="m", stage="fact_check", latency=latency, prompt_tokens=10, attempts=1))
+    log.add(telemetry.CallStats(model="m", stage="fact_check", cached=True))
+    log.add(telemetry.CallStats(model="m", stage="summarize", latency=5.0, completion_tokens=20, attempts=3))
+
+    # Act
+    fact_check, summarize, total = log.summaries()
+
+    # Assert
+    assert (fact_check.stage, fact_check.calls, fact_check.cached, fact_check.tokens) == ("fact_check", 5, 1, 40)
+    assert (fact_check.p50, fact_check.p95) == (2.0, 4.0)
+    assert (summarize.retries, total.stage, total.calls, total.tokens) == (2, "total", 6, 60)
+    assert "p95 4.00s" in str(fact_check)
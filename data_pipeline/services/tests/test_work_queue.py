@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+import pytest
+from data_pipeline.models import Article, Job
+from data_pipeline.services import work_queue
+from django.utils import timezone
+
+
+@pytest.mark.django_db
+def test_claims_are_disjoint_and_expired_leases_are_reclaimed() -> None:
+    """Workers never share a leased job, but a job whose lease lapsed goes to the next claimant."""
+    # Arrange
+    for i in range(1, 4):
+        Article.objects.create(pmid=str(i), title="t", abstract="a", pub_date="2020-01-01", raw_json={})
+    assert work_queue.enqueue_pending(Job.Stage.SUMMARIZE) == 3
+
+    # Act
+    first = work_queue.claim(Job.Stage.SUMMARIZE, "worker-a", batch_size=2)
+    second = work_queue.claim(Job.Stage.SUMMARIZE, "worker-b", batch_size=2)
+    nothing_left = work_queue.claim(Job.Stage.SUMMARIZE, "worker-c", batch_size=2)
+    Job.objects.filter(pk=first[0].pk).update(leased_until=timezone.now() - timedelta(seconds=1))
+    reclaimed = work_queue.claim(Job.Stage.SUMMARIZE, "worker-c", batch_size=2)
+
+    # Assert
+    assert len(first) == 2 and len(second) == 1
+    assert not {job.pk for job in first} & {job.pk for job in second}
+    assert nothing_left == []
+    assert [job.pk for job in reclaimed] == [first[0].pk]
+    assert Job.objects.get(pk=first[0].pk).attempts == 2
+
+
+@pytest.mark.django_db
+def test_a_stale_worker_cannot_complete_fail_or_release_a_reclaimed_job() -> None:
+    """Once a lapsed lease is reclaimed, the original worker's updates are dropped and the new owner keeps the job."""
+    # Arrange
+    Article.objects.create(pmid="1", title="t", abstract="a", pub_date="2020-01-01", raw_json={})
+    work_queue.enqueue_pending(Job.Stage.SUMMARIZE)
+    [stale] = work_queue.claim(Job.Stage.SUMMARIZE, "worker-a", batch_size=1)
+    Job.objects.filter(pk=stale.pk).update(leased_until=timezone.now() - timedelta(seconds=1))
+    [current] = work_queue.claim(Job.Stage.SUMMARIZE, "worker-b", batch_size=1)
+
+    # Act
+    released = work_queue.release([stale])
+    completed = work_queue.complete([stale])
+    failed = work_queue.fail(stale, ValueError("late"))
+    renewed = work_queue.renew([stale])
+    stolen = work_queue.claim(Job.Stage.SUMMARIZE, "worker-c", batch_size=1)
+
+    # Assert
+    assert (released, completed, failed, renewed) == (0, 0, False, 0)
+    assert stolen == []
+    job = Job.objects.get(pk=current.pk)
+    assert (job.status, job.worker, job.attempts, job.last_error) == (Job.Status.RUNNING, "worker-b", 2, "")
+    assert work_queue.complete([current]) == 1
+
+
+@pytest.mark.django_db
+def test_renewing_extends_the_lease_of_jobs_still_held() -> None:
+    """A worker still busy with its batch pushes the lease forward so no one else reclaims the jobs."""
+    # Arrange
+    Article.objects.create(pmid="1", title="t", abstract="a", pub_date="2020-01-01", raw_json={})
+    work_queue.enqueue_pending(Job.Stage.SUMMARIZE)
+    [job] = work_queue.claim(Job.Stage.SUMMARIZE, "worker-a", batch_size=1, lease_seconds=1)
+    Job.objects.filter(pk=job.pk).update(leased_until=timezone.now() + timedelta(milliseconds=1))
+
+    # Act
+    renewed = work_queue.renew([job], lease_seconds=300)
+
+    # Assert
+    assert renewed == 1
+    assert Job.objects.get(pk=job.pk).leased_until > timezone.now() + timedelta(seconds=200)
+    assert work_queue.claim(Job.Stage.SUMMARIZE, "worker-b", batch_size=1) == []
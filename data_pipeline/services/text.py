@@ -0,0 +1,49 @@
+import re
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def split_by_token_budget(texts: list[str], token_budget: int, separator: str = "\n\n") -> list[list[str]]:
+    """
+    Split `texts` into consecutive groups whose joined size stays within `token_budget`.
+    A text that is larger than the budget on its own gets a group to itself.
+    """
+    separator_tokens = estimate_tokens(separator)
+    groups: list[list[str]] = []
+    current: list[str] = []
+    used = 0
+    for text in texts:
+        cost = estimate_tokens(text) + separator_tokens
+        if current and used + cost > token_budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(text)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+
+
+def split_claims(text: str, max_tokens: int = 200) -> list[str]:
+    """
+    Split an article into checkable passages: one per paragraph, with paragraphs longer
+    than `max_tokens` broken into runs of whole sentences. Headings and other lines
+    without sentence punctuation are dropped, as they make no claims of their own.
+    """
+    claims: list[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph or paragraph.startswith("#") or not re.search(r"[.!?]", paragraph):
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            claims.append(paragraph)
+            continue
+        sentences = SENTENCE_BOUNDARY.split(paragraph)
+        claims.extend(" ".join(group) for group in split_by_token_budget(sentences, max_tokens, separator=" "))
+    return claims
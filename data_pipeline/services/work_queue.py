@@ -0,0 +1,171 @@
+import logging
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from data_pipeline.models import Article, Job, Summary
+from data_pipeline.services.concurrency import batched
+from django.db import transaction
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 30.0  # seconds before a failed job's first retry; doubles with each attempt
+ENQUEUE_BATCH_SIZE = 1000
+
+
+def pending_objects(stage: str) -> QuerySet:
+    """The rows that still need `stage` done to them."""
+    if stage == Job.Stage.SUMMARIZE:
+        return Article.objects.filter(summary__isnull=True)
+    if stage == Job.Stage.VALIDATE:
+        return Summary.objects.filter(validation__isnull=True)
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def enqueue_pending(stage: str) -> int:
+    """
+    Create jobs for every row that still needs `stage` and has no job yet, and re-open
+    finished jobs whose output has since gone (e.g. a deleted Summary). Safe to run from
+    several processes at once. Returns the number of jobs created or re-opened.
+    """
+    pending = pending_objects(stage)
+    new_ids = pending.exclude(pk__in=Job.objects.filter(stage=stage).values("object_id")).values_list("pk", flat=True)
+    created = 0
+    for ids in batched(new_ids.iterator(chunk_size=ENQUEUE_BATCH_SIZE), ENQUEUE_BATCH_SIZE):
+        # Another process may enqueue the same rows concurrently; the unique constraint settles it
+        Job.objects.bulk_create([Job(stage=stage, object_id=pk) for pk in ids], ignore_conflicts=True)
+        created += len(ids)
+
+    reopened = Job.objects.filter(stage=stage, status=Job.Status.DONE, object_id__in=pending.values("pk")).update(
+        status=Job.Status.PENDING, attempts=0, leased_until=None, updated_at=timezone.now()
+    )
+    if created or reopened:
+        logger.info("Enqueued %d new and re-opened %d finished %s jobs", created, reopened, stage)
+    return created + reopened
+
+
+def claim(
+    stage: str,
+    worker: str,
+    batch_size: int,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> list[Job]:
+    """
+    Lease up to `batch_size` jobs for `worker`: pending jobs whose retry delay has passed,
+    and running jobs whose worker let the lease expire. Rows are locked with
+    SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers each get a disjoint batch
+    without waiting on one another.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # A worker that dies on a job's last attempt would otherwise leave it running forever
+        expired = Job.objects.filter(stage=stage, status=Job.Status.RUNNING, leased_until__lt=now)
+        expired.filter(attempts__gte=max_attempts).update(
+            status=Job.Status.FAILED, last_error="Lease expired on the final attempt", updated_at=now
+        )
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(stage=stage, status__in=[Job.Status.PENDING, Job.Status.RUNNING], attempts__lt=max_attempts)
+            .filter(Q(leased_until__isnull=True) | Q(leased_until__lte=now))
+            .order_by("pk")[:batch_size]
+        )
+        leased_until = now + timedelta(seconds=lease_seconds)
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.Status.RUNNING,
+            worker=worker,
+            leased_until=leased_until,
+            attempts=F("attempts") + 1,
+            updated_at=now,
+        )
+
+    for job in jobs:
+        job.status, job.worker, job.leased_until = Job.Status.RUNNING, worker, leased_until
+        job.attempts += 1
+    if jobs:
+        logger.info("Worker %s claimed %d %s jobs", worker, len(jobs), stage)
+    return jobs
+
+
+def owned(jobs: list[Job]) -> QuerySet:
+    """
+    The rows of (non-empty) `jobs` still held under the lease they were claimed with. Each claim bumps
+    `attempts`, so a job reclaimed after its lease lapsed no longer matches, even by the same worker.
+    """
+    lease = reduce(or_, (Q(pk=job.pk, worker=job.worker, attempts=job.attempts) for job in jobs))
+    return Job.objects.filter(lease, status=Job.Status.RUNNING)
+
+
+def _log_lost(action: str, jobs: list[Job], updated: int) -> None:
+    if updated < len(jobs):
+        logger.warning(
+            "Worker %s lost the lease on %d of %d jobs; not marking them %s",
+            jobs[0].worker,
+            len(jobs) - updated,
+            len(jobs),
+            action,
+        )
+
+
+def renew(jobs: list[Job], lease_seconds: float = DEFAULT_LEASE_SECONDS) -> int:
+    """Extend the lease on jobs still being worked on; returns how many are still held."""
+    if not jobs:
+        return 0
+    now = timezone.now()
+    leased_until = now + timedelta(seconds=lease_seconds)
+    renewed = owned(jobs).update(leased_until=leased_until, updated_at=now)
+    for job in jobs:
+        job.leased_until = leased_until
+    return renewed
+
+
+def complete(jobs: list[Job]) -> int:
+    """Mark jobs as done, unless another worker has since reclaimed them; returns how many were marked."""
+    if not jobs:
+        return 0
+    updated = owned(jobs).update(status=Job.Status.DONE, leased_until=None, last_error="", updated_at=timezone.now())
+    _log_lost("done", jobs, updated)
+    return updated
+
+
+def fail(
+    job: Job,
+    error: Exception,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+) -> bool:
+    """
+    Record a failed attempt; the job is retried after an exponential backoff until it runs out of attempts.
+    Returns False, changing nothing, if another worker has since reclaimed the job.
+    """
+    now = timezone.now()
+    if job.attempts >= max_attempts:
+        status, retry_at = Job.Status.FAILED, None
+    else:
+        status, retry_at = Job.Status.PENDING, now + timedelta(seconds=retry_delay * 2 ** (job.attempts - 1))
+    updated = owned([job]).update(status=status, leased_until=retry_at, last_error=str(error), updated_at=now)
+    if not updated:
+        _log_lost("failed", [job], updated)
+    elif status == Job.Status.FAILED:
+        logger.error("Job %s (%s #%s) failed permanently: %s", job.pk, job.stage, job.object_id, str(error))
+    else:
+        logger.warning("Job %s (%s #%s) failed, will retry: %s", job.pk, job.stage, job.object_id, str(error))
+    return bool(updated)
+
+
+def release(jobs: list[Job]) -> int:
+    """
+    Hand unfinished jobs back to the queue without spending an attempt, e.g. on shutdown.
+    Jobs another worker has since reclaimed are left alone; returns how many were released.
+    """
+    if not jobs:
+        return 0
+    updated = owned(jobs).update(
+        status=Job.Status.PENDING, leased_until=None, attempts=F("attempts") - 1, updated_at=timezone.now()
+    )
+    _log_lost("released", jobs, updated)
+    return updated
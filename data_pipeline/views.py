@@ -0,0 +1,15 @@
+from data_pipeline.services.metrics import REGISTRY
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.http import require_GET
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@require_GET
+def metrics(request: HttpRequest) -> HttpResponse:
+    """
+    This process's metrics in the Prometheus text format. The backlog and job queue gauges
+    are read from the database on each scrape, so they are current whichever process did
+    the work; batch commands' own counters reach Prometheus through METRICS_TEXTFILE_DIR.
+    """
+    return HttpResponse(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)